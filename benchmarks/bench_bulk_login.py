@@ -0,0 +1,76 @@
+"""
+Measures how long logging in many accounts takes against the local mock
+auth server, sequentially and with `mcauthpy.login_many()`.
+
+    python -m benchmarks.bench_bulk_login --accounts 64 --latency 0.02
+    python -m benchmarks.bench_bulk_login --accounts 64 --throttle 0.1
+
+"""
+
+import argparse
+import time
+
+import mcauthpy
+from mcauthpy import _http
+
+from test.mock_auth import MockAuthServer
+
+
+def bench_sequential(credentials) -> float:
+    start = time.perf_counter()
+    for email, password in credentials:
+        mcauthpy.Client.login_from_microsoft(email, password)
+    return time.perf_counter() - start
+
+
+def bench_login_many(credentials, max_workers: int, token_cache=None) -> float:
+    start = time.perf_counter()
+    for email, client in mcauthpy.login_many(
+        credentials, max_workers=max_workers, token_cache=token_cache
+    ):
+        if isinstance(client, Exception):
+            raise client
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument(
+        "--throttle", type=float, default=0, help="share of requests answered with 429"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 32])
+    args = parser.parse_args()
+
+    server = MockAuthServer(latency=args.latency, throttle=args.throttle).start()
+    server.install()
+    _http.configure_session(pool_maxsize=max(args.workers))
+
+    credentials = [(f"bot{i}@example.com", "password") for i in range(args.accounts)]
+
+    try:
+        elapsed = bench_sequential(credentials)
+        print(
+            f"sequential            {elapsed:8.3f} s  {len(credentials) / elapsed:8.1f} logins/s"
+        )
+
+        for workers in args.workers:
+            elapsed = bench_login_many(credentials, workers)
+            print(
+                f"login_many x{workers:<8} {elapsed:8.3f} s  {len(credentials) / elapsed:8.1f} logins/s"
+            )
+
+        token_cache = mcauthpy.TokenCache()
+        bench_login_many(credentials, max(args.workers), token_cache)
+        elapsed = bench_login_many(credentials, max(args.workers), token_cache)
+        print(
+            f"login_many (cached)   {elapsed:8.3f} s  {len(credentials) / elapsed:8.1f} logins/s"
+        )
+    finally:
+        server.uninstall()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures the AES/CFB8 throughput of every installed cipher backend, for
+packet-sized and read-sized buffers.
+
+    python -m benchmarks.bench_cipher --megabytes 16
+
+"""
+
+import argparse
+import os
+import time
+
+import mcauthpy
+
+
+def bench(label: str, function, chunks) -> None:
+    size = sum(len(chunk) for chunk in chunks)
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        function(chunk)
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<40} {size / elapsed / 1e6:8.1f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=16)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024, 65536])
+    args = parser.parse_args()
+
+    key = os.urandom(16)
+    total = args.megabytes * 1024 * 1024
+
+    for size in args.sizes:
+        chunks = [os.urandom(size)] * (total // size)
+
+        for backend in mcauthpy.available_backends():
+            cipher = mcauthpy.create_cipher(key, backend)
+            out = bytearray(size + cipher.overhead)
+
+            bench(f"{backend} encrypt {size} B", cipher.encrypt, chunks)
+            bench(f"{backend} decrypt {size} B", cipher.decrypt, chunks)
+            bench(
+                f"{backend} decrypt_into {size} B",
+                lambda chunk: cipher.decrypt_into(chunk, out),
+                chunks,
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Measures a `mcauthpy.Client` against the local mock server, across
+compression thresholds and cipher backends: the login latency, the packets/s
+and MB/s of one connection, and the memory per logged in connection. The
+server runs in its own process and streams `test.mock_server.DEFAULT_SCRIPT`.
+
+The results can be written as JSON and compared with an earlier run:
+
+    python -m benchmarks.bench_client --output before.json
+    python -m benchmarks.bench_client --output after.json --compare before.json
+
+"""
+
+from typing import List, Tuple
+
+import argparse
+import datetime
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import uuid
+
+import mcauthpy
+
+from test.mock_server import DEFAULT_SCRIPT, MockClient, start_process
+
+# The values compared between runs, and whether higher is better.
+COMPARED = [
+    ("throughput", "packets_per_second", True),
+    ("throughput", "megabytes_per_second", True),
+    ("login", "mean_ms", False),
+    ("memory", "kilobytes_per_connection", False),
+]
+
+
+def create_client(cipher: str, index: int) -> mcauthpy.Client:
+    username = f"bot{index}"
+    if cipher == "none":
+        return mcauthpy.Client.login_from_username(username)
+
+    profile = {"id": uuid.uuid3(uuid.NAMESPACE_OID, username).hex, "name": username}
+    client = MockClient.from_token("token", profile)
+    client.cipher_backend = cipher
+    return client
+
+
+def connect(address: Tuple[str, int], cipher: str, index: int) -> mcauthpy.Client:
+    client = create_client(cipher, index)
+    client.connect(*address)
+    client.login()
+    return client
+
+
+def bench_login(address: Tuple[str, int], cipher: str, count: int) -> dict:
+    latencies = []
+
+    for index in range(count):
+        start = time.perf_counter()
+        client = connect(address, cipher, index)
+        latencies.append((time.perf_counter() - start) * 1000)
+        client.socket.close()
+
+    latencies.sort()
+    return {
+        "logins": count,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def bench_throughput(address: Tuple[str, int], cipher: str, packets: int) -> dict:
+    client = connect(address, cipher, 0)
+    expected = packets
+    received = 0
+
+    start = time.perf_counter()
+    received_bytes = client.receiver.received
+    while received < expected:
+        received += len(client.read_packets())
+    elapsed = time.perf_counter() - start
+    received_bytes = client.receiver.received - received_bytes
+
+    client.socket.close()
+    return {
+        "packets": packets,
+        "seconds": elapsed,
+        "packets_per_second": received / elapsed,
+        "megabytes_per_second": received_bytes / elapsed / 1e6,
+    }
+
+
+def bench_memory(address: Tuple[str, int], cipher: str, connections: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    clients = [connect(address, cipher, index) for index in range(connections)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+
+    tracemalloc.stop()
+    for client in clients:
+        client.socket.close()
+
+    return {
+        "connections": connections,
+        "kilobytes_per_connection": used / connections / 1024,
+    }
+
+
+def run(args) -> List[dict]:
+    results = []
+
+    for online_mode, ciphers in ((False, ["none"]), (True, args.ciphers)):
+        ciphers = [cipher for cipher in ciphers if (cipher != "none") == online_mode]
+        if not ciphers:
+            continue
+
+        for threshold in args.thresholds:
+            options = {
+                "compression_threshold": threshold,
+                "online_mode": online_mode,
+                "script": DEFAULT_SCRIPT,
+            }
+            stream, stream_address = start_process(packets=args.packets, **options)
+            idle, idle_address = start_process(packets=0, **options)
+
+            try:
+                for cipher in ciphers:
+                    results.append(
+                        {
+                            "compression_threshold": threshold,
+                            "cipher": cipher,
+                            "login": bench_login(idle_address, cipher, args.logins),
+                            "throughput": bench_throughput(
+                                stream_address, cipher, args.packets
+                            ),
+                            "memory": bench_memory(
+                                idle_address, cipher, args.connections
+                            ),
+                        }
+                    )
+                    print_result(results[-1])
+            finally:
+                stream.terminate()
+                idle.terminate()
+
+    return results
+
+
+def print_result(result: dict) -> None:
+    print(
+        f"threshold {result['compression_threshold']:>5}  {result['cipher']:<13}"
+        f"{result['throughput']['packets_per_second']:10.0f} packets/s"
+        f"{result['throughput']['megabytes_per_second']:8.1f} MB/s"
+        f"{result['login']['mean_ms']:8.2f} ms/login"
+        f"{result['memory']['kilobytes_per_connection']:8.1f} kB/connection"
+    )
+
+
+def compare(results: List[dict], baseline: dict) -> None:
+    previous = {
+        (result["compression_threshold"], result["cipher"]): result
+        for result in baseline["results"]
+    }
+
+    print("\nchange against the baseline (+ is better):")
+    for result in results:
+        key = (result["compression_threshold"], result["cipher"])
+        if key not in previous:
+            continue
+
+        changes = []
+        for group, name, higher_is_better in COMPARED:
+            before = previous[key][group][name]
+            after = result[group][name]
+            change = (after - before) / before * 100 if before else 0.0
+            changes.append(f"{name} {change if higher_is_better else -change:+6.1f}%")
+
+        print(f"threshold {key[0]:>5}  {key[1]:<13}" + "  ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[-1, 64, 256])
+    parser.add_argument(
+        "--ciphers",
+        nargs="+",
+        default=["none", *mcauthpy.available_backends()],
+        help='"none" for offline mode, or cipher backends',
+    )
+    parser.add_argument("--packets", type=int, default=100000)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a JSON file of an earlier run")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "arguments": vars(args),
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Measures compressing and decompressing synthetic Chunk Data packets, which
+are the bulk of what a server sends, at several zlib levels, and the gain
+of offloading decompression of a batch to a thread pool.
+
+    python -m benchmarks.bench_compression --chunks 256 --levels 1 6 9
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import argparse
+import random
+import struct
+import time
+import zlib
+
+import mcauthpy
+
+SECTIONS = 24
+
+
+def _pack_longs(values, bits: int) -> list:
+    per_long = 64 // bits
+    longs = []
+
+    for start in range(0, len(values), per_long):
+        long = 0
+        for index, value in enumerate(values[start : start + per_long]):
+            long |= value << (index * bits)
+        longs.append(long)
+
+    return longs
+
+
+def _section(rng: random.Random, height: int) -> bytes:
+    # Solid stone below the surface, a few ores and caves, air above it.
+    if height < 0:
+        blocks = [0] * 4096
+    else:
+        blocks = []
+        for y in range(16):
+            for _ in range(256):
+                if y > height:
+                    blocks.append(0)
+                elif rng.random() < 0.04:
+                    blocks.append(rng.randrange(2, 12))
+                else:
+                    blocks.append(1)
+
+    palette = sorted(set(blocks))
+    block_count = sum(1 for block in blocks if block)
+
+    out = struct.pack(">h", block_count)
+    if len(palette) == 1:
+        out += b"\x00" + mcauthpy.encode_varint(palette[0]) + b"\x00"
+    else:
+        index = {block: i for i, block in enumerate(palette)}
+        out += b"\x04" + mcauthpy.encode_varints([len(palette), *palette])
+        longs = _pack_longs([index[block] for block in blocks], 4)
+        out += mcauthpy.encode_varint(len(longs))
+        out += struct.pack(f">{len(longs)}Q", *longs)
+
+    # Biomes, a single-valued palette.
+    out += b"\x00\x01\x00"
+    return out
+
+
+def chunk_packet(rng: random.Random, surface: int = 8) -> bytes:
+    """Builds the id and fields of a 1.18.2 Chunk Data and Update Light packet."""
+    heightmap = _pack_longs([surface * 16 + rng.randrange(4) for _ in range(256)], 9)
+    nbt = (
+        b"\x0a\x00\x00\x0c\x00\x0fMOTION_BLOCKING"
+        + struct.pack(f">i{len(heightmap)}Q", len(heightmap), *heightmap)
+        + b"\x00"
+    )
+
+    sections = b"".join(
+        _section(
+            rng, 15 if i < surface else (rng.randrange(16) if i == surface else -1)
+        )
+        for i in range(SECTIONS)
+    )
+
+    light = [bytes([0xFF]) * 2048 if i >= surface else bytes(2048) for i in range(26)]
+    light_data = mcauthpy.encode_varint(26) + b"".join(
+        mcauthpy.encode_varint(2048) + array for array in light
+    )
+
+    return b"".join(
+        [
+            mcauthpy.encode_varint(0x22),
+            struct.pack(">ii", rng.randrange(-100, 100), rng.randrange(-100, 100)),
+            nbt,
+            mcauthpy.encode_varint(len(sections)),
+            sections,
+            b"\x00",  # block entities
+            b"\x01",  # trust edges
+            b"\x01\x01" + struct.pack(">Q", (1 << 26) - 1),  # sky light mask
+            b"\x01\x01" + struct.pack(">Q", 0),  # block light mask
+            b"\x01\x01" + struct.pack(">Q", 0),  # empty sky light mask
+            b"\x01\x01" + struct.pack(">Q", (1 << 26) - 1),  # empty block light mask
+            light_data,
+            b"\x00",  # block light arrays
+        ]
+    )
+
+
+def bench(label: str, function, count: int, size: int) -> float:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<34} {elapsed * 1000:9.1f} ms  {count / elapsed:9.0f} packets/s  {size / elapsed / 1e6:8.1f} MB/s"
+    )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(758)
+    packets = [chunk_packet(rng, rng.randrange(4, 12)) for _ in range(args.chunks)]
+    size = sum(len(packet) for packet in packets)
+    print(
+        f"{args.chunks} chunk packets, {size / len(packets) / 1024:.1f} KiB on average\n"
+    )
+
+    for level in args.levels:
+        policy = mcauthpy.CompressionPolicy(level)
+        compressed = []
+
+        def compress_fresh():
+            for packet in packets:
+                compressor = zlib.compressobj(level)
+                compressor.compress(packet)
+                compressor.flush()
+
+        def compress_policy():
+            compressed[:] = [b"".join(policy.compress([packet])) for packet in packets]
+
+        bench(
+            f"level {level} compressobj() per packet",
+            compress_fresh,
+            len(packets),
+            size,
+        )
+        bench(f"level {level} CompressionPolicy", compress_policy, len(packets), size)
+        ratio = sum(len(data) for data in compressed) / size
+        print(f"{'':<34} ratio {ratio:.3f}")
+
+        bench(
+            f"level {level} zlib.decompress()",
+            lambda: [zlib.decompress(data) for data in compressed],
+            len(packets),
+            size,
+        )
+        bench(
+            f"level {level} decompress(data_length)",
+            lambda: [
+                policy.decompress(data, len(packet))
+                for data, packet in zip(compressed, packets)
+            ],
+            len(packets),
+            size,
+        )
+
+        with ThreadPoolExecutor(args.workers) as executor:
+            bench(
+                f"level {level} offloaded x{args.workers}",
+                lambda: list(
+                    executor.map(
+                        policy.decompress, compressed, [len(p) for p in packets]
+                    )
+                ),
+                len(packets),
+                size,
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measures how many packets per second many connections receive against the
+local mock server, with one `mcauthpy.ClientPool` thread and with one
+blocking thread per connection.
+
+    python -m benchmarks.bench_pool --connections 1 16 64 256 --packets 200000
+
+"""
+
+import argparse
+import threading
+import time
+
+import mcauthpy
+
+from test.mock_server import MockMinecraftServer
+
+
+def connect(server: MockMinecraftServer, count: int):
+    clients = []
+    for i in range(count):
+        client = mcauthpy.Client.login_from_username(f"bot{i}")
+        client.connect(*server.address)
+        client.login()
+        clients.append(client)
+    return clients
+
+
+def create_dispatcher() -> mcauthpy.Dispatcher:
+    dispatcher = mcauthpy.Dispatcher(protocol_handlers=False)
+    dispatcher.unhandled = lambda client, packet_id, buffer: None
+    return dispatcher
+
+
+def bench_pool(clients, expected: int) -> float:
+    received = 0
+
+    def count(client, packet_id, buffer):
+        nonlocal received
+        received += 1
+
+    dispatcher = create_dispatcher()
+    dispatcher.unhandled = count
+    pool = mcauthpy.ClientPool(dispatcher)
+
+    start = time.perf_counter()
+    for client in clients:
+        pool.add(client)
+    while received < expected:
+        pool.poll()
+    elapsed = time.perf_counter() - start
+
+    pool.close()
+    return elapsed
+
+
+def bench_threads(clients, expected: int) -> float:
+    dispatcher = create_dispatcher()
+
+    def receive(client):
+        received = 0
+        while received < expected:
+            for packet_id, buffer in client.read_packets():
+                dispatcher.dispatch(client, packet_id, buffer)
+                received += 1
+
+    threads = [threading.Thread(target=receive, args=(client,)) for client in clients]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for client in clients:
+        client.socket.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--packets", type=int, default=200000)
+    args = parser.parse_args()
+
+    for connections in args.connections:
+        per_connection = args.packets // connections
+        server = MockMinecraftServer(packets=per_connection).start()
+
+        try:
+            expected = connections * per_connection
+            elapsed = bench_pool(connect(server, connections), expected)
+            print(
+                f"pool     x{connections:<5} {elapsed:8.3f} s  {expected / elapsed:10.0f} packets/s"
+            )
+
+            elapsed = bench_threads(connect(server, connections), per_connection)
+            print(
+                f"threads  x{connections:<5} {elapsed:8.3f} s  {expected / elapsed:10.0f} packets/s"
+            )
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
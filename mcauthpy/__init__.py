@@ -1,7 +1,23 @@
 from .client import *
+from .async_client import *
+from .bulk import *
 from .packet_buffer import *
 from .packet_pack import *
 from .commons import *
 from .database import *
+from .frame_decoder import *
+from .token_cache import *
+from .varint import *
+from .transport import *
+from .compression import *
+from .cipher import *
+from .receive import *
+from .dispatcher import *
+from .keep_alive import *
+from .pool import *
+from .fleet import *
+from .logger import *
+from .metrics import *
+from . import schema
 
 __all__ = []
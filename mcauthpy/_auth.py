@@ -6,13 +6,17 @@ The following functions are:
  - check_game_ownership()
 
 """
-from typing import List
 
-import requests
+from typing import List, Tuple
+from datetime import datetime, timezone
+
+from . import _http
+from .token_cache import TokenCache
+
 import json
 import re
 import base64
-
+import time
 
 CLIENT_ID = "00000000402b5328"
 SCOPE = "service::user.auth.xboxlive.com::MBI_SSL"
@@ -38,7 +42,7 @@ def get_playerdata(uuid: str, decode: bool = True) -> json:
         In data["properties"][0]["value"]["timestamp"] will be the Java time in milliseconds.
 
     """
-    response = requests.get(
+    response = _http.get(
         f"https://sessionserver.mojang.com/session/minecraft/profile/{uuid}"
     )
     data = response.json()
@@ -57,13 +61,11 @@ def get_blocked_servers() -> List[str]:
     Returns:
         List[str]: A list of SHA1 hashes used to check server addresses against when the client tries to connect.
     """
-    return requests.get("https://sessionserver.mojang.com/blockedservers").text.split(
-        "\n"
-    )
+    return _http.get("https://sessionserver.mojang.com/blockedservers").text.split("\n")
 
 
 def check_game_ownership(mc_access_token: str) -> json:
-    response = requests.post(
+    response = _http.post(
         "https://api.minecraftservices.com/entitlements/mcstore",
         headers=_get_auth_header(mc_access_token),
     )
@@ -101,13 +103,13 @@ def get_microsoft_secret(email: str, password: str) -> json:
     """
     redirect_uri = "https://login.live.com/oauth20_desktop.srf"
     login_url = f"https://login.live.com/oauth20_authorize.srf?client_id={CLIENT_ID}&response_type=code&redirect_uri={redirect_uri}&scope={SCOPE}"
-    response = requests.get(login_url)
+    response = _http.get(login_url)
     cookies = response.cookies
     content = response.text
     ppft = re.search('sFTTag:[ ]?\'.*value="(.*)"/>', content).group(1)
     url_post = re.search("urlPost:[ ]?'(.+?(?='))", content).group(1)
 
-    response1 = requests.post(
+    response1 = _http.post(
         url_post,
         cookies=cookies,
         data={"login": email, "loginfmt": email, "passwd": password, "ppft": ppft},
@@ -116,7 +118,7 @@ def get_microsoft_secret(email: str, password: str) -> json:
     auth_code = re.search("[?|&]code=([\\w.-]+)", response1.url).group(1)
 
     url = f"https://login.live.com/oauth20_token.srf"
-    response = requests.post(
+    response = _http.post(
         url,
         headers=HEADER,
         data={
@@ -130,6 +132,30 @@ def get_microsoft_secret(email: str, password: str) -> json:
     return response.json()
 
 
+def refresh_microsoft_secret(refresh_token: str) -> json:
+    """Exchanges a refresh token for new secrets, without the password flow.
+
+    Parameters:
+        refresh_token (str): The refresh token from `get_microsoft_secret()`.
+
+    Returns:
+        json: Data from https://login.live.com/oauth20_token.srf.
+
+    """
+    response = _http.post(
+        "https://login.live.com/oauth20_token.srf",
+        headers=HEADER,
+        data={
+            "client_id": CLIENT_ID,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "redirect_uri": "https://login.live.com/oauth20_desktop.srf",
+            "scope": SCOPE,
+        },
+    )
+    return response.json()
+
+
 def get_xboxlive_secret(access_token: str) -> json:
     """Phase 1 of authenticating to Xbox Live servers.
 
@@ -140,7 +166,7 @@ def get_xboxlive_secret(access_token: str) -> json:
         json: Data containing xboxlive secrets.
 
     """
-    response = requests.post(
+    response = _http.post(
         "https://user.auth.xboxlive.com/user/authenticate",
         headers={"Content-Type": "application/json", "Accept": "application/json"},
         json={
@@ -167,7 +193,7 @@ def get_xbox_secret2(xbl_token: str) -> json:
         json: Data containing Xbox Live security token.
 
     """
-    response = requests.post(
+    response = _http.post(
         "https://xsts.auth.xboxlive.com/xsts/authorize",
         headers={"Content-Type": "application/json", "Accept": "application/json"},
         json={
@@ -191,7 +217,7 @@ def get_minecraft(user_hash: str, xsts_token: str) -> json:
         json: Data containing the user's Minecraft access token.
 
     """
-    response = requests.post(
+    response = _http.post(
         "https://api.minecraftservices.com/authentication/login_with_xbox",
         json={"identityToken": f"XBL3.0 x={user_hash};{xsts_token}"},
     )
@@ -210,7 +236,7 @@ def get_mc_profile(mc_access_token: str) -> json:
         json: A Minecraft profile. Do not share this information with anyone.
 
     """
-    response = requests.get(
+    response = _http.get(
         "https://api.minecraftservices.com/minecraft/profile",
         headers=_get_auth_header(mc_access_token),
     )
@@ -235,6 +261,13 @@ def get_mc_access_token(
     ms_secret = get_microsoft_secret(email, password)
     access_token = ms_secret["access_token"]
 
+    user_hash, xbox_secret2 = _get_xsts(access_token)
+    xsts_token = xbox_secret2["Token"]
+    mc_access_token = get_minecraft(user_hash, xsts_token)["access_token"]
+    return mc_access_token
+
+
+def _get_xsts(access_token: str) -> Tuple[str, json]:
     xbox_secret = get_xboxlive_secret(access_token)
     xbl_token = xbox_secret["Token"]
     user_hash = xbox_secret["DisplayClaims"]["xui"][0]["uhs"]
@@ -243,9 +276,84 @@ def get_mc_access_token(
     if "Token" not in xbox_secret2.keys():
         raise RuntimeError(f"Internal Microsoft Error (Code: {xbox_secret2['XErr']})")
 
-    xsts_token = xbox_secret2["Token"]
-    mc_access_token = get_minecraft(user_hash, xsts_token)["access_token"]
-    return mc_access_token
+    return user_hash, xbox_secret2
+
+
+def _parse_xbox_time(value: str) -> float:
+    # e.g. "2022-05-04T10:30:00.1234567Z", which has too many digits for strptime
+    parsed = datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _get_cached_ms_access_token(
+    email: str, password: str, token_cache: TokenCache, tokens: json
+) -> str:
+    if token_cache.is_valid(tokens, "ms"):
+        return tokens["ms_token"]
+
+    ms_secret = {}
+    if tokens.get("refresh_token"):
+        try:
+            ms_secret = refresh_microsoft_secret(tokens["refresh_token"])
+        except (OSError, ValueError):
+            ms_secret = {}
+
+    if "access_token" not in ms_secret:
+        ms_secret = get_microsoft_secret(email, password)
+
+    token_cache.update(
+        email,
+        refresh_token=ms_secret.get("refresh_token", tokens.get("refresh_token")),
+        ms_token=ms_secret["access_token"],
+        ms_expires_at=time.time() + ms_secret.get("expires_in", 0),
+    )
+    return ms_secret["access_token"]
+
+
+def get_cached_mc_login(
+    email: str, password: str, token_cache: TokenCache
+) -> Tuple[str, json]:
+    """Get a user's Minecraft access token and profile, only repeating the
+    steps of the authentication chain whose cached tokens have expired. The
+    password flow is only used if there is no usable refresh token.
+
+    Parameters:
+        email (str): Your Microsoft email address.
+        password (str): Your Microsoft password.
+        token_cache (TokenCache): The cache to read from and store tokens to.
+
+    Returns:
+        Tuple[str, json]: Your Minecraft access token and your Minecraft profile.
+
+    """
+    tokens = token_cache.get(email)
+    if token_cache.is_valid(tokens, "mc") and tokens.get("profile"):
+        return tokens["mc_token"], tokens["profile"]
+
+    if not token_cache.is_valid(tokens, "xsts"):
+        access_token = _get_cached_ms_access_token(email, password, token_cache, tokens)
+        user_hash, xbox_secret2 = _get_xsts(access_token)
+
+        tokens["user_hash"] = user_hash
+        tokens["xsts_token"] = xbox_secret2["Token"]
+        token_cache.update(
+            email,
+            user_hash=user_hash,
+            xsts_token=xbox_secret2["Token"],
+            xsts_expires_at=_parse_xbox_time(xbox_secret2["NotAfter"]),
+        )
+
+    minecraft = get_minecraft(tokens["user_hash"], tokens["xsts_token"])
+    mc_access_token = minecraft["access_token"]
+    profile = get_mc_profile(mc_access_token)
+
+    token_cache.update(
+        email,
+        mc_token=mc_access_token,
+        mc_expires_at=time.time() + minecraft.get("expires_in", 0),
+        profile=profile,
+    )
+    return mc_access_token, profile
 
 
 def authenticate(mc_access_token: str) -> json:
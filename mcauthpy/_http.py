@@ -0,0 +1,330 @@
+"""
+The HTTP layer shared by the authentication chain and the session server.
+
+Every request goes through one `requests.Session`, so connections to the
+same host are kept alive and reused instead of paying a new TCP and TLS
+handshake for every hop. Tests can swap the session with `set_session()`
+or point a host at a local stand-in server with `override_base_url()`.
+
+Requests to a host can be throttled with `set_rate_limit()`, or only in
+the current context with `scoped_rate_limits()`, and responses with status 429 are retried after the server's Retry-After or
+an exponential backoff.
+
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+import contextlib
+import contextvars
+import requests
+import threading
+import time
+
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+TIMEOUT = 30
+MAX_RETRIES = 5
+BACKOFF = 0.5
+MAX_BACKOFF = 30
+
+_session = None
+_session_lock = threading.Lock()
+_timeout = TIMEOUT
+_max_retries = MAX_RETRIES
+_base_urls: Dict[str, str] = {}
+_rate_limits: Dict[str, "TokenBucket"] = {}
+# Checked before `_rate_limits`; never mutated, only replaced per context.
+_context_rate_limits = contextvars.ContextVar("mcauthpy_rate_limits", default={})
+_metrics = None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        """A thread-safe token bucket.
+
+        Parameters:
+            rate (float): The amount of tokens added per second.
+            capacity (float): The maximum amount of tokens, i.e. the allowed burst.
+
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes one token, waiting until one is available.
+
+        Returns:
+            float: The time waited in seconds.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+
+            # A negative balance reserves a token that is still being refilled.
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def _create_session(pool_connections: int, pool_maxsize: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Cookies are passed explicitly where they are needed. Never keep them
+    # in the shared session, or they would leak between accounts.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the shared session, creating it on first use.
+
+    Returns:
+        requests.Session: The shared session.
+
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session(POOL_CONNECTIONS, POOL_MAXSIZE)
+
+    return _session
+
+
+def set_session(session: Optional[requests.Session]) -> None:
+    """Replaces the shared session, e.g. with one that is mocked in tests.
+
+    Parameters:
+        session (Optional[requests.Session]): The new session. If None, a default one will be created on next use.
+
+    """
+    global _session
+
+    with _session_lock:
+        _session = session
+
+
+def configure_session(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    timeout: float = TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+) -> None:
+    """Replaces the shared session with a newly configured one.
+
+    Parameters:
+        pool_connections (int): The amount of hosts to keep connection pools for.
+        pool_maxsize (int): The maximum amount of kept-alive connections per host.
+        timeout (float): The timeout of every request in seconds.
+        max_retries (int): How often a request answered with status 429 is retried.
+
+    """
+    global _session, _timeout, _max_retries
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+
+        _session = _create_session(pool_connections, pool_maxsize)
+        _timeout = timeout
+        _max_retries = max_retries
+
+
+def set_rate_limit(
+    base_url: str, rate: Optional[float], burst: Optional[float] = None
+) -> None:
+    """Limits the requests sent to a host with a token bucket.
+
+    >>> set_rate_limit("https://api.minecraftservices.com", 2, burst=10)
+
+    Parameters:
+        base_url (str): The scheme and host to limit.
+        rate (Optional[float]): The allowed requests per second. If None, the limit is removed.
+        burst (Optional[float]): The allowed burst of requests; defaults to `rate`.
+
+    """
+    base_url = base_url.rstrip("/")
+
+    if rate is None:
+        _rate_limits.pop(base_url, None)
+    else:
+        _rate_limits[base_url] = TokenBucket(rate, max(burst or rate, 1))
+
+
+def clear_rate_limits() -> None:
+    """Removes every rate limit."""
+    _rate_limits.clear()
+
+
+def push_rate_limits(
+    rate_limits: Dict[str, Tuple[float, Optional[float]]],
+) -> contextvars.Token:
+    """Applies rate limits to the requests of the current context only, e.g.
+    one thread, over the limits of `set_rate_limit()`. Every context copied
+    from it afterwards shares the same token buckets.
+
+    Parameters:
+        rate_limits (Dict[str, Tuple[float, Optional[float]]]): Requests per second and burst per base URL.
+
+    Returns:
+        contextvars.Token: Restores the previous limits of the context; `scoped_rate_limits()` does so when its block exits.
+
+    """
+    buckets = dict(_context_rate_limits.get())
+    for base_url, (rate, burst) in rate_limits.items():
+        buckets[base_url.rstrip("/")] = TokenBucket(rate, max(burst or rate, 1))
+
+    return _context_rate_limits.set(buckets)
+
+
+@contextlib.contextmanager
+def scoped_rate_limits(
+    rate_limits: Dict[str, Tuple[float, Optional[float]]],
+) -> Iterator[None]:
+    """Applies rate limits to the requests of the current context until the
+    block exits, see `push_rate_limits()`. Other threads are not affected.
+
+    >>> with scoped_rate_limits({"https://api.minecraftservices.com": (2, 10)}):
+    ...     ...
+
+    Parameters:
+        rate_limits (Dict[str, Tuple[float, Optional[float]]]): Requests per second and burst per base URL.
+
+    """
+    token = push_rate_limits(rate_limits)
+    try:
+        yield
+    finally:
+        _context_rate_limits.reset(token)
+
+
+def override_base_url(base_url: str, replacement: Optional[str]) -> None:
+    """Sends every request for `base_url` to `replacement` instead.
+
+    >>> override_base_url("https://user.auth.xboxlive.com", "http://127.0.0.1:8080")
+
+    Parameters:
+        base_url (str): The scheme and host to override.
+        replacement (Optional[str]): The new scheme, host and optional path prefix. If None, the override is removed.
+
+    """
+    base_url = base_url.rstrip("/")
+
+    if replacement is None:
+        _base_urls.pop(base_url, None)
+    else:
+        _base_urls[base_url] = replacement.rstrip("/")
+
+
+def set_metrics(metrics) -> None:
+    """Records the latency of every request per endpoint (host and path) in
+    the `http` stage of `metrics`, and counts the responses with status 429
+    as `http_retries`.
+
+    Parameters:
+        metrics (Optional[mcauthpy.Metrics]): The metrics. If None, nothing is recorded.
+
+    """
+    global _metrics
+
+    _metrics = metrics
+
+
+def clear_base_url_overrides() -> None:
+    """Removes every base URL override."""
+    _base_urls.clear()
+
+
+def resolve_url(url: str) -> str:
+    """Applies the base URL overrides to `url`.
+
+    Parameters:
+        url (str): The URL to resolve.
+
+    Returns:
+        str: The URL the request is actually sent to.
+
+    """
+    for base_url, replacement in _base_urls.items():
+        if url == base_url or url.startswith(base_url + "/"):
+            return replacement + url[len(base_url) :]
+
+    return url
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Sends a request through the shared session.
+
+    Parameters:
+        method (str): The HTTP method.
+        url (str): The URL, before base URL overrides are applied.
+        **kwargs: Passed to `requests.Session.request()`.
+
+    Returns:
+        requests.Response: The response.
+
+    """
+    kwargs.setdefault("timeout", _timeout)
+
+    split_url = urlsplit(url)
+    base_url = f"{split_url.scheme}://{split_url.netloc}"
+    bucket = _context_rate_limits.get().get(base_url)
+    if bucket is None:
+        bucket = _rate_limits.get(base_url)
+    resolved_url = resolve_url(url)
+
+    metrics = _metrics
+    endpoint = split_url.netloc + split_url.path
+
+    for attempt in range(_max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+
+        if metrics is None:
+            response = get_session().request(method, resolved_url, **kwargs)
+        else:
+            start = time.perf_counter()
+            response = get_session().request(method, resolved_url, **kwargs)
+            metrics.observe("http", time.perf_counter() - start, endpoint)
+
+        if response.status_code != 429 or attempt == _max_retries:
+            return response
+
+        if metrics is not None:
+            metrics.count("http_retries", 1, endpoint)
+
+        time.sleep(_get_backoff(response, attempt))
+
+
+def _get_backoff(response: requests.Response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(int(retry_after), MAX_BACKOFF)
+
+    return min(BACKOFF * 2**attempt, MAX_BACKOFF)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
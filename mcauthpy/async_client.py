@@ -0,0 +1,443 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import asyncio
+import functools
+import time
+
+from .client import Client
+from .commons import (
+    CLIENTBOUND_KEEP_ALIVE,
+    ENCRYPTION_REQUEST,
+    ENCRYPTION_RESPONSE,
+    LOGIN_SUCCESS,
+    SERVERBOUND_KEEP_ALIVE,
+)
+from .logger import log
+from .packet_buffer import PacketBuffer
+from .packet_pack import pack_varint
+from .schema import HANDSHAKE, LOGIN_START, PacketSchema
+from .token_cache import TokenCache
+
+
+class AsyncClient(Client):
+    def __init__(self) -> None:
+        """An asyncio version of `mcauthpy.Client`, so one event loop can drive
+        many connections. Do not use mcauthpy.AsyncClient() directly. Use either
+        >>> await mcauthpy.AsyncClient.login_from_microsoft()
+        >>> mcauthpy.AsyncClient.login_from_username()
+        """
+        super().__init__()
+        self.reader = None
+        self.writer = None
+
+    @classmethod
+    async def login_from_microsoft(
+        cls, email: str, password: str, token_cache: TokenCache = None
+    ) -> "AsyncClient":
+        """Initializes the client, see `mcauthpy.Client.login_from_microsoft()`.
+        The blocking authentication requests run in the event loop's executor.
+
+        Parameters:
+            email (str): The Microsoft account's email address.
+            password (str): The Microsoft account's password.
+            token_cache (TokenCache): If given, cached tokens are reused instead of running the whole authentication chain.
+
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                Client.login_from_microsoft.__func__,
+                cls,
+                email,
+                password,
+                token_cache,
+            ),
+        )
+
+    async def connect(
+        self, server_ip: str, server_port: int = 25565, protocol_version: int = 758
+    ) -> None:
+        """Connects to a server with specified server ip, server port, and protocol version.
+
+        Parameters:
+            server_ip (str): The server's ip address.
+            server_port (int): The server's port; 25565 is the default for most servers.
+            protocol_version (int): The Minecraft: Java Edition protocol version. (ex: 758 = 1.18.2)
+
+        """
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.protocol_version = protocol_version
+        self.reader, self.writer = await asyncio.open_connection(
+            self.server_ip, self.server_port
+        )
+        log.debug(
+            "Connected to %s:%d with protocol %d",
+            server_ip,
+            server_port,
+            protocol_version,
+        )
+
+    async def close(self) -> None:
+        """Closes the connection to the server."""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def get_received_buffer(self) -> Tuple[int, PacketBuffer]:
+        """Waits for the next packet sent from the server.
+
+        Returns:
+            Tuple[int, PacketBuffer]: The packet's id and its data.
+
+        """
+        if self._packet_queue is not None:
+            return await self._get_queued(True)
+
+        return await self._unpack_frame_async(await self._read_frame())
+
+    async def iter_packets(self) -> AsyncIterator[Tuple[int, PacketBuffer]]:
+        """Yields every packet that is already buffered. Only reads from the
+        connection, once, if no complete packet is buffered yet.
+
+        Returns:
+            AsyncIterator[Tuple[int, PacketBuffer]]: The packets' ids and their data.
+
+        """
+        if self._packet_queue is not None:
+            yield await self._get_queued(True)
+            while not self._packet_queue.empty():
+                yield await self._get_queued(False)
+            return
+
+        yield await self._unpack_frame_async(await self._read_frame())
+
+        for frame in self.decoder.frames():
+            yield await self._unpack_frame_async(frame)
+
+    async def read_packets(self, max_n: int = 256) -> List[Tuple[int, PacketBuffer]]:
+        """Reads a batch of packets, see `iter_packets()`.
+
+        Parameters:
+            max_n (int): The maximum amount of packets to return.
+
+        Returns:
+            List[Tuple[int, PacketBuffer]]: The packets' ids and their data.
+
+        """
+        if self._packet_queue is not None:
+            packets = [await self._get_queued(True)]
+            while len(packets) < max_n and not self._packet_queue.empty():
+                packets.append(await self._get_queued(False))
+            return packets
+
+        return await self._read_packets(max_n)
+
+    async def _read_packets(self, max_n: int = 256) -> List[Tuple[int, PacketBuffer]]:
+        packets = [await self._unpack_frame_async(await self._read_frame())]
+
+        while len(packets) < max_n:
+            frame = self.decoder.next_frame()
+            if frame is None:
+                break
+            packets.append(await self._unpack_frame_async(frame))
+
+        return packets
+
+    async def _get_queued(self, block: bool) -> Tuple[int, PacketBuffer]:
+        if block:
+            packet = await self._packet_queue.get()
+        else:
+            packet = self._packet_queue.get_nowait()
+
+        if isinstance(packet, Exception):
+            # The task stopped; the error stays for every later read.
+            self._packet_queue.put_nowait(packet)
+            raise packet
+        return packet
+
+    def start_keep_alive(self) -> asyncio.Task:
+        """Reads the connection in a background task from now on, see
+        `mcauthpy.Client.start_keep_alive()`. Call it after `login()`.
+
+        Returns:
+            asyncio.Task: The background task.
+
+        """
+        if self.keep_alive is not None:
+            return self.keep_alive
+
+        if self.subscriptions is not None:
+            self.subscriptions.add(CLIENTBOUND_KEEP_ALIVE)
+
+        self._packet_queue = asyncio.Queue()
+        self.keep_alive = asyncio.create_task(self._keep_alive())
+        return self.keep_alive
+
+    async def stop_keep_alive(self) -> List[Tuple[int, PacketBuffer]]:
+        """Stops the background task, so the connection is read directly again.
+
+        Returns:
+            List[Tuple[int, PacketBuffer]]: The packets the task read that were not returned yet.
+
+        """
+        if self.keep_alive is None:
+            return []
+
+        self.keep_alive.cancel()
+        try:
+            await self.keep_alive
+        except asyncio.CancelledError:
+            pass
+        self.keep_alive = None
+
+        packets, self._packet_queue = self._packet_queue, None
+        leftover = []
+        while not packets.empty():
+            packet = packets.get_nowait()
+            if not isinstance(packet, Exception):
+                leftover.append(packet)
+
+        return leftover
+
+    async def _keep_alive(self) -> None:
+        try:
+            while True:
+                for packet_id, buffer in await self._read_packets():
+                    if packet_id == CLIENTBOUND_KEEP_ALIVE:
+                        await self.answer_keep_alive(buffer, time.monotonic())
+                    else:
+                        self._packet_queue.put_nowait((packet_id, buffer))
+        except Exception as e:
+            self._packet_queue.put_nowait(e)
+
+    async def answer_keep_alive(
+        self, buffer: PacketBuffer, received: Optional[float] = None
+    ) -> None:
+        """Answers a Keep Alive packet, see `mcauthpy.Client.answer_keep_alive()`.
+
+        Parameters:
+            buffer (PacketBuffer): The Keep Alive's data.
+            received (Optional[float]): When it was read, from `time.monotonic()`; now if None.
+
+        """
+        if received is None:
+            received = time.monotonic()
+
+        keep_alive_id = buffer.read(8)
+        # Encrypting and writing happen without yielding to the event loop, so
+        # the answer cannot interleave with other packets.
+        await self.send_urgent(SERVERBOUND_KEEP_ALIVE, keep_alive_id)
+        self.keep_alive_stats.record(
+            int.from_bytes(keep_alive_id, "big", signed=True),
+            received,
+            time.monotonic(),
+        )
+
+    async def _unpack_frame_async(self, frame: bytes) -> Tuple[int, PacketBuffer]:
+        # Large frames are decompressed off the event loop.
+        if self.compression.should_offload(len(frame)):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.compression.executor, self._unpack_frame, frame
+            )
+
+        return self._unpack_frame(frame)
+
+    def _feed(self, received_data: bytes) -> None:
+        if self.cipher is not None:
+            received_data = self._decrypt(received_data)
+
+        self.decoder.feed(received_data)
+
+    async def _receive(self) -> int:
+        received_data = await self.reader.read(self.read_size)
+        if not received_data:
+            raise ConnectionError("Connection closed by the server")
+
+        self.receiver.record(len(received_data))
+        self._feed(received_data)
+        return len(received_data)
+
+    async def _read_frame(self) -> bytes:
+        frame = self.decoder.next_frame()
+
+        while frame is None:
+            if self.decoder.pending_length is not None:
+                self.receiver.expect(self.decoder.pending_length)
+            await self._receive()
+            frame = self.decoder.next_frame()
+
+        return frame
+
+    async def _login(self) -> None:
+        await self.write_schema(
+            HANDSHAKE, self.protocol_version, self.server_ip, self.server_port, 2
+        )
+
+        await self.write_schema(LOGIN_START, self.username)
+
+    async def client_auth(self, buffer: Union[bytes, PacketBuffer]) -> None:
+        """Answers an Encryption Request and enables encryption. The session
+        server is joined on the default executor while the shared secret is
+        encrypted with the server's public key.
+
+        Parameters:
+            buffer (Union[bytes, PacketBuffer]): The Encryption Request's fields, or the whole packet as received.
+
+        """
+        public_key, verify_token, shared_secret, server_hash = self._prepare_auth(
+            buffer
+        )
+        loop = asyncio.get_running_loop()
+        join = loop.run_in_executor(None, self._timed_join, server_hash)
+
+        start = time.perf_counter()
+        encrypted_secret, encrypted_token = self._encrypt_secret(
+            public_key, shared_secret, verify_token
+        )
+        self.login_timings["encryption"] = time.perf_counter() - start
+
+        await join
+
+        await self.write_packet(
+            ENCRYPTION_RESPONSE,
+            pack_varint(len(encrypted_secret)),
+            encrypted_secret,
+            pack_varint(len(encrypted_token)),
+            encrypted_token,
+        )
+
+        self._enable_encryption(shared_secret)
+
+    async def login(self) -> Dict[str, float]:
+        """Logs in to the connected server, see `Client.login()`.
+
+        Returns:
+            Dict[str, float]: The seconds the login took in total and per phase.
+
+        """
+        timings = self.login_timings = {"wait": 0.0}
+        start = time.perf_counter()
+        await self._login()
+        timings["handshake"] = time.perf_counter() - start
+
+        while True:
+            waited = time.perf_counter()
+            frame = await self._read_frame()
+            timings["wait"] += time.perf_counter() - waited
+
+            packet_id, data = self._unpack_body(frame)
+            buffer = PacketBuffer(data)
+
+            if packet_id == LOGIN_SUCCESS:
+                self.login_success = buffer
+                break
+
+            if packet_id == ENCRYPTION_REQUEST:
+                await self.client_auth(buffer)
+            else:
+                reply = self._handle_login_packet(packet_id, buffer)
+                if reply is not None:
+                    await self.write_packet(*reply)
+
+        self._logged_in(start)
+        return timings
+
+    async def send_packet(self, packet_id: int, *fields: Tuple[bytes]) -> bytes:
+        """Sends a packet to the connected server. Inside `batch()` it is only
+        queued, and the connection is not drained. `write_packet()` does the
+        same without joining the sent bytes into one object.
+
+        Parameters:
+            packet_id (int): The packet's id in hexadecimal format (preferably).
+            *fields (Tuple[bytes]): The packed data to send to the server.
+
+        Returns:
+            bytes: The packet that is sent to the server.
+
+        """
+        return b"".join(await self._send(packet_id, fields))
+
+    async def write_packet(self, packet_id: int, *fields: Tuple[bytes]) -> int:
+        """Sends a packet to the connected server, without concatenating its
+        fields. Inside `batch()` it is only queued, and the connection is not
+        drained.
+
+        Parameters:
+            packet_id (int): The packet's id in hexadecimal format (preferably).
+            *fields (Tuple[bytes]): The packed data to send to the server.
+
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        return sum(len(buffer) for buffer in await self._send(packet_id, fields))
+
+    async def _send(self, packet_id: int, fields: Tuple[bytes]) -> List[bytes]:
+        buffers = self._encode_packet(packet_id, fields)
+        self.writer.writelines(buffers)
+
+        if not self._cork_depth:
+            await self.writer.drain()
+        return buffers
+
+    async def send_urgent(self, packet_id: int, *fields: Tuple[bytes]) -> int:
+        """Sends a packet and drains the connection, even inside `batch()`.
+
+        Parameters:
+            packet_id (int): The packet's id in hexadecimal format (preferably).
+            *fields (Tuple[bytes]): The packed data to send to the server.
+
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        buffers = self._encode_packet(packet_id, fields)
+        self.writer.writelines(buffers)
+
+        await self.writer.drain()
+        return sum(len(buffer) for buffer in buffers)
+
+    async def send_schema(self, schema: PacketSchema, *values) -> bytes:
+        """Packs and sends a packet described by a schema.
+
+        Parameters:
+            schema (PacketSchema): The packet's schema.
+            *values: One value per field of the schema.
+
+        Returns:
+            bytes: The packet that is sent to the server.
+
+        """
+        return await self.send_packet(schema.packet_id, schema.encode_fields(*values))
+
+    async def write_schema(self, schema: PacketSchema, *values) -> int:
+        """Packs and sends a packet described by a schema, like `write_packet()`.
+
+        Parameters:
+            schema (PacketSchema): The packet's schema.
+            *values: One value per field of the schema.
+
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        return await self.write_packet(schema.packet_id, schema.encode_fields(*values))
+
+    def flush(self) -> None:
+        # The transport already buffers every write; `drain()` waits for it.
+        pass
+
+    async def drain(self) -> None:
+        """Waits until the queued packets are sent, e.g. after `batch()`."""
+        await self.writer.drain()
+
+    async def raw_read(self, bytes_size: int = 1024) -> bytes:
+        """Reads data sent from the server.
+
+        Returns:
+            bytes: The raw data.
+
+        """
+        return await self.reader.read(bytes_size)
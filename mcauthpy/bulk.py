@@ -0,0 +1,65 @@
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import contextvars
+
+from . import _http
+from .client import Client
+from .token_cache import TokenCache
+
+
+def login_many(
+    credentials: Iterable[Tuple[str, str]],
+    max_workers: int = 8,
+    token_cache: Optional[TokenCache] = None,
+    rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> Iterator[Tuple[str, Union[Client, Exception]]]:
+    """Logs many Microsoft accounts in concurrently and yields every client
+    as soon as it is ready.
+
+    The authentication chains run on a bounded thread pool and share the
+    keep-alive connections of `mcauthpy._http`, so `max_workers` should not
+    be larger than its `pool_maxsize`. Responses with status 429 are retried
+    with a backoff.
+
+    >>> for email, client in mcauthpy.login_many([("email", "password")]):
+    ...     client.connect("localhost")
+
+    Parameters:
+        credentials (Iterable[Tuple[str, str]]): The email addresses and passwords.
+        max_workers (int): The amount of logins that run at the same time.
+        token_cache (Optional[TokenCache]): If given, cached tokens are reused.
+        rate_limits (Optional[Dict[str, Tuple[float, float]]]): Requests per second and burst per base URL, see `mcauthpy._http.set_rate_limit()`; they only apply to this call's logins.
+
+    Returns:
+        Iterator[Tuple[str, Union[Client, Exception]]]: The email address and either the client or the exception its login raised.
+
+    """
+    # The logins run in copies of a context of their own, so the limits
+    # neither leak into the caller nor into other calls.
+    context = contextvars.copy_context()
+    if rate_limits:
+        context.run(_http.push_rate_limits, rate_limits)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        futures = {
+            executor.submit(
+                context.copy().run,
+                Client.login_from_microsoft,
+                email,
+                password,
+                token_cache,
+            ): email
+            for email, password in credentials
+        }
+
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,173 @@
+"""
+AES/CFB8 stream ciphers for online-mode connections.
+
+CFB8 runs one AES block operation per byte, which makes it the biggest CPU
+cost of an encrypted connection. Every backend keeps its cipher state for
+the whole connection and can decrypt into a preallocated buffer;
+`create_cipher()` picks the fastest one that is installed:
+
+1. ``cryptography`` (OpenSSL)
+2. ``pycryptodome``
+
+"""
+
+from typing import Dict, List, Optional, Type
+
+import abc
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+
+    try:
+        # CFB8 moved to the decrepit package in cryptography 43.
+        from cryptography.hazmat.decrepit.ciphers.modes import CFB8
+    except ImportError:
+        from cryptography.hazmat.primitives.ciphers.modes import CFB8
+except ImportError:
+    Cipher = None
+
+try:
+    from Crypto.Cipher import AES
+except ImportError:
+    AES = None
+
+
+class CFB8Cipher(abc.ABC):
+    name = None
+    # Extra room `decrypt_into()` needs in its output buffer.
+    overhead = 0
+
+    def __init__(self, key: bytes) -> None:
+        """An AES/CFB8 cipher with the shared secret as key and IV, like the
+        protocol uses. One instance encrypts or decrypts a whole connection.
+
+        Parameters:
+            key (bytes): The 16 byte shared secret.
+
+        """
+        self.key = key
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return False
+
+    @abc.abstractmethod
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypts the next bytes of the stream.
+
+        Parameters:
+            data (bytes): The bytes-like data to encrypt.
+
+        Returns:
+            bytes: The encrypted data.
+
+        """
+
+    @abc.abstractmethod
+    def decrypt(self, data: bytes) -> bytes:
+        """Decrypts the next bytes of the stream.
+
+        Parameters:
+            data (bytes): The bytes-like data to decrypt.
+
+        Returns:
+            bytes: The decrypted data.
+
+        """
+
+    @abc.abstractmethod
+    def decrypt_into(self, data: bytes, out: bytearray) -> memoryview:
+        """Decrypts the next bytes of the stream into a preallocated buffer.
+
+        Parameters:
+            data (bytes): The bytes-like data to decrypt.
+            out (bytearray): The buffer to write to, at least `len(data) + overhead` bytes.
+
+        Returns:
+            memoryview: The decrypted part of `out`.
+
+        """
+
+
+class CryptographyCipher(CFB8Cipher):
+    name = "cryptography"
+    overhead = 15
+
+    def __init__(self, key: bytes) -> None:
+        super().__init__(key)
+        cipher = Cipher(algorithms.AES(key), CFB8(key))
+        self._encryptor = cipher.encryptor()
+        self._decryptor = cipher.decryptor()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return Cipher is not None
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._encryptor.update(data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return self._decryptor.update(data)
+
+    def decrypt_into(self, data: bytes, out: bytearray) -> memoryview:
+        size = self._decryptor.update_into(data, out)
+        return memoryview(out)[:size]
+
+
+class PycryptodomeCipher(CFB8Cipher):
+    name = "pycryptodome"
+
+    def __init__(self, key: bytes) -> None:
+        super().__init__(key)
+        self._encryptor = AES.new(key, AES.MODE_CFB, segment_size=8, iv=key)
+        self._decryptor = AES.new(key, AES.MODE_CFB, segment_size=8, iv=key)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return AES is not None
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._encryptor.encrypt(data)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return self._decryptor.decrypt(data)
+
+    def decrypt_into(self, data: bytes, out: bytearray) -> memoryview:
+        out = memoryview(out)[: len(data)]
+        self._decryptor.decrypt(data, output=out)
+        return out
+
+
+BACKENDS: Dict[str, Type[CFB8Cipher]] = {
+    backend.name: backend for backend in [CryptographyCipher, PycryptodomeCipher]
+}
+
+
+def available_backends() -> List[str]:
+    """Returns the names of the installed cipher backends, fastest first."""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def create_cipher(key: bytes, backend: Optional[str] = None) -> CFB8Cipher:
+    """Creates an AES/CFB8 cipher for a connection; it encrypts the sent and
+    decrypts the received stream, each with its own state.
+
+    Parameters:
+        key (bytes): The 16 byte shared secret.
+        backend (Optional[str]): The backend's name; the fastest installed one if None.
+
+    Returns:
+        CFB8Cipher: The cipher.
+
+    """
+    if backend is None:
+        backends = available_backends()
+        if not backends:
+            raise ImportError("Install cryptography or pycryptodome for encryption")
+        backend = backends[0]
+
+    cipher_class = BACKENDS[backend]
+    if not cipher_class.is_available():
+        raise ImportError(f"The {backend} cipher backend is not installed")
+
+    return cipher_class(key)
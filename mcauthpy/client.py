@@ -1,30 +1,56 @@
-from typing import Tuple
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+import contextlib
+import logging
+import queue
 import socket
+import threading
+import time
 import os
 import hashlib
-import requests
-import copy
-import zlib
 
-from ._auth import authenticate, get_mc_access_token
-from .commons import LOGIN_MODE, PLAY_MODE
-from .packet_buffer import PacketBuffer
+from . import _http
+from ._auth import authenticate, get_cached_mc_login, get_mc_access_token
+from .cipher import create_cipher
+from .commons import (
+    CLIENTBOUND_KEEP_ALIVE,
+    ENCRYPTION_REQUEST,
+    ENCRYPTION_RESPONSE,
+    LOGIN_DISCONNECT,
+    LOGIN_MODE,
+    LOGIN_PLUGIN_REQUEST,
+    LOGIN_PLUGIN_RESPONSE,
+    LOGIN_SUCCESS,
+    PLAY_MODE,
+    SERVERBOUND_KEEP_ALIVE,
+    SET_COMPRESSION,
+)
+from .compression import CompressionPolicy
+from .frame_decoder import FrameDecoder
+from .keep_alive import KeepAliveStats, KeepAliveThread
+from .logger import log
+from .metrics import Metrics
+from .packet_buffer import LazyPacketBuffer, PacketBuffer
+from .receive import ReceiveEngine
+from .schema import HANDSHAKE, LOGIN_START, PacketSchema
+from .token_cache import TokenCache
+from .transport import send_buffers, write_buffers
+from .varint import decode_varint
 from .packet_pack import (
     minecraft_sha1_hash,
-    pack_string,
-    pack_unsigned_short,
     pack_varint,
 )
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
 from cryptography.hazmat.primitives.serialization import load_der_public_key
-from Crypto.Cipher import AES
 
 SEGMENT_BITS = 0x7F
 CONTINUE_BIT = 0x80
 
+# Not available on Windows, where batches only drain what is already buffered.
+MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
 
 class Client:
     def __init__(self) -> None:
@@ -32,8 +58,27 @@ class Client:
         >>> mcauthpy.Client.login_from_microsoft()
         >>> mcauthpy.Client.login_from_username()
         """
-        self.buffer = PacketBuffer(b"")
+        self.decoder = FrameDecoder()
+        self.receiver = ReceiveEngine()
+        self._send_queue = []
+        self._cork_depth = 0
+        # Set to a list by `ClientPool`: what a non-blocking socket did not
+        # take yet, written once it is writable again.
+        self._unsent: Optional[List[bytes]] = None
+        self._on_unsent = None
         self.cipher = None
+        self.cipher_backend = None
+        self._decrypt_buffer = None
+        self.compression = CompressionPolicy()
+        self.subscriptions = None
+        self.lazy_packets = False
+        self.keep_alive = None
+        self.keep_alive_stats = KeepAliveStats()
+        self._packet_queue = None
+        self._send_lock = threading.Lock()
+        self.metrics: Optional[Metrics] = None
+        self.login_timings: Dict[str, float] = {}
+        self.login_success: Optional[PacketBuffer] = None
 
         self._timeout = 5
         self.socket = None
@@ -48,27 +93,55 @@ class Client:
         self.server_online_mode = None
 
     @classmethod
-    def login_from_microsoft(cls, email: str, password: str) -> "Client":
+    def login_from_microsoft(
+        cls, email: str, password: str, token_cache: TokenCache = None
+    ) -> "Client":
         """Initializes the client. The account must be
         migrated from Mojang! All packets are encrypted.
 
         Parameters:
             email (str): The Microsoft account's email address.
             password (str): The Microsoft account's password.
+            token_cache (TokenCache): If given, cached tokens are reused instead of running the whole authentication chain.
 
         """
         instance = cls()
 
         instance.email = email
         instance.password = password
-        instance._mctoken = get_mc_access_token(instance.email, instance.password)
-        instance._mcprofile = authenticate(instance._mctoken)
+
+        if token_cache is not None:
+            instance._mctoken, instance._mcprofile = get_cached_mc_login(
+                instance.email, instance.password, token_cache
+            )
+        else:
+            instance._mctoken = get_mc_access_token(instance.email, instance.password)
+            instance._mcprofile = authenticate(instance._mctoken)
 
         instance.username = instance._mcprofile["name"]
         instance.server_online_mode = True
 
         return instance
 
+    @classmethod
+    def from_token(cls, access_token: str, profile: dict) -> "Client":
+        """Initializes the client from a Minecraft access token and profile
+        that were already obtained, e.g. by another process. All packets are
+        encrypted.
+
+        Parameters:
+            access_token (str): The Minecraft access token.
+            profile (dict): The Minecraft profile, with at least its "id" and "name".
+
+        """
+        instance = cls()
+        instance._mctoken = access_token
+        instance._mcprofile = profile
+        instance.username = profile["name"]
+        instance.server_online_mode = True
+
+        return instance
+
     @classmethod
     def login_from_username(cls, username: str) -> "Client":
         """Initializes the client. All packets are NOT encrypted.
@@ -104,161 +177,714 @@ class Client:
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # self.socket.settimeout(self._timeout)
         self.socket.connect((self.server_ip, self.server_port))
+        log.debug(
+            "Connected to %s:%d with protocol %d",
+            server_ip,
+            server_port,
+            protocol_version,
+        )
+
+    @property
+    def read_size(self) -> int:
+        """How many bytes are read from the socket at once; adapts to the traffic."""
+        return self.receiver.size
 
     def get_received_buffer(self) -> Tuple[int, PacketBuffer]:
-        while True:
-            received_data = self.socket.recv(1024)
-            if self.cipher is not None:
-                received_data = self.cipher.decrypt(received_data)
+        """Waits for the next packet sent from the server.
 
-            self.buffer.add(received_data)
-            self.saved_buffer = copy.copy(self.buffer.data)
+        Returns:
+            Tuple[int, PacketBuffer]: The packet's id and its data.
 
-            packet_length = self.buffer.unpack_varint()
+        """
+        if self._packet_queue is not None:
+            return self._get_queued(True)
 
-            if packet_length > len(self.buffer.data):
-                self.buffer.data = self.saved_buffer
-                continue
+        metrics = self.metrics
+        if metrics is None:
+            return self._unpack_frame(self._read_frame())
 
-            packet = PacketBuffer(self.buffer.read(packet_length))
+        start = time.perf_counter()
+        packet = self._unpack_frame(self._read_frame())
+        metrics.observe("read", time.perf_counter() - start)
+        return packet
 
-            if self.compression_threshold != -1:
-                data_length = packet.unpack_varint()
+    def iter_packets(self) -> Iterator[Tuple[int, PacketBuffer]]:
+        """Yields every packet that is already buffered, plus the ones from one
+        more socket read. Only blocks if no complete packet is buffered yet.
 
-                if data_length > 0:
-                    uncompressed_data = PacketBuffer(zlib.decompress(packet.data))
-                else:
-                    uncompressed_data = PacketBuffer(packet.data)
+        Returns:
+            Iterator[Tuple[int, PacketBuffer]]: The packets' ids and their data.
 
-                packet_id = uncompressed_data.unpack_varint()
-                uncompressed_data = uncompressed_data.data
+        """
+        if self._packet_queue is not None:
+            yield self._get_queued(True)
+            while not self._packet_queue.empty():
+                yield self._get_queued(False)
+            return
 
-            else:
-                packet_id = packet.unpack_varint()
-                uncompressed_data = packet.unpack_byte_array(packet_length)
+        frame = self.decoder.next_frame()
+
+        if frame is None:
+            frame = self._read_frame()
+        elif MSG_DONTWAIT:
+            self._receive(MSG_DONTWAIT)
+
+        yield self._unpack_frame(frame)
+
+        for frame in self.decoder.frames():
+            yield self._unpack_frame(frame)
+
+    def read_packets(self, max_n: int = 256) -> List[Tuple[int, PacketBuffer]]:
+        """Reads a batch of packets, see `iter_packets()`.
+
+        Parameters:
+            max_n (int): The maximum amount of packets to return.
+
+        Returns:
+            List[Tuple[int, PacketBuffer]]: The packets' ids and their data.
+
+        """
+        if self._packet_queue is not None:
+            packets = [self._get_queued(True)]
+            while len(packets) < max_n and not self._packet_queue.empty():
+                packets.append(self._get_queued(False))
+            return packets
+
+        return self._read_packets(max_n)
+
+    def _read_packets(self, max_n: int = 256) -> List[Tuple[int, PacketBuffer]]:
+        frame = self.decoder.next_frame()
+
+        if frame is None:
+            frame = self._read_frame()
+        elif MSG_DONTWAIT:
+            self._receive(MSG_DONTWAIT)
+
+        frames = [frame]
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+
+        while len(frames) < max_n:
+            frame = self.decoder.next_frame()
+            if frame is None:
+                break
+            frames.append(frame)
+
+        if metrics is not None:
+            metrics.observe("frame", time.perf_counter() - start)
+
+        # Large frames are decompressed on the policy's executor, while the
+        # rest are unpacked here; the order of the packets is kept.
+        packets = [
+            (
+                self.compression.executor.submit(self._unpack_frame, frame)
+                if self.compression.should_offload(len(frame))
+                else self._unpack_frame(frame)
+            )
+            for frame in frames
+        ]
+
+        return [
+            packet if isinstance(packet, tuple) else packet.result()
+            for packet in packets
+        ]
+
+    def _get_queued(self, block: bool) -> Tuple[int, PacketBuffer]:
+        packet = self._packet_queue.get(block)
+        if isinstance(packet, Exception):
+            # The thread stopped; the error stays for every later read.
+            self._packet_queue.put(packet)
+            raise packet
+        return packet
+
+    def start_keep_alive(self) -> KeepAliveThread:
+        """Reads the connection on a background thread from now on, which
+        answers Keep Alives right away even while the caller is busy. Other
+        packets are still returned by `get_received_buffer()`,
+        `iter_packets()` and `read_packets()`. Call it after `login()`.
+
+        Returns:
+            KeepAliveThread: The background thread.
+
+        """
+        if self.keep_alive is not None:
+            return self.keep_alive
+
+        if self.subscriptions is not None:
+            self.subscriptions.add(CLIENTBOUND_KEEP_ALIVE)
+
+        self._packet_queue = queue.Queue()
+        self.keep_alive = KeepAliveThread(self)
+        self.keep_alive.start()
+        return self.keep_alive
+
+    def stop_keep_alive(
+        self, timeout: Optional[float] = 5
+    ) -> List[Tuple[int, PacketBuffer]]:
+        """Stops the background thread, so the connection is read directly
+        again. Raises TimeoutError if the thread does not stop in time, e.g.
+        while a send blocks; it keeps running then.
+
+        Parameters:
+            timeout (Optional[float]): Seconds to wait for the thread at most; forever if None.
+
+        Returns:
+            List[Tuple[int, PacketBuffer]]: The packets the thread read that were not returned yet.
+
+        """
+        if self.keep_alive is None:
+            return []
+
+        self.keep_alive.stop()
+        self.keep_alive.join(timeout)
+        if self.keep_alive.is_alive():
+            raise TimeoutError("The Keep Alive thread did not stop in time")
+        self.keep_alive = None
+
+        packets, self._packet_queue = self._packet_queue, None
+        leftover = []
+        while not packets.empty():
+            packet = packets.get_nowait()
+            if not isinstance(packet, Exception):
+                leftover.append(packet)
+
+        return leftover
+
+    def answer_keep_alive(
+        self, buffer: PacketBuffer, received: Optional[float] = None
+    ) -> None:
+        """Answers a Keep Alive packet with the same id, right away even inside
+        `batch()`, and records it in `keep_alive_stats`.
 
-            return packet_id, PacketBuffer(uncompressed_data)
+        Parameters:
+            buffer (PacketBuffer): The Keep Alive's data.
+            received (Optional[float]): When it was read, from `time.monotonic()`; now if None.
 
-    def _get_compression_threshold(self, received_data) -> None:
-        received_data = self.socket.recv(1024)
+        """
+        if received is None:
+            received = time.monotonic()
+
+        keep_alive_id = buffer.read(8)
+        self.send_urgent(SERVERBOUND_KEEP_ALIVE, keep_alive_id)
+        keep_alive_id = int.from_bytes(keep_alive_id, "big", signed=True)
+        self.keep_alive_stats.record(keep_alive_id, received, time.monotonic())
+        log.debug("Answered Keep Alive %d", keep_alive_id)
+
+    def _receive(self, flags: int = 0) -> int:
+        try:
+            received_data = self.receiver.recv(self.socket, flags)
+        except BlockingIOError:
+            return 0
+
+        if not received_data:
+            if flags & MSG_DONTWAIT:
+                return 0
+            raise ConnectionError("Connection closed by the server")
+
+        received = len(received_data)
         if self.cipher is not None:
-            received_data = self.cipher.decrypt(received_data)
+            received_data = self._decrypt(received_data)
+
+        self.decoder.feed(received_data)
+        return received
+
+    def _decrypt(self, data: bytes) -> memoryview:
+        # The plaintext goes to a buffer that lives as long as the connection.
+        size = len(data) + self.cipher.overhead
+        if self._decrypt_buffer is None or len(self._decrypt_buffer) < size:
+            self._decrypt_buffer = bytearray(max(size, self.read_size))
+
+        metrics = self.metrics
+        if metrics is None:
+            return self.cipher.decrypt_into(data, self._decrypt_buffer)
+
+        start = time.perf_counter()
+        plaintext = self.cipher.decrypt_into(data, self._decrypt_buffer)
+        metrics.observe("decrypt", time.perf_counter() - start)
+        return plaintext
+
+    def _read_frame(self) -> bytes:
+        frame = self.decoder.next_frame()
+
+        while frame is None:
+            if self.decoder.pending_length is not None:
+                self.receiver.expect(self.decoder.pending_length)
+            self._receive()
+            frame = self.decoder.next_frame()
+
+        return frame
+
+    def _unpack_frame(self, frame: bytes) -> Tuple[int, PacketBuffer]:
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+
+        if self.lazy_packets:
+            packet_id = self._peek_packet_id(frame)
+            buffer = LazyPacketBuffer(lambda: self._unpack_body(frame)[1])
+        else:
+            packet_id, data = self._unpack_body(frame)
+            buffer = PacketBuffer(data)
+
+        if metrics is not None:
+            metrics.observe("unpack", time.perf_counter() - start, packet_id)
+            metrics.count("packets_received", 1, packet_id)
+            metrics.count("bytes_received", len(frame), packet_id)
+
+        # Checked first, so the arguments are not even packed when disabled.
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received packet 0x%02X (%d bytes)", packet_id, len(frame))
+
+        return packet_id, buffer
+
+    def _unpack_body(self, frame: bytes) -> Tuple[int, bytes]:
+        offset = 0
+
+        if self.compression_threshold != -1:
+            data_length, offset = decode_varint(frame)
+
+            if data_length > 0:
+                metrics = self.metrics
+                if metrics is not None:
+                    start = time.perf_counter()
+
+                frame = self.compression.decompress(
+                    memoryview(frame)[offset:], data_length
+                )
+                offset = 0
+
+                if metrics is not None:
+                    metrics.observe("decompress", time.perf_counter() - start)
+
+        packet_id, offset = decode_varint(frame, offset)
+        return packet_id, frame[offset:]
+
+    def _peek_packet_id(self, frame: bytes) -> int:
+        offset = 0
 
-        self.buffer.add(received_data)
-        packet_length = self.buffer.unpack_varint()
-        packet = PacketBuffer(self.buffer.read(packet_length))
+        if self.compression_threshold != -1:
+            data_length, offset = decode_varint(frame)
 
-        packet_id = packet.unpack_varint()
-        if packet_id == 3:
-            self.compression_threshold = packet.unpack_varint()
+            if data_length > 0:
+                # Only the first bytes are inflated; the id is at most 5.
+                frame = self.compression.peek(frame[offset:])
+                offset = 0
+
+        return decode_varint(frame, offset)[0]
+
+    def _accept_frame(self, frame: memoryview) -> bool:
+        if self.mode != PLAY_MODE:
+            return True
+
+        return self._peek_packet_id(frame) in self.subscriptions
+
+    def subscribe(self, *packet_ids: int, lazy: bool = True) -> None:
+        """Only receives packets with the given ids from now on; every other
+        packet is skipped by its length, without being decompressed or copied.
+        Login packets are always received.
+
+        Parameters:
+            *packet_ids (int): The ids of the packets to receive.
+            lazy (bool): Whether the packets' data is only decompressed when it is first accessed.
+
+        """
+        if self.subscriptions is None:
+            self.subscriptions = set()
+
+        self.subscriptions.update(packet_ids)
+        self.lazy_packets = lazy
+        self.decoder.accept = self._accept_frame
+
+    def unsubscribe(self, *packet_ids: int) -> None:
+        """Stops receiving packets with the given ids. Without ids, every
+        packet is received again.
+
+        Parameters:
+            *packet_ids (int): The ids of the packets to stop receiving.
+
+        """
+        if not packet_ids:
+            self.subscriptions = None
+            self.lazy_packets = False
+            self.decoder.accept = None
+        elif self.subscriptions is not None:
+            self.subscriptions.difference_update(packet_ids)
 
     def _login(self) -> None:
-        self.send_packet(
-            0x00,
-            pack_varint(self.protocol_version),
-            pack_string(self.server_ip),
-            pack_unsigned_short(self.server_port),
-            pack_varint(2),
+        self.write_schema(
+            HANDSHAKE, self.protocol_version, self.server_ip, self.server_port, 2
+        )
+
+        self.write_schema(LOGIN_START, self.username)
+
+    def client_auth(self, buffer: Union[bytes, PacketBuffer]) -> None:
+        """Answers an Encryption Request and enables encryption. The session
+        server is joined on a thread of its own while the shared secret is
+        encrypted with the server's public key.
+
+        Parameters:
+            buffer (Union[bytes, PacketBuffer]): The Encryption Request's fields, or the whole packet as received.
+
+        """
+        public_key, verify_token, shared_secret, server_hash = self._prepare_auth(
+            buffer
+        )
+        errors = []
+
+        def join() -> None:
+            try:
+                self._timed_join(server_hash)
+            except BaseException as e:
+                errors.append(e)
+
+        # Started per login, so joins never wait for each other.
+        thread = threading.Thread(target=join, name="mcauthpy-join", daemon=True)
+        thread.start()
+
+        start = time.perf_counter()
+        try:
+            encrypted_secret, encrypted_token = self._encrypt_secret(
+                public_key, shared_secret, verify_token
+            )
+            self.login_timings["encryption"] = time.perf_counter() - start
+        finally:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        self.write_packet(
+            ENCRYPTION_RESPONSE,
+            pack_varint(len(encrypted_secret)),
+            encrypted_secret,
+            pack_varint(len(encrypted_token)),
+            encrypted_token,
         )
 
-        self.send_packet(0x00, pack_string(self.username))
+        self._enable_encryption(shared_secret)
 
-    def client_auth(self, received_data) -> None:
-        # Client Authentication
-        p = PacketBuffer(received_data)
-        server_id = p.read(4)
-        public_key_length = p.unpack_varint()
-        public_key = p.unpack_byte_array(public_key_length)
-        verify_token_length = p.unpack_varint()
-        verify_token = p.unpack_byte_array(verify_token_length)
+    def _prepare_auth(
+        self, buffer: Union[bytes, PacketBuffer]
+    ) -> Tuple[bytes, bytes, bytes, str]:
+        if self._mctoken is None:
+            raise ConnectionError("The server requires a Microsoft account")
+
+        if not isinstance(buffer, PacketBuffer):
+            # Skips the received packet's length and id.
+            data = bytes(buffer)
+            buffer = PacketBuffer(self._unpack_body(data[decode_varint(data)[1] :])[1])
+
+        server_id = buffer.unpack_string()
+        public_key = buffer.unpack_byte_array(buffer.unpack_varint())
+        verify_token = buffer.unpack_byte_array(buffer.unpack_varint())
 
         shared_secret = os.urandom(16)
-        cipher = load_der_public_key(public_key, default_backend())
-        encrypted_secret = cipher.encrypt(shared_secret, PKCS1v15())
-        encrypted_token = cipher.encrypt(verify_token, PKCS1v15())
 
         generated_hash = hashlib.sha1()
-        # generated_hash.update(server_id) # if 1.7.x > ??
-        generated_hash.update(b"")
+        generated_hash.update(server_id)
         generated_hash.update(shared_secret)
         generated_hash.update(public_key)
         generated_hash = minecraft_sha1_hash(generated_hash)
 
-        response_post = requests.post(
+        return public_key, verify_token, shared_secret, generated_hash
+
+    def _encrypt_secret(
+        self, public_key: bytes, shared_secret: bytes, verify_token: bytes
+    ) -> Tuple[bytes, bytes]:
+        cipher = load_der_public_key(public_key, default_backend())
+        encrypted_secret = cipher.encrypt(shared_secret, PKCS1v15())
+        encrypted_token = cipher.encrypt(verify_token, PKCS1v15())
+
+        return encrypted_secret, encrypted_token
+
+    def _timed_join(self, server_hash: str) -> None:
+        start = time.perf_counter()
+        self._join_server(server_hash)
+        self.login_timings["join"] = time.perf_counter() - start
+
+    def _join_server(self, server_hash: str) -> None:
+        response_post = _http.post(
             "https://sessionserver.mojang.com/session/minecraft/join",
             headers={"Content-Type": "application/json"},
             json={
                 "accessToken": self._mctoken,
                 "selectedProfile": self._mcprofile["id"],
-                "serverId": generated_hash,
+                "serverId": server_hash,
             },
         )
 
         if response_post.status_code != 204:
             raise Exception(f"Status code is not 204: ({response_post.status_code})")
 
-        # Encryption Response Packet
-        erp = self.send_packet(
-            0x01,
-            pack_varint(len(encrypted_secret)),
-            encrypted_secret,
-            pack_varint(len(encrypted_token)),
-            encrypted_token,
-        )
+    def _enable_encryption(self, shared_secret: bytes) -> None:
+        # One cipher keeps the state of both directions.
+        self.cipher = create_cipher(shared_secret, self.cipher_backend)
+        self.en_cipher = self.cipher
+        log.debug("Enabled encryption with %s", self.cipher.name)
 
-        self.cipher = AES.new(
-            shared_secret, AES.MODE_CFB, segment_size=8, iv=shared_secret
-        )
-        self.en_cipher = AES.new(
-            shared_secret, AES.MODE_CFB, segment_size=8, iv=shared_secret
-        )
+    def login(self) -> Dict[str, float]:
+        """Logs in to the connected server. The login packets are handled in
+        the order they arrive, whichever it is, until Login Success; its
+        fields are kept as `login_success`, and the packets read afterwards
+        are play packets.
+
+        Returns:
+            Dict[str, float]: The seconds the login took in total, and spent on
+            "handshake" (sending it and Login Start), "wait" (for the server's
+            packets), "encryption" (of the shared secret) and "join" (the
+            session server, at the same time as "encryption"); also kept as
+            `login_timings`.
 
-    def login(self) -> None:
+        """
+        timings = self.login_timings = {"wait": 0.0}
+        start = time.perf_counter()
         self._login()
-        received_data = self.socket.recv(1024)
+        timings["handshake"] = time.perf_counter() - start
 
-        if self._mctoken is not None:
-            self.client_auth(received_data)
-        else:
-            self.buffer.add(received_data)
+        while True:
+            waited = time.perf_counter()
+            frame = self._read_frame()
+            timings["wait"] += time.perf_counter() - waited
+
+            packet_id, data = self._unpack_body(frame)
+            buffer = PacketBuffer(data)
+
+            if packet_id == LOGIN_SUCCESS:
+                self.login_success = buffer
+                break
+
+            if packet_id == ENCRYPTION_REQUEST:
+                self.client_auth(buffer)
+            else:
+                reply = self._handle_login_packet(packet_id, buffer)
+                if reply is not None:
+                    self.write_packet(*reply)
+
+        self._logged_in(start)
+        return timings
+
+    def _handle_login_packet(
+        self, packet_id: int, buffer: PacketBuffer
+    ) -> Optional[tuple]:
+        # Returns the id and fields of the packet to reply with, if any.
+        if packet_id == SET_COMPRESSION:
+            self.compression_threshold = buffer.unpack_varint()
+
+        elif packet_id == LOGIN_DISCONNECT:
+            reason = buffer.unpack_string().decode("utf-8")
+            raise ConnectionError(f"Disconnected by the server: {reason}")
+
+        elif packet_id == LOGIN_PLUGIN_REQUEST:
+            # No plugin channel is understood.
+            message_id = buffer.unpack_varint()
+            return LOGIN_PLUGIN_RESPONSE, pack_varint(message_id), b"\x00"
 
-        self._get_compression_threshold(received_data)
+        return None
 
+    def _logged_in(self, start: float) -> None:
         self.mode = PLAY_MODE
+        total = self.login_timings["total"] = time.perf_counter() - start
+
+        if self.metrics is not None:
+            self.metrics.observe("login", total)
+
+        log.info(
+            "Logged in to %s:%d as %s in %.1f ms",
+            self.server_ip,
+            self.server_port,
+            self.username,
+            total * 1000,
+        )
 
     def send_packet(self, packet_id: int, *fields: Tuple[bytes]) -> bytes:
-        """Sends a packet to the connected server.
+        """Sends a packet to the connected server; inside `batch()` it is
+        queued instead. `write_packet()` does the same without joining the
+        sent bytes into one object.
+
+        Parameters:
+            packet_id (int): The packet's id in hexadecimal format (preferably).
+            *fields (Tuple[bytes]): The packed data to send to the server.
+
+        Returns:
+            bytes: The packet that is sent to the server.
+
+        """
+        return b"".join(self._send(packet_id, fields))
+
+    def write_packet(self, packet_id: int, *fields: Tuple[bytes]) -> int:
+        """Sends a packet to the connected server. The packet is written
+        without concatenating its fields; inside `batch()` it is queued instead.
+
+        Parameters:
+            packet_id (int): The packet's id in hexadecimal format (preferably).
+            *fields (Tuple[bytes]): The packed data to send to the server.
+
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        return sum(len(buffer) for buffer in self._send(packet_id, fields))
+
+    def send_urgent(self, packet_id: int, *fields: Tuple[bytes]) -> int:
+        """Sends a packet right away, even inside `batch()`. Packets queued by
+        the batch are sent first, because they were encrypted before it.
 
         Parameters:
             packet_id (int): The packet's id in hexadecimal format (preferably).
             *fields (Tuple[bytes]): The packed data to send to the server.
 
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        with self._send_lock:
+            buffers = self._encode_packet(packet_id, fields)
+            queued, self._send_queue = self._send_queue, []
+            self._write(queued + buffers)
+
+        return sum(len(buffer) for buffer in buffers)
+
+    def send_schema(self, schema: PacketSchema, *values) -> bytes:
+        """Packs and sends a packet described by a schema.
+
+        Parameters:
+            schema (PacketSchema): The packet's schema.
+            *values: One value per field of the schema.
+
         Returns:
             bytes: The packet that is sent to the server.
 
         """
-        packet_id = pack_varint(int(packet_id))
-        data = packet_id
-        for field in fields:
-            data += field
+        return self.send_packet(schema.packet_id, schema.encode_fields(*values))
+
+    def write_schema(self, schema: PacketSchema, *values) -> int:
+        """Packs and sends a packet described by a schema, like `write_packet()`.
+
+        Parameters:
+            schema (PacketSchema): The packet's schema.
+            *values: One value per field of the schema.
+
+        Returns:
+            int: The size of the packet that is sent to the server.
+
+        """
+        return self.write_packet(schema.packet_id, schema.encode_fields(*values))
+
+    def _send(self, packet_id: int, fields: Tuple[bytes]) -> List[bytes]:
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+
+        # Encrypting and sending happen under one lock, so packets from the
+        # keep-alive thread cannot interleave with the cipher stream.
+        with self._send_lock:
+            buffers = self._encode_packet(packet_id, fields)
+
+            if self._cork_depth:
+                self._send_queue.extend(buffers)
+            else:
+                self._write(buffers)
+
+        if metrics is not None:
+            metrics.observe("send", time.perf_counter() - start, packet_id)
+
+        return buffers
+
+    def _write(self, buffers: List[bytes]) -> None:
+        # Called with the send lock held.
+        unsent = self._unsent
+        if unsent is None:
+            send_buffers(self.socket, buffers)
+        elif unsent:
+            # Written after what is already waiting, to keep the order.
+            unsent.extend(buffers)
+        else:
+            unsent.extend(write_buffers(self.socket, buffers))
+            if unsent and self._on_unsent is not None:
+                self._on_unsent(self)
+
+    def _flush_unsent(self) -> bool:
+        """Writes what the socket did not take yet, as far as it takes it now.
+
+        Returns:
+            bool: Whether anything is still left.
+
+        """
+        with self._send_lock:
+            if self._unsent:
+                self._unsent[:] = write_buffers(self.socket, self._unsent)
+            return bool(self._unsent)
+
+    def cork(self) -> None:
+        """Queues every packet sent from now on until `uncork()` is called."""
+        self._cork_depth += 1
+
+    def uncork(self) -> None:
+        """Undoes one `cork()` and sends the queued packets once no cork is left."""
+        self._cork_depth -= 1
+        if self._cork_depth == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Sends every queued packet with as few syscalls as possible."""
+        with self._send_lock:
+            if self._send_queue:
+                buffers, self._send_queue = self._send_queue, []
+                self._write(buffers)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Sends every packet sent inside the block at once when it exits.
+
+        >>> with client.batch():
+        ...     client.send_packet(...)
+        ...     client.send_packet(...)
+        """
+        self.cork()
+        try:
+            yield
+        finally:
+            self.uncork()
+
+    def _encode_packet(self, packet_id: int, fields: Tuple[bytes]) -> List[bytes]:
+        metrics = self.metrics
+        data = [pack_varint(int(packet_id)), *fields]
+        data_size = sum(len(field) for field in data)
 
         if self.compression_threshold >= 0:
-            if len(data) >= self.compression_threshold:
-                data_length = pack_varint(len(data))
-                data = zlib.compress(data)
+            if data_size >= self.compression_threshold:
+                data_length = pack_varint(data_size)
+                if metrics is None:
+                    data = self.compression.compress(data)
+                else:
+                    start = time.perf_counter()
+                    data = self.compression.compress(data)
+                    metrics.observe("compress", time.perf_counter() - start)
+                data_size = sum(len(field) for field in data)
 
-            elif len(data) < self.compression_threshold:
+            elif data_size < self.compression_threshold:
                 data_length = pack_varint(0)
 
-            out = pack_varint(len(data_length + data)) + data_length + data
+            header = [pack_varint(len(data_length) + data_size), data_length]
 
         elif self.compression_threshold < 0:
-            out = pack_varint(len(data)) + data
+            header = [pack_varint(data_size)]
+
+        out = header + data
+
+        if self.cipher is not None:
+            if metrics is None:
+                out = [self.en_cipher.encrypt(buffer) for buffer in out]
+            else:
+                start = time.perf_counter()
+                out = [self.en_cipher.encrypt(buffer) for buffer in out]
+                metrics.observe("encrypt", time.perf_counter() - start)
 
-        if self.server_online_mode and self.mode == PLAY_MODE:
-            out = self.en_cipher.encrypt(out)
+        if metrics is not None:
+            metrics.count("packets_sent", 1, packet_id)
+            metrics.count("bytes_sent", sum(len(buffer) for buffer in out), packet_id)
 
-        self.socket.send(out)
         return out
 
     def unpack_packet(
@@ -284,4 +910,4 @@ class Client:
             bytes: The raw data.
 
         """
-        return self.socket.recv(bytes_size)
+        return bytes(self.receiver.recv(self.socket, limit=bytes_size))
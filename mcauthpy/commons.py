@@ -1,6 +1,17 @@
 LOGIN_MODE = 0
 PLAY_MODE = 1
 
+# Packet ids of protocol 758 (1.18.2) that the client handles itself.
+LOGIN_DISCONNECT = 0x00
+ENCRYPTION_REQUEST = 0x01
+SET_COMPRESSION = 0x03
+LOGIN_SUCCESS = 0x02
+LOGIN_PLUGIN_REQUEST = 0x04
+ENCRYPTION_RESPONSE = 0x01
+LOGIN_PLUGIN_RESPONSE = 0x02
+CLIENTBOUND_KEEP_ALIVE = 0x21
+SERVERBOUND_KEEP_ALIVE = 0x0F
+
 
 def better_hex(number: int):
     return f"0x{str(hex(number)[2:].zfill(2)).upper()}"
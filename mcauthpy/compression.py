@@ -0,0 +1,137 @@
+from typing import List, Optional, Sequence
+
+from concurrent.futures import Executor
+
+import zlib
+
+from mcauthpy.exceptions import DecompressionError
+
+# The largest uncompressed packet the protocol allows.
+MAX_DATA_LENGTH = 1 << 23
+
+PEEK_STEP = 64
+
+
+class CompressionPolicy:
+    def __init__(
+        self,
+        level: int = -1,
+        max_data_length: int = MAX_DATA_LENGTH,
+        offload_threshold: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """Decides how packets are compressed and decompressed.
+
+        Parameters:
+            level (int): The zlib level; 1 is the fastest, -1 the zlib default.
+            max_data_length (int): Declared sizes above this are rejected before decompressing.
+            offload_threshold (Optional[int]): Frames of at least this size are decompressed on `executor`.
+            executor (Optional[Executor]): The pool large frames are offloaded to. zlib releases the GIL while it works.
+
+        """
+        self.level = level
+        self.max_data_length = max_data_length
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        # About 256 KiB of zlib state, so it is only set up once needed.
+        self._compressor = None
+
+    def should_offload(self, frame_size: int) -> bool:
+        """Checks whether a frame is decompressed on the executor.
+
+        Parameters:
+            frame_size (int): The size of the received frame.
+
+        Returns:
+            bool: True if the frame should be offloaded.
+
+        """
+        return (
+            self.executor is not None
+            and self.offload_threshold is not None
+            and frame_size >= self.offload_threshold
+        )
+
+    def compress(self, data: Sequence[bytes]) -> List[bytes]:
+        """Compresses the packet's buffers as one zlib stream.
+
+        Parameters:
+            data (Sequence[bytes]): The packet id and fields.
+
+        Returns:
+            List[bytes]: The compressed stream, in pieces.
+
+        """
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.level)
+
+        # Copying a pristine compressor is cheaper than setting up a new one.
+        compressor = self._compressor.copy()
+        out = [compressor.compress(buffer) for buffer in data]
+        out.append(compressor.flush())
+
+        return [buffer for buffer in out if buffer]
+
+    def peek(self, data: bytes, size: int = 5) -> bytes:
+        """Decompresses only the start of a packet, e.g. to read its id.
+
+        Parameters:
+            data (bytes): The compressed bytes-like data.
+            size (int): The amount of uncompressed bytes wanted.
+
+        Returns:
+            bytes: Up to `size` uncompressed bytes.
+
+        """
+        decompressor = zlib.decompressobj()
+        out = b""
+        position = 0
+
+        try:
+            # Small steps, so the rest of the packet is never touched or copied.
+            while len(out) < size and position < len(data) and not decompressor.eof:
+                out += decompressor.decompress(
+                    data[position : position + PEEK_STEP], size - len(out)
+                )
+                position += PEEK_STEP
+        except zlib.error as e:
+            raise DecompressionError(str(e)) from e
+
+        return out
+
+    def decompress(self, data: bytes, data_length: int) -> bytes:
+        """Decompresses a packet, never producing more than its declared size.
+
+        Parameters:
+            data (bytes): The compressed bytes-like data.
+            data_length (int): The uncompressed size declared by the packet.
+
+        Returns:
+            bytes: The uncompressed packet id and fields.
+
+        """
+        if data_length > self.max_data_length:
+            raise DecompressionError(
+                f"Declared size {data_length} is larger than {self.max_data_length}"
+            )
+
+        decompressor = zlib.decompressobj()
+        try:
+            out = decompressor.decompress(data, data_length)
+
+            if not decompressor.eof and len(out) == data_length:
+                # The end of the stream may still be pending; anything but
+                # the end means the packet is bigger than it claims.
+                if decompressor.decompress(decompressor.unconsumed_tail, 1):
+                    raise DecompressionError(
+                        f"Packet is larger than its declared size {data_length}"
+                    )
+        except zlib.error as e:
+            raise DecompressionError(str(e)) from e
+
+        if len(out) != data_length or not decompressor.eof:
+            raise DecompressionError(
+                f"Packet is {len(out)} bytes, but declared {data_length}"
+            )
+
+        return out
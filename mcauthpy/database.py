@@ -1,26 +1,426 @@
-import requests
+from typing import Dict, Iterable, List, Optional
+
+import argparse
+import functools
+import hashlib
 import json
+import os
+import pickle
+import sys
+import threading
 
+from . import _http
+from .commons import LOGIN_MODE, PLAY_MODE
 
-def get_database() -> json:
-    response = requests.get(
-        "https://gitlab.bixilon.de/bixilon/minosoft/-/raw/master/src/main/resources/assets/minosoft/mapping/versions.json"
-    )
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+VERSIONS_PATH = os.path.join(DATA_DIRECTORY, "versions.json")
+VERSIONS_URL = "https://gitlab.bixilon.de/bixilon/minosoft/-/raw/master/src/main/resources/assets/minosoft/mapping/versions.json"
+
+SERVERBOUND = "c2s"
+CLIENTBOUND = "s2c"
+STATES = {LOGIN_MODE: "login", PLAY_MODE: "play"}
+
+# Bumped whenever the layout of the pickled cache changes.
+CACHE_FORMAT = 1
+
+
+def user_cache_directory() -> str:
+    """Returns the directory mcauthpy caches files in for the current user,
+    e.g. `~/.cache/mcauthpy`; `$XDG_CACHE_HOME` and `%LOCALAPPDATA%` are
+    respected."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "mcauthpy")
+
+
+def _is_private(path: str) -> bool:
+    # Only the current user may have written a pickle that is loaded.
+    if not hasattr(os, "getuid"):
+        return True
+    stat = os.stat(path)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+class PacketIndex:
+    def __init__(self, packets) -> None:
+        """The packet ids of one state and direction, in both directions.
+
+        Parameters:
+            packets: A list of names indexed by id, or a dict of names to ids or of ids to names.
+
+        """
+        if isinstance(packets, dict):
+            ids = {}
+            for key, value in packets.items():
+                if isinstance(value, int):
+                    ids[key] = value
+                else:
+                    ids[value] = int(key, 0) if isinstance(key, str) else key
+        else:
+            ids = {name: packet_id for packet_id, name in enumerate(packets) if name}
+
+        self.ids: Dict[str, int] = ids
+        self.names: List[Optional[str]] = [None] * (max(ids.values(), default=-1) + 1)
+        for name, packet_id in ids.items():
+            self.names[packet_id] = name
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    def id(self, name: str) -> int:
+        return self.ids[name]
+
+    def name(self, packet_id: int) -> Optional[str]:
+        return self.names[packet_id] if 0 <= packet_id < len(self.names) else None
+
+
+class ProtocolVersion:
+    def __init__(self, protocol_id: int, name: str, packets: dict) -> None:
+        """The packets of one protocol version.
+
+        Parameters:
+            protocol_id (int): The protocol version, e.g. 758.
+            name (str): The version's name, e.g. "1.18.2".
+            packets (dict): The packets per direction ("c2s", "s2c") and state ("login", "play", ...).
+
+        """
+        self.protocol_id = protocol_id
+        self.name = name
+        self.packets = packets
+        self.indexes: Dict[str, Dict[str, PacketIndex]] = {
+            direction: {state: PacketIndex(ids) for state, ids in states.items()}
+            for direction, states in packets.items()
+        }
+
+    def __repr__(self) -> str:
+        return f"ProtocolVersion({self.protocol_id}, {self.name!r})"
+
+    def index(self, state, direction: str = CLIENTBOUND) -> PacketIndex:
+        """Returns the packet index of a state and direction.
+
+        Parameters:
+            state: The state's name, or `LOGIN_MODE`/`PLAY_MODE`.
+            direction (str): `CLIENTBOUND` or `SERVERBOUND`.
+
+        Returns:
+            PacketIndex: The index.
+
+        """
+        return self.indexes[direction][STATES.get(state, state)]
+
+    def packet_id(
+        self, name: str, state=PLAY_MODE, direction: str = CLIENTBOUND
+    ) -> int:
+        """Returns the id of a packet.
+
+        Parameters:
+            name (str): The packet's name, e.g. "keep_alive".
+            state: The state's name, or `LOGIN_MODE`/`PLAY_MODE`.
+            direction (str): `CLIENTBOUND` or `SERVERBOUND`.
+
+        Returns:
+            int: The packet's id.
+
+        """
+        return self.index(state, direction).id(name)
+
+    def packet_name(
+        self, packet_id: int, state=PLAY_MODE, direction: str = CLIENTBOUND
+    ) -> Optional[str]:
+        """Returns the name of a packet.
+
+        Parameters:
+            packet_id (int): The packet's id.
+            state: The state's name, or `LOGIN_MODE`/`PLAY_MODE`.
+            direction (str): `CLIENTBOUND` or `SERVERBOUND`.
+
+        Returns:
+            Optional[str]: The packet's name, or None if the id is unknown.
+
+        """
+        return self.index(state, direction).name(packet_id)
+
+
+def resolve_versions(db: dict) -> Dict[int, ProtocolVersion]:
+    """Builds every protocol version of a version mapping, with the
+    `"packets": <version>` aliases resolved.
+
+    Parameters:
+        db (dict): The parsed version mapping.
+
+    Returns:
+        Dict[int, ProtocolVersion]: The versions by protocol id.
+
+    """
+    versions = {}
+
+    for key, entry in db.items():
+        packets = entry.get("packets")
+        seen = {key}
+
+        while isinstance(packets, int) or (
+            isinstance(packets, str) and packets.isdigit()
+        ):
+            alias = str(packets)
+            if alias in seen or alias not in db:
+                packets = None
+                break
+            seen.add(alias)
+            packets = db[alias].get("packets")
+
+        if not isinstance(packets, dict):
+            continue
+
+        protocol_id = int(entry.get("protocol_id", key))
+        # Snapshots can share a protocol id with a release; releases win.
+        if protocol_id in versions and entry.get("type", "release") != "release":
+            continue
+
+        versions[protocol_id] = ProtocolVersion(
+            protocol_id, entry.get("name", str(protocol_id)), packets
+        )
+
+    return versions
+
+
+def load_version(path: str) -> ProtocolVersion:
+    """Loads a protocol version from its own file, see `split_versions()`.
+
+    Parameters:
+        path (str): The file's path, e.g. "data/758.json".
+
+    Returns:
+        ProtocolVersion: The version.
+
+    """
+    with open(path, "r") as f:
+        entry = json.load(f)
+
+    return ProtocolVersion(entry["protocol_id"], entry["name"], entry["packets"])
+
+
+def split_versions(
+    db: dict,
+    directory: str = DATA_DIRECTORY,
+    protocol_ids: Optional[Iterable[int]] = None,
+) -> List[str]:
+    """Writes protocol versions of a version mapping to one file each, named
+    after their protocol id, so they can be loaded on their own.
+
+    Parameters:
+        db (dict): The parsed version mapping.
+        directory (str): The directory to write the files to.
+        protocol_ids (Optional[Iterable[int]]): The versions to write; every version if None.
+
+    Returns:
+        List[str]: The paths of the written files.
+
+    """
+    versions = resolve_versions(db)
+    if protocol_ids is not None:
+        versions = {
+            protocol_id: versions[protocol_id]
+            for protocol_id in protocol_ids
+            if protocol_id in versions
+        }
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    for protocol_id, version in sorted(versions.items()):
+        path = os.path.join(directory, f"{protocol_id}.json")
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "name": version.name,
+                    "protocol_id": protocol_id,
+                    "packets": version.packets,
+                },
+                f,
+                indent=4,
+            )
+            f.write("\n")
+        paths.append(path)
+
+    return paths
+
+
+class ProtocolRegistry:
+    def __init__(
+        self, path: str = VERSIONS_PATH, cache_path: Optional[str] = None
+    ) -> None:
+        """The protocol versions of a version mapping. A version is looked up
+        in its own file next to the mapping first (`<protocol id>.json`, as
+        shipped with the package), so a process only parses the versions it
+        uses. The full mapping is only parsed for the other versions, once,
+        and a pickled copy of it is kept in the user's cache directory, so
+        later processes skip parsing as long as the JSON is unchanged. The
+        mapping's own directory is only read.
+
+        Parameters:
+            path (str): The version mapping's path; it does not have to exist.
+            cache_path (Optional[str]): The pickled cache's path; a file named after the mapping's path in `user_cache_directory()` if None, or no cache if "".
+
+        """
+        self.path = path
+        self.directory = os.path.dirname(path)
+        if cache_path is None:
+            key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+            cache_path = os.path.join(user_cache_directory(), f"versions-{key}.pickle")
+        self.cache_path = cache_path
+        self._loaded: Dict[int, Optional[ProtocolVersion]] = {}
+        self._mapping: Optional[Dict[int, ProtocolVersion]] = None
+        self._lock = threading.RLock()
+
+    def __contains__(self, protocol_id: int) -> bool:
+        return self.get(protocol_id) is not None
+
+    def __getitem__(self, protocol_id: int) -> ProtocolVersion:
+        version = self.get(protocol_id)
+        if version is None:
+            raise KeyError(protocol_id)
+        return version
+
+    def get(self, protocol_id: int) -> Optional[ProtocolVersion]:
+        try:
+            return self._loaded[protocol_id]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if protocol_id not in self._loaded:
+                path = self.version_path(protocol_id)
+                if os.path.exists(path):
+                    version = load_version(path)
+                else:
+                    version = self.mapping.get(protocol_id)
+                self._loaded[protocol_id] = version
+            return self._loaded[protocol_id]
+
+    def version_path(self, protocol_id: int) -> str:
+        return os.path.join(self.directory, f"{protocol_id}.json")
+
+    @property
+    def versions(self) -> Dict[int, ProtocolVersion]:
+        """Every protocol version; this loads all of them."""
+        versions = dict(self.mapping)
+
+        for file_name in os.listdir(self.directory or "."):
+            protocol_id, extension = os.path.splitext(file_name)
+            if extension == ".json" and protocol_id.isdigit():
+                versions[int(protocol_id)] = self[int(protocol_id)]
+
+        return versions
+
+    @property
+    def mapping(self) -> Dict[int, ProtocolVersion]:
+        """The versions of the full mapping; empty if it does not exist."""
+        if self._mapping is None:
+            with self._lock:
+                if self._mapping is None:
+                    self._mapping = self._load() if os.path.exists(self.path) else {}
+        return self._mapping
+
+    def _source_key(self) -> tuple:
+        stat = os.stat(self.path)
+        return CACHE_FORMAT, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Dict[int, ProtocolVersion]:
+        if not self.cache_path:
+            with open(self.path, "r") as f:
+                return resolve_versions(json.load(f))
+
+        source_key = self._source_key()
+
+        try:
+            if _is_private(self.cache_path):
+                with open(self.cache_path, "rb") as f:
+                    cached_key, versions = pickle.load(f)
+                if cached_key == source_key:
+                    return versions
+        except (OSError, pickle.PickleError, EOFError, ValueError, AttributeError):
+            pass
+
+        with open(self.path, "r") as f:
+            versions = resolve_versions(json.load(f))
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", 0o700, exist_ok=True)
+            temporary_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            descriptor = os.open(
+                temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(descriptor, "wb") as f:
+                pickle.dump((source_key, versions), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self.cache_path)
+        except OSError:
+            # The cache is only an optimization.
+            pass
+
+        return versions
+
+
+registry = ProtocolRegistry()
+
+
+@functools.lru_cache(maxsize=None)
+def get_database() -> dict:
+    """Downloads the version mapping of Minosoft, once per process.
+
+    Returns:
+        dict: The version mapping.
+
+    """
+    response = _http.get(VERSIONS_URL)
     return response.json()
 
 
-def get_packets(protocol_id: int) -> json:
-    db = json.load(open("data/versions.json", "r"))
+def get_packets(protocol_id: int) -> dict:
+    """Returns the packets of a protocol version, see `ProtocolVersion.packets`.
 
-    if isinstance(db[str(protocol_id)]["packets"], int):
-        packets = db[str(db[str(protocol_id)]["packets"])]
+    Parameters:
+        protocol_id (int): The protocol version, e.g. 758.
 
-    elif isinstance(db[str(protocol_id)]["packets"], dict):
-        packets = db[str(protocol_id)]
+    Returns:
+        dict: The packets per direction and state.
 
-    return packets
+    """
+    return registry[protocol_id].packets
 
 
 if __name__ == "__main__":
-    db = get_database()
-    json.dump(db, open("data/versions.json", "w"), indent=4)
+    parser = argparse.ArgumentParser(
+        description="Downloads the version mapping of Minosoft."
+    )
+    parser.add_argument(
+        "--source", help="split this version mapping instead of downloading one"
+    )
+    parser.add_argument(
+        "--split",
+        type=int,
+        nargs="*",
+        metavar="PROTOCOL",
+        help="write these protocol versions (every version if none are given) to one file each",
+    )
+    args = parser.parse_args()
+
+    if args.source is not None:
+        with open(args.source, "r") as f:
+            db = json.load(f)
+    else:
+        db = get_database()
+
+    if args.split is None:
+        os.makedirs(DATA_DIRECTORY, exist_ok=True)
+        with open(VERSIONS_PATH, "w") as f:
+            json.dump(db, f, indent=4)
+    else:
+        for path in split_versions(db, protocol_ids=args.split or None):
+            print(path)
@@ -0,0 +1,230 @@
+from typing import Callable, List, Optional, Tuple, Union
+
+import inspect
+import time
+
+from . import database
+from .commons import LOGIN_MODE, PLAY_MODE
+from .packet_buffer import PacketBuffer
+
+_TABLE_SIZE = 0x80
+
+Handler = Callable[["Client", PacketBuffer], object]
+# A packet id, or a packet's name in the packet database, e.g. "keep_alive".
+Packet = Union[int, str]
+
+
+def reply_keep_alive(client, buffer: PacketBuffer):
+    """Answers a Keep Alive packet with the same id."""
+    return client.answer_keep_alive(buffer, time.monotonic())
+
+
+def set_compression(client, buffer: PacketBuffer) -> None:
+    """Applies the threshold of a Set Compression packet."""
+    client.compression_threshold = buffer.unpack_varint()
+
+
+def enter_play_mode(client, buffer: PacketBuffer) -> None:
+    """Switches to the play state once the login succeeded."""
+    client.mode = PLAY_MODE
+
+
+# The clientbound packets the protocol handlers handle, by name.
+PROTOCOL_HANDLERS = [
+    (LOGIN_MODE, "set_compression", set_compression),
+    (LOGIN_MODE, "login_success", enter_play_mode),
+    (PLAY_MODE, "keep_alive", reply_keep_alive),
+]
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        protocol_handlers: bool = True,
+        protocol_version: int = 758,
+        registry: Optional[database.ProtocolRegistry] = None,
+    ) -> None:
+        """Calls the handlers registered for a packet's id. Every connection
+        state has a list indexed by packet id, so dispatching a packet is two
+        list lookups. Packets can also be registered by their name in the
+        packet database; the name is resolved to the protocol version's id
+        once, when it is registered.
+
+        >>> dispatcher = mcauthpy.Dispatcher()
+        >>> @dispatcher.on("chunk_data_and_update_light")
+        ... def on_chunk(client, buffer):
+        ...     ...
+        >>> while True:
+        ...     dispatcher.process(client)
+
+        Parameters:
+            protocol_handlers (bool): Whether Keep Alive, Set Compression and Login Success are handled automatically.
+            protocol_version (int): The protocol version of the dispatched connections.
+            registry (Optional[ProtocolRegistry]): Resolves packet names; `mcauthpy.database.registry` if None.
+
+        """
+        self.protocol_version = protocol_version
+        self.registry = registry if registry is not None else database.registry
+        self._tables: List[List[Optional[Tuple[Handler, ...]]]] = [
+            [None] * _TABLE_SIZE,
+            [None] * _TABLE_SIZE,
+        ]
+        # Called with the client, the packet's id and its PacketBuffer.
+        self.unhandled: Optional[Callable] = None
+
+        if protocol_handlers:
+            for mode, name, handler in PROTOCOL_HANDLERS:
+                self.register(name, handler, mode)
+
+    @property
+    def protocol(self) -> database.ProtocolVersion:
+        """The packet database of `protocol_version`."""
+        return self.registry[self.protocol_version]
+
+    def resolve(self, packet: Packet, mode: int = PLAY_MODE) -> int:
+        """Returns the id of a clientbound packet.
+
+        Parameters:
+            packet (Packet): The packet's id or name.
+            mode (int): The connection state, `LOGIN_MODE` or `PLAY_MODE`.
+
+        Returns:
+            int: The packet's id in `protocol_version`.
+
+        """
+        if isinstance(packet, str):
+            return self.protocol.packet_id(packet, mode)
+        return packet
+
+    def register(self, packet: Packet, handler: Handler, mode: int = PLAY_MODE) -> None:
+        """Adds a handler for a packet. Handlers of the same packet are called
+        in the order they were registered.
+
+        Parameters:
+            packet (Packet): The packet's id or name.
+            handler (Handler): Called with the client and the packet's PacketBuffer.
+            mode (int): The connection state, `LOGIN_MODE` or `PLAY_MODE`.
+
+        """
+        packet_id = self.resolve(packet, mode)
+        table = self._tables[mode]
+        if packet_id >= len(table):
+            table.extend([None] * (packet_id + 1 - len(table)))
+
+        table[packet_id] = (table[packet_id] or ()) + (handler,)
+
+    def unregister(
+        self, packet: Packet, handler: Handler, mode: int = PLAY_MODE
+    ) -> None:
+        """Removes a handler for a packet.
+
+        Parameters:
+            packet (Packet): The packet's id or name.
+            handler (Handler): The handler to remove.
+            mode (int): The connection state, `LOGIN_MODE` or `PLAY_MODE`.
+
+        """
+        packet_id = self.resolve(packet, mode)
+        table = self._tables[mode]
+        if packet_id >= len(table):
+            return
+
+        handlers = tuple(h for h in table[packet_id] or () if h is not handler)
+        table[packet_id] = handlers or None
+
+    def on(self, packet: Packet, mode: int = PLAY_MODE) -> Callable[[Handler], Handler]:
+        """Registers the decorated function as a handler, see `register()`.
+
+        Parameters:
+            packet (Packet): The packet's id or name.
+            mode (int): The connection state, `LOGIN_MODE` or `PLAY_MODE`.
+
+        """
+
+        def decorator(handler: Handler) -> Handler:
+            self.register(packet, handler, mode)
+            return handler
+
+        return decorator
+
+    def packet_ids(self, mode: int = PLAY_MODE) -> List[int]:
+        """Returns the ids that have a handler, e.g. for `Client.subscribe()`.
+
+        Parameters:
+            mode (int): The connection state, `LOGIN_MODE` or `PLAY_MODE`.
+
+        Returns:
+            List[int]: The packet ids.
+
+        """
+        return [i for i, handlers in enumerate(self._tables[mode]) if handlers]
+
+    def dispatch(self, client, packet_id: int, buffer: PacketBuffer) -> list:
+        """Calls the handlers of one packet. The packet's buffer is shared by
+        them, so a handler should `save()` and `revert()` it if others follow.
+
+        Parameters:
+            client (Client): The connection the packet was received on.
+            packet_id (int): The packet's id.
+            buffer (PacketBuffer): The packet's data.
+
+        Returns:
+            list: What the handlers returned.
+
+        """
+        table = self._tables[client.mode]
+        handlers = table[packet_id] if packet_id < len(table) else None
+
+        if handlers is None:
+            if self.unhandled is None:
+                return []
+            return [self.unhandled(client, packet_id, buffer)]
+
+        return [handler(client, buffer) for handler in handlers]
+
+    def process(self, client, max_n: int = 256) -> int:
+        """Reads a batch of packets and dispatches them.
+
+        Parameters:
+            client (Client): The connection to read from.
+            max_n (int): The maximum amount of packets to read.
+
+        Returns:
+            int: The amount of packets dispatched.
+
+        """
+        if client.mode == LOGIN_MODE:
+            # Login packets change how the following frames are unpacked,
+            # so they are handled one at a time.
+            packets = [client.get_received_buffer()]
+        else:
+            packets = client.read_packets(max_n)
+
+        for packet_id, buffer in packets:
+            self.dispatch(client, packet_id, buffer)
+
+        return len(packets)
+
+    async def process_async(self, client, max_n: int = 256) -> int:
+        """Reads a batch of packets from an AsyncClient and dispatches them.
+        Handlers may be coroutine functions; they are awaited in order.
+
+        Parameters:
+            client (AsyncClient): The connection to read from.
+            max_n (int): The maximum amount of packets to read.
+
+        Returns:
+            int: The amount of packets dispatched.
+
+        """
+        if client.mode == LOGIN_MODE:
+            packets = [await client.get_received_buffer()]
+        else:
+            packets = await client.read_packets(max_n)
+
+        for packet_id, buffer in packets:
+            for result in self.dispatch(client, packet_id, buffer):
+                if inspect.isawaitable(result):
+                    await result
+
+        return len(packets)
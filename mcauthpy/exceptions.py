@@ -1,2 +1,6 @@
 class TooBigToUnpack(Exception):
     pass
+
+
+class DecompressionError(Exception):
+    pass
@@ -0,0 +1,204 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from concurrent.futures import ProcessPoolExecutor
+
+import os
+import time
+
+from .bulk import login_many
+from .client import Client
+from .dispatcher import Dispatcher
+from .keep_alive import KeepAliveStats
+from .pool import ClientPool
+from .token_cache import TokenCache
+
+# A Minecraft access token and profile, or a username for offline mode.
+Login = Union[Tuple[str, dict], str]
+
+
+class FleetResults(list):
+    def __init__(
+        self, shards: Iterable[dict], authentication_failed: Dict[str, str]
+    ) -> None:
+        """The metrics of every shard of a fleet, in order.
+
+        Parameters:
+            shards (Iterable[dict]): The metrics of every shard.
+            authentication_failed (Dict[str, str]): The error of every account whose authentication failed, by email address.
+
+        """
+        super().__init__(shards)
+        self.authentication_failed = authentication_failed
+
+
+def authenticate_accounts(
+    accounts: Iterable[Union[Tuple[str, str], str]],
+    max_workers: int = 8,
+    token_cache: Optional[TokenCache] = None,
+) -> Tuple[List[Login], Dict[str, Exception]]:
+    """Runs the authentication chain of every Microsoft account once, so the
+    tokens can be handed to other processes.
+
+    Parameters:
+        accounts (Iterable[Union[Tuple[str, str], str]]): Email addresses and passwords, or usernames for offline mode.
+        max_workers (int): The amount of logins that run at the same time.
+        token_cache (Optional[TokenCache]): If given, cached tokens are reused.
+
+    Returns:
+        Tuple[List[Login], Dict[str, Exception]]: The logins, and the exception of every account that failed.
+
+    """
+    logins = []
+    credentials = []
+
+    for account in accounts:
+        if isinstance(account, str):
+            logins.append(account)
+        else:
+            credentials.append(account)
+
+    failed = {}
+    for email, client in login_many(credentials, max_workers, token_cache):
+        if isinstance(client, Exception):
+            failed[email] = client
+        else:
+            logins.append((client._mctoken, client._mcprofile))
+
+    return logins, failed
+
+
+def run_fleet(
+    accounts: Iterable[Union[Tuple[str, str], str]],
+    server_ip: str,
+    server_port: int = 25565,
+    protocol_version: int = 758,
+    shards: Optional[int] = None,
+    duration: Optional[float] = None,
+    setup: Optional[Callable[[Dispatcher], None]] = None,
+    token_cache: Optional[TokenCache] = None,
+) -> FleetResults:
+    """Connects many accounts to a server, sharded across one process per
+    core, so encryption and compression are not bound to one core by the GIL.
+    The accounts are authenticated once in this process; the workers only
+    receive their tokens. Every shard drives its connections with a
+    `ClientPool`.
+
+    >>> for shard in mcauthpy.run_fleet(accounts, "localhost", duration=60):
+    ...     print(shard["packets_per_second"], shard["keep_alive"]["response"]["mean"])
+
+    Parameters:
+        accounts (Iterable[Union[Tuple[str, str], str]]): Email addresses and passwords, or usernames for offline mode.
+        server_ip (str): The server's ip address.
+        server_port (int): The server's port.
+        protocol_version (int): The Minecraft: Java Edition protocol version.
+        shards (Optional[int]): The amount of worker processes; one per core if None.
+        duration (Optional[float]): Seconds to stay connected; until every connection is closed if None.
+        setup (Optional[Callable[[Dispatcher], None]]): Registers handlers on every shard's dispatcher; it must be picklable, e.g. a module-level function.
+        token_cache (Optional[TokenCache]): If given, cached tokens are reused.
+
+    Returns:
+        FleetResults: The metrics of every shard, and the accounts whose authentication failed.
+
+    """
+    logins, failed = authenticate_accounts(accounts, token_cache=token_cache)
+    shards = min(shards or os.cpu_count() or 1, len(logins)) or 1
+    server = (server_ip, server_port, protocol_version)
+
+    with ProcessPoolExecutor(max_workers=shards) as executor:
+        futures = [
+            executor.submit(run_shard, logins[index::shards], server, duration, setup)
+            for index in range(shards)
+        ]
+        results = [future.result() for future in futures]
+
+    for index, result in enumerate(results):
+        result["shard"] = index
+
+    return FleetResults(results, {email: repr(e) for email, e in failed.items()})
+
+
+def run_shard(
+    logins: List[Login],
+    server: Tuple[str, int, int],
+    duration: Optional[float] = None,
+    setup: Optional[Callable[[Dispatcher], None]] = None,
+) -> dict:
+    """Connects and drives one shard of a fleet; runs in a worker process.
+    The connected clients are polled between the logins of the others, so
+    they answer Keep Alives while the shard is still connecting.
+
+    Parameters:
+        logins (List[Login]): The access tokens and profiles, or usernames for offline mode.
+        server (Tuple[str, int, int]): The server's ip address, port and protocol version.
+        duration (Optional[float]): Seconds to stay connected; until every connection is closed if None.
+        setup (Optional[Callable[[Dispatcher], None]]): Registers handlers on the dispatcher.
+
+    Returns:
+        dict: The shard's metrics.
+
+    """
+    errors = []
+
+    dispatcher = Dispatcher(protocol_version=server[2])
+    if setup is not None:
+        setup(dispatcher)
+
+    pool = ClientPool(dispatcher, lambda client, e: errors.append(repr(e)))
+    clients = []
+    connect_times = []
+    dispatched = 0
+
+    for login in logins:
+        if isinstance(login, str):
+            client = Client.login_from_username(login)
+        else:
+            client = Client.from_token(*login)
+
+        start = time.perf_counter()
+        try:
+            client.connect(*server)
+            client.login()
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+
+        connect_times.append(time.perf_counter() - start)
+        clients.append(client)
+        dispatched += pool.add(client)
+        dispatched += pool.poll(0)
+
+    # The rates only count what was received after every client connected.
+    connect_packets, dispatched = dispatched, 0
+    connect_bytes = sum(client.receiver.received for client in clients)
+    start = time.perf_counter()
+
+    while pool.clients:
+        remaining = (
+            None if duration is None else duration - (time.perf_counter() - start)
+        )
+        if remaining is not None and remaining <= 0:
+            break
+        dispatched += pool.poll(None if remaining is None else min(remaining, 1))
+
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    keep_alive = KeepAliveStats()
+    for client in clients:
+        keep_alive.merge(client.keep_alive_stats)
+
+    return {
+        "pid": os.getpid(),
+        "clients": len(logins),
+        "connected": len(clients),
+        "errors": errors,
+        "packets": dispatched,
+        "bytes": sum(client.receiver.received for client in clients) - connect_bytes,
+        "connect_packets": connect_packets,
+        "elapsed": elapsed,
+        "packets_per_second": dispatched / elapsed if elapsed else 0.0,
+        "connect_time": (
+            sum(connect_times) / len(connect_times) if connect_times else None
+        ),
+        "keep_alive": keep_alive.as_dict(),
+    }
@@ -0,0 +1,127 @@
+from typing import Callable, Iterator, Optional
+
+from mcauthpy.exceptions import TooBigToUnpack
+
+SEGMENT_BITS = 0x7F
+CONTINUE_BIT = 0x80
+
+# Packet lengths are at most 3 VarInt bytes (2097151).
+MAX_LENGTH_POSITION = 21
+
+
+class FrameDecoder:
+    def __init__(
+        self,
+        compact_threshold: int = 65536,
+        accept: Optional[Callable[[memoryview], bool]] = None,
+    ) -> None:
+        """Splits a stream of received bytes into length-prefixed frames.
+
+        The decoder keeps the state of a partially received length VarInt
+        and of a partially received body between calls to `feed()`, so an
+        incomplete frame costs nothing until the rest of it arrives.
+
+        Parameters:
+            compact_threshold (int): Consumed bytes allowed before compacting.
+            accept (Optional[Callable[[memoryview], bool]]): Called with a view of every complete frame; frames it returns False for are skipped without being copied.
+
+        """
+        self.accept = accept
+        self.skipped = 0
+        self._buffer = bytearray()
+        self._offset = 0
+        self._frame_length = None
+        self._length_value = 0
+        self._length_position = 0
+        self.compact_threshold = compact_threshold
+
+    def __len__(self) -> int:
+        return len(self._buffer) - self._offset
+
+    @property
+    def pending_length(self) -> Optional[int]:
+        """The length of the frame that is partially received, if it is known."""
+        return self._frame_length
+
+    def feed(self, data: bytes) -> None:
+        """Appends received data to the decoder.
+
+        Parameters:
+            data (bytes): The received (and decrypted) data.
+
+        """
+        if self._offset == len(self._buffer):
+            del self._buffer[:]
+            self._offset = 0
+        elif self._offset >= self.compact_threshold:
+            del self._buffer[: self._offset]
+            self._offset = 0
+
+        self._buffer += data
+
+    def next_frame(self) -> Optional[bytes]:
+        """Returns the next complete frame without its length prefix.
+
+        Returns:
+            Optional[bytes]: The frame, or None if it has not been fully received yet.
+
+        """
+        while True:
+            if self._frame_length is None and not self._read_length():
+                return None
+
+            end = self._offset + self._frame_length
+            if end > len(self._buffer):
+                return None
+
+            start = self._offset
+            self._offset = end
+            self._frame_length = None
+
+            if self.accept is not None:
+                # Both views are released before the buffer can be resized.
+                with memoryview(self._buffer) as buffer, buffer[start:end] as view:
+                    accepted = self.accept(view)
+
+                if not accepted:
+                    self.skipped += 1
+                    continue
+
+            return bytes(self._buffer[start:end])
+
+    def frames(self) -> Iterator[bytes]:
+        """Yields every complete frame that is currently buffered."""
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def _read_length(self) -> bool:
+        buffer = self._buffer
+        offset = self._offset
+        value = self._length_value
+        position = self._length_position
+
+        while offset < len(buffer):
+            current_byte = buffer[offset]
+            offset += 1
+
+            value |= (current_byte & SEGMENT_BITS) << position
+
+            if current_byte & CONTINUE_BIT == 0:
+                self._offset = offset
+                self._frame_length = value
+                self._length_value = 0
+                self._length_position = 0
+                return True
+
+            position += 7
+
+            if position >= MAX_LENGTH_POSITION:
+                raise TooBigToUnpack("Packet length is too big")
+
+        self._offset = offset
+        self._length_value = value
+        self._length_position = position
+        return False
@@ -0,0 +1,156 @@
+from typing import Optional
+
+import math
+import selectors
+import threading
+import time
+
+from .commons import CLIENTBOUND_KEEP_ALIVE
+from .logger import log
+
+# Keep Alive ids further than this from the local clock are not timestamps.
+MAX_CLOCK_DELTA = 86400000
+
+
+class LatencyStats:
+    def __init__(self) -> None:
+        """Running statistics of a latency, in milliseconds."""
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+        self.last = None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def record(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.last = value
+
+    def merge(self, other: "LatencyStats") -> None:
+        """Adds the values recorded by another instance."""
+        if not other.count:
+            return
+
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.last = other.last
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "min": self.minimum if self.count else None,
+            "max": self.maximum if self.count else None,
+            "mean": self.mean,
+            "last": self.last,
+        }
+
+
+class KeepAliveStats:
+    def __init__(self) -> None:
+        """The Keep Alive statistics of a connection.
+
+        The server measures the round trip itself, from sending a Keep Alive
+        to receiving the answer; on this side of it, the parts that can be
+        measured are:
+
+        - `response`: from reading a Keep Alive to sending its answer.
+        - `interval`: between two Keep Alives, which grows when the server lags.
+        - `delay`: the local clock minus the id, which vanilla servers set to
+          their clock in milliseconds; the one-way latency plus the clocks'
+          offset.
+
+        """
+        self.response = LatencyStats()
+        self.interval = LatencyStats()
+        self.delay = LatencyStats()
+        self.last_received = None
+
+    def record(self, keep_alive_id: int, received: float, answered: float) -> None:
+        """Records one answered Keep Alive.
+
+        Parameters:
+            keep_alive_id (int): The Keep Alive's id.
+            received (float): When it was read, from `time.monotonic()`.
+            answered (float): When it was answered, from `time.monotonic()`.
+
+        """
+        self.response.record((answered - received) * 1000)
+
+        if self.last_received is not None:
+            self.interval.record((received - self.last_received) * 1000)
+        self.last_received = received
+
+        delay = time.time() * 1000 - keep_alive_id
+        if abs(delay) < MAX_CLOCK_DELTA:
+            self.delay.record(delay)
+
+    def merge(self, other: "KeepAliveStats") -> None:
+        """Adds the values recorded by another instance, e.g. of another connection."""
+        self.response.merge(other.response)
+        self.interval.merge(other.interval)
+        self.delay.merge(other.delay)
+
+    def as_dict(self) -> dict:
+        return {
+            "response": self.response.as_dict(),
+            "interval": self.interval.as_dict(),
+            "delay": self.delay.as_dict(),
+        }
+
+
+class KeepAliveThread(threading.Thread):
+    def __init__(self, client, poll_interval: float = 0.25) -> None:
+        """Reads a client's connection in the background. Keep Alives are
+        answered as soon as they are read; every other packet is queued for
+        `Client.get_received_buffer()` and `Client.read_packets()`. The socket
+        is only read once it is readable, so the thread notices `stop()`
+        within `poll_interval` even in the middle of a frame. If reading
+        fails, every later read of the client raises the error.
+
+        Parameters:
+            client (Client): The connection to read.
+            poll_interval (float): Seconds between checks whether the thread should stop.
+
+        """
+        super().__init__(name="mcauthpy-keep-alive", daemon=True)
+        self.client = client
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        """Stops reading once the current read returns."""
+        self._stopped.set()
+
+    def run(self) -> None:
+        client = self.client
+        queue = client._packet_queue
+        selector = selectors.DefaultSelector()
+
+        try:
+            selector.register(client.socket, selectors.EVENT_READ)
+
+            while not self._stopped.is_set():
+                # Frames received along with the login come first.
+                for frame in client.decoder.frames():
+                    packet_id, buffer = client._unpack_frame(frame)
+                    if packet_id == CLIENTBOUND_KEEP_ALIVE:
+                        client.answer_keep_alive(buffer, time.monotonic())
+                    else:
+                        queue.put((packet_id, buffer))
+
+                if selector.select(self.poll_interval):
+                    client._receive()
+        except Exception as e:
+            log.debug("Keep Alive thread stopped: %r", e)
+            # The reader that waits for the next packet gets the error.
+            queue.put(e)
+        finally:
+            selector.close()
@@ -1,39 +1,148 @@
-from colorama import Fore, Back
-import time
+from typing import Optional
 
+import atexit
+import logging
+import logging.handlers
+import queue
 
-def _get_time() -> str:
-    month = time.strftime("%m")
-    day = time.strftime("%d")
-    year = time.strftime("%Y")
-    hour = time.strftime("%H")
-    minute = time.strftime("%M")
-    second = time.strftime("%S")
-    return f"{month}-{day}-{year} {hour}-{minute}-{second}"
+try:
+    from colorama import Fore, Back
+except ImportError:
+    Fore = Back = None
+
+log = logging.getLogger("mcauthpy")
+# A library only emits records; the application decides where they go.
+log.addHandler(logging.NullHandler())
+
+DATE_FORMAT = "%m-%d-%Y %H-%M-%S"
+
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class ColorFormatter(logging.Formatter):
+    def __init__(self, color: bool = True) -> None:
+        """Formats records with the colored level and time prefix of mcauthpy.
+        The time is the record's own, formatted once per record.
+
+        Parameters:
+            color (bool): Whether to use colorama's styles; plain text if False or if colorama is not installed.
+
+        """
+        super().__init__("%(message)s", DATE_FORMAT)
+        self.prefixes = {}
+
+        for level, name, back, accent in (
+            (logging.DEBUG, "DEBUG", "LIGHTBLACK_EX", "LIGHTBLACK_EX"),
+            (logging.INFO, "INFO", "GREEN", "LIGHTGREEN_EX"),
+            (logging.WARNING, "WARNING", "YELLOW", "YELLOW"),
+            (logging.ERROR, "ERROR", "RED", "RED"),
+            (logging.CRITICAL, "CRITICAL", "RED", "RED"),
+        ):
+            if color and Back is not None:
+                self.prefixes[level] = (
+                    f"{getattr(Back, back)}{Fore.WHITE} | {name:<8}"
+                    f"{Back.LIGHTBLACK_EX}{Fore.WHITE} {{}} "
+                    f"{getattr(Back, accent)} {Back.RESET}"
+                )
+            else:
+                self.prefixes[level] = f"| {name:<8}{{}} |"
+
+    def format(self, record: logging.LogRecord) -> str:
+        prefix = self.prefixes.get(record.levelno) or self.prefixes[logging.INFO]
+        return f"{prefix.format(self.formatTime(record, self.datefmt))} {super().format(record)}"
+
+
+def enable_logging(
+    level: int = logging.INFO,
+    handler: Optional[logging.Handler] = None,
+    queued: bool = False,
+) -> logging.Handler:
+    """Prints the records of mcauthpy, replacing the handler of an earlier call.
+
+    >>> mcauthpy.enable_logging(logging.DEBUG, queued=True)
+
+    Parameters:
+        level (int): The lowest level printed; records below it are not even formatted.
+        handler (Optional[logging.Handler]): Where the records go; stdout with a `ColorFormatter` if None.
+        queued (bool): Whether records are handed to a background thread, so packet tracing does not block the network thread.
+
+    Returns:
+        logging.Handler: The handler.
+
+    """
+    global _handler, _listener
+
+    disable_logging()
+
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(ColorFormatter())
+
+    if queued:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+        _handler = logging.handlers.QueueHandler(records)
+    else:
+        _handler = handler
+
+    log.addHandler(_handler)
+    log.setLevel(level)
+
+    return handler
+
+
+def disable_logging() -> None:
+    """Removes the handler of `enable_logging()`, after writing its queued records."""
+    global _handler, _listener
+
+    if _handler is not None:
+        log.removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(disable_logging)
 
 
 class LogType:
-    prefix = None
+    level = logging.NOTSET
 
 
 class LogError(LogType):
-    prefix = f"{Back.RED}{Fore.WHITE} | ERROR   {Back.LIGHTBLACK_EX}{Fore.WHITE} {_get_time()} {Back.RED} {Back.RESET}"
+    level = logging.ERROR
 
 
 class LogInfo(LogType):
-    prefix = f"{Back.GREEN}{Fore.WHITE} | INFO    {Back.LIGHTBLACK_EX}{Fore.WHITE} {_get_time()} {Back.LIGHTGREEN_EX} {Back.RESET}"
+    level = logging.INFO
 
 
 class LogWarning(LogType):
-    prefix = f"{Back.YELLOW}{Fore.WHITE} | WARNING {Back.LIGHTBLACK_EX}{Fore.WHITE} {_get_time()} {Back.YELLOW} {Back.RESET}"
+    level = logging.WARNING
+
+
+_print_formatter: Optional[ColorFormatter] = None
 
 
 def print_log(msg: str, log_type: LogType) -> None:
-    """Print something into the console.
+    """Logs a message with the `mcauthpy` logger, `log`; see `enable_logging()`.
+    While no handler is configured, it is printed to stdout instead.
 
     Parameters:
         msg (str): The log message.
         type (LogType): The log type. The following are available: LogError, LogInfo, LogWarning.
 
     """
-    print(f"{log_type.prefix} {msg}")
+    global _print_formatter
+
+    if _handler is None and not logging.root.handlers:
+        if _print_formatter is None:
+            _print_formatter = ColorFormatter()
+        record = log.makeRecord(log.name, log_type.level, "", 0, "%s", (msg,), None)
+        print(_print_formatter.format(record))
+        return
+
+    log.log(log_type.level, "%s", msg)
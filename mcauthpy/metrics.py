@@ -0,0 +1,242 @@
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import bisect
+import threading
+
+# The upper bounds of the latency buckets, in seconds.
+BUCKETS = (
+    0.000001,
+    0.000005,
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+# A packet id, an HTTP endpoint, or None for a single series.
+Label = Optional[Union[int, str]]
+
+
+def _format_label(label: Label) -> str:
+    return f"0x{label:02X}" if isinstance(label, int) else label
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = BUCKETS) -> None:
+        """A latency histogram with fixed buckets. It is not locked itself;
+        `Metrics` guards its histograms.
+
+        Parameters:
+            buckets (Sequence[float]): The buckets' upper bounds in seconds, ascending.
+
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds the values observed by another histogram with the same buckets."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram(self.buckets)
+        histogram.merge(self)
+        return histogram
+
+    def cumulative(self) -> Dict[str, int]:
+        """Returns the amount of values up to each bound, like Prometheus' `le`."""
+        counts = {}
+        count = 0
+        for bound, bucket_count in zip((*self.buckets, "+Inf"), self.counts):
+            count += bucket_count
+            counts[str(bound)] = count
+        return counts
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "buckets": self.cumulative(),
+        }
+
+
+class Metrics:
+    def __init__(self, buckets: Sequence[float] = BUCKETS) -> None:
+        """Counters and latency histograms of a connection. Nothing is
+        recorded unless an instance is assigned, e.g. `client.metrics =
+        mcauthpy.Metrics()`; until then every instrumented step only checks
+        for None.
+
+        Recording and exporting are guarded by a lock, since the caller's
+        thread, the keep-alive thread and the decompression executor record
+        at the same time.
+
+        Counters: `packets_received`, `bytes_received`, `packets_sent` and
+        `bytes_sent` per packet id, and `http_retries` per endpoint.
+        Stages, in seconds: `unpack` and `send` per packet id, `read` (one
+        `get_received_buffer()`), `frame`, `decrypt`, `decompress`,
+        `compress`, `encrypt`, `login` (one `Client.login()`), and `http`
+        per endpoint.
+
+        Parameters:
+            buckets (Sequence[float]): The upper bounds of the latency buckets in seconds.
+
+        """
+        self.buckets = buckets
+        self.counters: Dict[Tuple[str, Label], int] = {}
+        self.histograms: Dict[Tuple[str, Label], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1, label: Label = None) -> None:
+        key = (name, label)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage: str, seconds: float, label: Label = None) -> None:
+        key = (stage, label)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def merge(self, other: "Metrics") -> None:
+        """Adds the values recorded by another instance, e.g. of another connection."""
+        counters, histograms = other.snapshot()
+
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+            for key, other_histogram in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(self.buckets)
+                histogram.merge(other_histogram)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(
+        self,
+    ) -> Tuple[Dict[Tuple[str, Label], int], Dict[Tuple[str, Label], Histogram]]:
+        """Returns copies of the counters and histograms, taken at once."""
+        with self._lock:
+            return dict(self.counters), {
+                key: histogram.copy() for key, histogram in self.histograms.items()
+            }
+
+    def as_dict(self) -> dict:
+        """Returns the metrics by name; labeled series are nested by their label."""
+        counters, histograms = self.snapshot()
+
+        named_counters = {}
+        for (name, label), value in sorted(counters.items(), key=_sort_key):
+            if label is None:
+                named_counters[name] = value
+            else:
+                named_counters.setdefault(name, {})[_format_label(label)] = value
+
+        stages = {}
+        for (stage, label), histogram in sorted(histograms.items(), key=_sort_key):
+            if label is None:
+                stages[stage] = histogram.as_dict()
+            else:
+                stages.setdefault(stage, {})[_format_label(label)] = histogram.as_dict()
+
+        return {"counters": named_counters, "stages": stages}
+
+    def to_prometheus(
+        self, prefix: str = "mcauthpy", labels: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Returns the metrics in the Prometheus text format.
+
+        >>> print(client.metrics.to_prometheus(labels={"bot": client.username}))
+
+        Parameters:
+            prefix (str): The prefix of every metric's name.
+            labels (Optional[Dict[str, str]]): Labels added to every sample.
+
+        Returns:
+            str: The exposition text.
+
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+        base_labels = [
+            f'{key}="{_escape(value)}"' for key, value in (labels or {}).items()
+        ]
+
+        def format_labels(*extra) -> str:
+            pairs = base_labels + [pair for pair in extra if pair]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        def label_pair(label: Label) -> str:
+            if label is None:
+                return ""
+            if isinstance(label, int):
+                return f'packet_id="{_format_label(label)}"'
+            return f'endpoint="{_escape(label)}"'
+
+        last_name = None
+        for (name, label), value in sorted(counters.items(), key=_sort_key):
+            metric = f"{prefix}_{name}_total"
+            if name != last_name:
+                lines.append(f"# TYPE {metric} counter")
+                last_name = name
+            lines.append(f"{metric}{format_labels(label_pair(label))} {value}")
+
+        if histograms:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+
+        for (stage, label), histogram in sorted(histograms.items(), key=_sort_key):
+            stage_label = f'stage="{stage}"'
+            pair = label_pair(label)
+
+            for bound, count in histogram.cumulative().items():
+                bound_label = f'le="{bound}"'
+                lines.append(
+                    f"{metric}_bucket{format_labels(stage_label, pair, bound_label)} {count}"
+                )
+            lines.append(
+                f"{metric}_sum{format_labels(stage_label, pair)} {histogram.total}"
+            )
+            lines.append(
+                f"{metric}_count{format_labels(stage_label, pair)} {histogram.count}"
+            )
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _sort_key(item) -> tuple:
+    (name, label), _ = item
+    return name, label is not None, str(type(label)), label if label else 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,6 +1,8 @@
+from typing import Callable
+
 import struct
 
-from mcauthpy.exceptions import TooBigToUnpack
+from mcauthpy.varint import decode_varint, decode_varlong
 
 SEGMENT_BITS = 0x7F
 CONTINUE_BIT = 0x80
@@ -12,6 +14,9 @@ class PacketBuffer:
         self._saved_data = b""
         self.compressed = compressed
 
+    def __len__(self) -> int:
+        return len(self.data)
+
     def purge(self) -> None:
         self.data = b""
 
@@ -50,26 +55,8 @@ class PacketBuffer:
             int: The unpacked VarInt as a Python integer.
 
         """
-        value = 0
-        position = 0
-        read_bytes = b""
-
-        while True:
-            current_byte = self.read(1)
-            read_bytes += current_byte
-
-            value |= (ord(current_byte) & SEGMENT_BITS) << position
-
-            if ord(current_byte) & CONTINUE_BIT == 0:
-                break
-
-            position += 7
-
-            if position >= 32:
-                raise TooBigToUnpack("VarInt is too big")
-
-        if value & (1 << 31):
-            value -= 1 << 32
+        value, length = decode_varint(self.data)
+        read_bytes = self.read(length)
 
         if provide_bytes:
             return value, read_bytes
@@ -82,20 +69,8 @@ class PacketBuffer:
             int: The unpacked VarLong as a Python integer.
 
         """
-        value = 0
-        position = 0
-
-        while True:
-            current_byte = self.read(1)
-            value |= (ord(current_byte) & SEGMENT_BITS) << position
-
-            if (ord(current_byte) & CONTINUE_BIT) == 0:
-                break
-
-            position += 7
-
-            if position >= 64:
-                raise TooBigToUnpack("VarLong is too big")
+        value, length = decode_varlong(self.data)
+        self.read(length)
 
         return value
 
@@ -145,3 +120,192 @@ class PacketBuffer:
 
     def unpack_long(self) -> int:
         return struct.unpack("q", self.read(8))[0]
+
+
+class CursorPacketBuffer(PacketBuffer):
+    def __init__(
+        self,
+        data: bytes = b"",
+        compressed: bool = False,
+        compact_threshold: int = 65536,
+    ) -> None:
+        """A PacketBuffer that keeps a read offset over a bytearray instead of
+        slicing off the remaining data on every read, so decoding a large packet
+        stays linear. Byte arrays are returned as memoryviews and consumed bytes
+        are only dropped once more than `compact_threshold` of them pile up.
+
+        Parameters:
+            data (bytes): The initial data.
+            compressed (bool): Whether the data is compressed.
+            compact_threshold (int): Consumed bytes allowed before compacting.
+
+        """
+        self._buffer = bytearray(data)
+        self._offset = 0
+        self._saved_offset = None
+        self._saved_end = None
+        self.compressed = compressed
+        self.compact_threshold = compact_threshold
+
+    @property
+    def data(self) -> bytes:
+        return bytes(self._buffer[self._offset :])
+
+    @data.setter
+    def data(self, value: bytes) -> None:
+        self._buffer = bytearray(value)
+        self._offset = 0
+        self._saved_offset = None
+        self._saved_end = None
+
+    def __len__(self) -> int:
+        return len(self._buffer) - self._offset
+
+    def _compact(self) -> None:
+        consumed = self._offset
+        if self._saved_offset is not None:
+            consumed = min(consumed, self._saved_offset)
+
+        if consumed < self.compact_threshold and consumed != len(self._buffer):
+            return
+
+        try:
+            del self._buffer[:consumed]
+        except BufferError:
+            # A memoryview handed out by read_view() is still alive.
+            self._buffer = self._buffer[consumed:]
+
+        self._offset -= consumed
+        if self._saved_offset is not None:
+            self._saved_offset -= consumed
+            self._saved_end -= consumed
+
+    def purge(self) -> None:
+        if self._saved_offset is not None:
+            self._buffer = self._buffer[self._saved_offset : self._saved_end]
+            self._saved_offset = 0
+            self._saved_end = len(self._buffer)
+            self._offset = len(self._buffer)
+        else:
+            self._buffer = bytearray()
+            self._offset = 0
+
+    def purge_save(self) -> None:
+        self._saved_offset = None
+        self._saved_end = None
+
+    def save(self) -> None:
+        self._saved_offset = self._offset
+        self._saved_end = len(self._buffer)
+
+    def revert(self) -> None:
+        if self._saved_offset is None:
+            self.purge()
+            return
+
+        if self._saved_end != len(self._buffer):
+            try:
+                del self._buffer[self._saved_end :]
+            except BufferError:
+                self._buffer = self._buffer[: self._saved_end]
+
+        self._offset = self._saved_offset
+        self.purge_save()
+
+    def read(self, length: int) -> bytes:
+        start = self._offset
+        self._offset = min(start + length, len(self._buffer))
+
+        return bytes(self._buffer[start : self._offset])
+
+    def read_view(self, length: int) -> memoryview:
+        """Reads without copying.
+
+        Parameters:
+            length (int): The amount of bytes to read.
+
+        Returns:
+            memoryview: A view over the read bytes.
+
+        """
+        start = self._offset
+        self._offset = min(start + length, len(self._buffer))
+
+        return memoryview(self._buffer)[start : self._offset]
+
+    def add(self, data: bytes) -> None:
+        self._compact()
+
+        try:
+            self._buffer += data
+        except BufferError:
+            self._buffer = self._buffer + data
+
+    def unpack_varint(self, provide_bytes: bool = False) -> int:
+        """Unpacks a VarInt.
+
+        Parameters:
+            provide_bytes (int): Provide the length of the VarInt.
+
+        Returns:
+            int: The unpacked VarInt as a Python integer.
+
+        """
+        start = self._offset
+        value, self._offset = decode_varint(self._buffer, start)
+
+        if provide_bytes:
+            return value, bytes(self._buffer[start : self._offset])
+        return value
+
+    def unpack_varlong(self) -> int:
+        """Unpacks a VarLong.
+
+        Returns:
+            int: The unpacked VarLong as a Python integer.
+
+        """
+        value, self._offset = decode_varlong(self._buffer, self._offset)
+        return value
+
+    def unpack_byte_array(self, length) -> memoryview:
+        """Unpacks a byte array without copying it.
+
+        Returns:
+            memoryview: A view over the unpacked bytes.
+
+        """
+        return self.read_view(length)
+
+
+class LazyPacketBuffer(PacketBuffer):
+    def __init__(self, load: Callable[[], bytes], compressed: bool = False) -> None:
+        """A PacketBuffer whose data is only decompressed and copied out of the
+        received frame when it is first accessed.
+
+        Parameters:
+            load (Callable[[], bytes]): Returns the packet's data.
+            compressed (bool): Whether the data is compressed.
+
+        """
+        self._load = load
+        self._data = None
+        self._saved_data = b""
+        self.compressed = compressed
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the data has been accessed yet."""
+        return self._load is None
+
+    @property
+    def data(self) -> bytes:
+        if self._load is not None:
+            self._data = self._load()
+            self._load = None
+        return self._data
+
+    @data.setter
+    def data(self, value: bytes) -> None:
+        self._data = value
+        self._load = None
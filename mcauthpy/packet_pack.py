@@ -1,5 +1,7 @@
 import struct
 
+from mcauthpy.varint import encode_varint
+
 SEGMENT_BITS = 0x7F
 CONTINUE_BIT = 0x80
 
@@ -31,19 +33,7 @@ def pack_varint(value: int) -> bytes:
         bytes: Data in Minecraft: Java Edition VarInt format.
 
     """
-    data = b""
-
-    if value < 0:
-        value += 1 << 32
-
-    while True:
-        if (value & ~SEGMENT_BITS) == 0:
-            data += struct.pack("B", value)
-            return data
-
-        data += struct.pack("B", (value & SEGMENT_BITS) | CONTINUE_BIT)
-
-        value >>= 7
+    return encode_varint(value)
 
 
 def pack_varlong(value: int) -> bytes:
@@ -0,0 +1,193 @@
+from typing import Callable, Optional, Set
+
+import selectors
+
+from .client import Client
+from .dispatcher import Dispatcher
+from .exceptions import DecompressionError, TooBigToUnpack
+from .logger import log
+from .transport import send_buffers
+
+# Errors that end one connection; the pool goes on with the others. An
+# IndexError is a VarInt that a malformed packet cut short.
+CONNECTION_ERRORS = (
+    ConnectionError,
+    OSError,
+    DecompressionError,
+    TooBigToUnpack,
+    IndexError,
+)
+
+
+class ClientPool:
+    def __init__(
+        self,
+        dispatcher: Optional[Dispatcher] = None,
+        on_disconnect: Optional[Callable[[Client, Exception], None]] = None,
+    ) -> None:
+        """Drives many logged in clients from one thread. Their sockets are put
+        in non-blocking mode and multiplexed with `selectors` (epoll on Linux);
+        every read is fed into the client's own frame decoder and its complete
+        packets are dispatched. Packets that a connection does not take right
+        away are kept and written once it is writable, so one slow connection
+        does not hold up the others.
+
+        A connection that fails or sends a malformed packet is closed and
+        removed; an exception raised by a handler is logged, and the
+        following packets are still dispatched.
+
+        >>> pool = mcauthpy.ClientPool(dispatcher)
+        >>> for client in clients:
+        ...     pool.add(client)
+        >>> pool.run()
+
+        Parameters:
+            dispatcher (Optional[Dispatcher]): Handles the packets; a `Dispatcher()` with the protocol handlers if None.
+            on_disconnect (Optional[Callable[[Client, Exception], None]]): Called when a connection is closed or fails.
+
+        """
+        self.dispatcher = dispatcher if dispatcher is not None else Dispatcher()
+        self.on_disconnect = on_disconnect
+        self.selector = selectors.DefaultSelector()
+        self.clients: Set[Client] = set()
+        # Clients that were left with unsent packets outside of `poll()`.
+        self._unsent: Set[Client] = set()
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def add(self, client: Client) -> int:
+        """Adds a logged in client to the pool. Packets that were received
+        along with the login are dispatched right away.
+
+        Parameters:
+            client (Client): The client; `login()` must have returned.
+
+        Returns:
+            int: The amount of packets dispatched.
+
+        """
+        protocol_version = client.protocol_version
+        if protocol_version not in (None, self.dispatcher.protocol_version):
+            raise ValueError(
+                f"The dispatcher handles protocol {self.dispatcher.protocol_version}, "
+                f"not {protocol_version}"
+            )
+
+        client.socket.setblocking(False)
+        client._unsent = []
+        client._on_unsent = self._unsent.add
+        self.selector.register(client.socket, selectors.EVENT_READ, client)
+        self.clients.add(client)
+
+        dispatched = self._dispatch(client)
+        self._update_events(client)
+        return dispatched
+
+    def remove(self, client: Client) -> None:
+        """Removes a client from the pool; its socket is left open and in
+        non-blocking mode. Packets the connection did not take yet are sent
+        first, waiting until it takes them.
+
+        Parameters:
+            client (Client): The client.
+
+        """
+        if client in self.clients:
+            self.clients.remove(client)
+            self.selector.unregister(client.socket)
+
+            self._unsent.discard(client)
+            with client._send_lock:
+                client._on_unsent = None
+                unsent, client._unsent = client._unsent, None
+                if unsent:
+                    send_buffers(client.socket, unsent)
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """Waits until a connection is readable and dispatches the packets of
+        every readable connection.
+
+        Parameters:
+            timeout (Optional[float]): Seconds to wait at most; forever if None.
+
+        Returns:
+            int: The amount of packets dispatched.
+
+        """
+        dispatched = 0
+
+        while self._unsent:
+            self._update_events(self._unsent.pop())
+
+        for key, events in self.selector.select(timeout):
+            client = key.data
+
+            try:
+                if events & selectors.EVENT_WRITE:
+                    client._flush_unsent()
+                if events & selectors.EVENT_READ:
+                    client._receive()
+                    dispatched += self._dispatch(client)
+                self._update_events(client, key.events)
+            except CONNECTION_ERRORS as e:
+                client._unsent = None
+                self.remove(client)
+                client.socket.close()
+                log.warning("Lost the connection of %s: %r", client.username, e)
+                if self.on_disconnect is not None:
+                    self.on_disconnect(client, e)
+
+        return dispatched
+
+    def run(self, timeout: Optional[float] = None) -> None:
+        """Polls until every client is disconnected or removed.
+
+        Parameters:
+            timeout (Optional[float]): Passed to `poll()`.
+
+        """
+        while self.clients:
+            self.poll(timeout)
+
+    def close(self) -> None:
+        """Closes every connection and the selector."""
+        for client in list(self.clients):
+            client._unsent = None
+            self.remove(client)
+            client.socket.close()
+        self.selector.close()
+
+    def _update_events(self, client: Client, events: Optional[int] = None) -> None:
+        # Waits for the socket to be writable only while packets are left.
+        wanted = selectors.EVENT_READ
+        if client._unsent:
+            wanted |= selectors.EVENT_WRITE
+
+        if events is None:
+            events = self.selector.get_key(client.socket).events
+        if events != wanted:
+            self.selector.modify(client.socket, wanted, client)
+
+    def _dispatch(self, client: Client) -> int:
+        dispatch = self.dispatcher.dispatch
+        dispatched = 0
+
+        # Frames are unpacked one at a time, so a packet that changes the
+        # connection's state applies to the ones after it.
+        for frame in client.decoder.frames():
+            packet_id, buffer = client._unpack_frame(frame)
+            try:
+                dispatch(client, packet_id, buffer)
+            except (ConnectionError, OSError):
+                # The connection itself failed, e.g. while a handler sent.
+                raise
+            except Exception:
+                log.exception(
+                    "A handler of packet 0x%02X failed on %s",
+                    packet_id,
+                    client.username,
+                )
+            dispatched += 1
+
+        return dispatched
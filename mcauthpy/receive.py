@@ -0,0 +1,103 @@
+from typing import Optional
+
+import socket
+
+MIN_READ_SIZE = 2048
+INITIAL_READ_SIZE = 16384
+MAX_READ_SIZE = 1 << 20
+
+
+class ReceiveEngine:
+    def __init__(
+        self,
+        initial_size: int = INITIAL_READ_SIZE,
+        min_size: int = MIN_READ_SIZE,
+        max_size: int = MAX_READ_SIZE,
+        shrink_after: int = 8,
+    ) -> None:
+        """Reads from a socket into one reusable buffer, adapting how much is
+        read per call to the traffic. Reads that fill the whole read size, and
+        frames bigger than it, double it; `shrink_after` reads in a row that
+        use less than a quarter of it halve it again.
+
+        Parameters:
+            initial_size (int): The read size to start with.
+            min_size (int): The smallest read size.
+            max_size (int): The largest read size.
+            shrink_after (int): Small reads in a row before the read size is halved.
+
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.shrink_after = shrink_after
+        self.size = max(min_size, min(initial_size, max_size))
+        self.buffer = bytearray(self.size)
+        self._small_reads = 0
+
+        self.reads = 0
+        self.received = 0
+
+    def recv(
+        self, sock: socket.socket, flags: int = 0, limit: Optional[int] = None
+    ) -> memoryview:
+        """Reads once from a socket. The returned view is only valid until the
+        next call.
+
+        Parameters:
+            sock (socket.socket): The connected socket.
+            flags (int): The `recv` flags, e.g. `socket.MSG_DONTWAIT`.
+            limit (Optional[int]): Reads at most this many bytes instead of the read size.
+
+        Returns:
+            memoryview: The received bytes; empty if the peer closed the connection.
+
+        """
+        size = self.size if limit is None else min(limit, len(self.buffer))
+        buffer = self.buffer
+        received = sock.recv_into(buffer, size, flags)
+
+        if limit is None:
+            self.record(received)
+
+        return memoryview(buffer)[:received]
+
+    def record(self, received: int) -> None:
+        """Adapts the read size to a read, e.g. one done by an asyncio stream.
+
+        Parameters:
+            received (int): The amount of bytes the read returned.
+
+        """
+        self.reads += 1
+        self.received += received
+
+        if received >= self.size:
+            self._small_reads = 0
+            self._resize(self.size * 2)
+        elif received < self.size // 4:
+            self._small_reads += 1
+            if self._small_reads >= self.shrink_after:
+                self._small_reads = 0
+                self._resize(self.size // 2)
+        else:
+            self._small_reads = 0
+
+    def expect(self, length: int) -> None:
+        """Grows the read size so a frame of `length` bytes can be read at once.
+
+        Parameters:
+            length (int): The size of a frame that is being received.
+
+        """
+        if length > self.size:
+            size = self.size
+            while size < length:
+                size *= 2
+            self._resize(size)
+
+    def _resize(self, size: int) -> None:
+        self.size = max(self.min_size, min(size, self.max_size))
+
+        # The buffer is kept when shrinking, so growing back costs nothing.
+        if self.size > len(self.buffer):
+            self.buffer = bytearray(self.size)
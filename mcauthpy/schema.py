@@ -0,0 +1,231 @@
+"""
+Declarative packet schemas.
+
+A packet is described once as a list of field types and compiled into a
+cached encoder and decoder. Runs of fixed-width fields are merged into a
+single `struct.Struct` call, and VarInt, string and byte array fields are
+handled in the same pass, so sending a packet is one call:
+
+>>> PLAYER_POSITION_AND_ROTATION = PacketSchema(0x12, DOUBLE, DOUBLE, DOUBLE, FLOAT, FLOAT, BOOLEAN)
+>>> client.send_schema(PLAYER_POSITION_AND_ROTATION, x, y, z, yaw, pitch, True)
+
+Fixed-width fields use network byte order (big-endian), like the protocol.
+
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import functools
+import struct
+
+from .packet_buffer import PacketBuffer
+from .varint import decode_varint, decode_varlong, encode_varint, encode_varlong
+
+
+class Field:
+    def __init__(self, name: str, fmt: Optional[str] = None) -> None:
+        """A field type of a packet schema.
+
+        Parameters:
+            name (str): The field type's name.
+            fmt (Optional[str]): The `struct` format of a fixed-width field, None for variable-width ones.
+
+        """
+        self.name = name
+        self.fmt = fmt
+
+    def __repr__(self) -> str:
+        return self.name.upper()
+
+
+BOOLEAN = Field("boolean", "?")
+BYTE = Field("byte", "b")
+UNSIGNED_BYTE = Field("unsigned_byte", "B")
+SHORT = Field("short", "h")
+UNSIGNED_SHORT = Field("unsigned_short", "H")
+INT = Field("int", "i")
+LONG = Field("long", "q")
+FLOAT = Field("float", "f")
+DOUBLE = Field("double", "d")
+UUID = Field("uuid", "16s")
+VARINT = Field("varint")
+VARLONG = Field("varlong")
+STRING = Field("string")
+BYTE_ARRAY = Field("byte_array")
+
+
+def _encode_string(value: str) -> bytes:
+    value = value.encode("utf-8")
+    return encode_varint(len(value)) + value
+
+
+def _encode_byte_array(value: bytes) -> bytes:
+    return encode_varint(len(value)) + bytes(value)
+
+
+def _decode_scalar(decode: Callable) -> Callable:
+    def decode_field(data: bytes, offset: int) -> Tuple[tuple, int]:
+        value, offset = decode(data, offset)
+        return (value,), offset
+
+    return decode_field
+
+
+def _decode_string(data: bytes, offset: int) -> Tuple[tuple, int]:
+    length, offset = decode_varint(data, offset)
+    end = offset + length
+    return (bytes(data[offset:end]).decode("utf-8"),), end
+
+
+def _decode_byte_array(data: bytes, offset: int) -> Tuple[tuple, int]:
+    length, offset = decode_varint(data, offset)
+    end = offset + length
+    return (bytes(data[offset:end]),), end
+
+
+_VARIABLE_FIELDS = {
+    "varint": (encode_varint, _decode_scalar(decode_varint)),
+    "varlong": (encode_varlong, _decode_scalar(decode_varlong)),
+    "string": (_encode_string, _decode_string),
+    "byte_array": (_encode_byte_array, _decode_byte_array),
+}
+
+
+def _compile_struct(fmt: str) -> Tuple[int, Callable, Callable]:
+    packer = struct.Struct(">" + fmt)
+    size = packer.size
+    unpack_from = packer.unpack_from
+
+    def decode_fields(data: bytes, offset: int) -> Tuple[tuple, int]:
+        return unpack_from(data, offset), offset + size
+
+    return len(packer.unpack(bytes(size))), packer.pack, decode_fields
+
+
+@functools.lru_cache(maxsize=None)
+def compile_fields(fields: Tuple[Field, ...]) -> List[Tuple[int, Callable, Callable]]:
+    """Compiles field types into encoding and decoding steps. The result is
+    cached, so schemas with the same fields share it.
+
+    Parameters:
+        fields (Tuple[Field, ...]): The field types.
+
+    Returns:
+        List[Tuple[int, Callable, Callable]]: The amount of values, encoder and decoder of every step.
+
+    """
+    steps = []
+    fmt = ""
+
+    for field in fields:
+        if field.fmt is not None:
+            fmt += field.fmt
+            continue
+
+        if fmt:
+            steps.append(_compile_struct(fmt))
+            fmt = ""
+
+        encode, decode = _VARIABLE_FIELDS[field.name]
+        steps.append((1, encode, decode))
+
+    if fmt:
+        steps.append(_compile_struct(fmt))
+
+    return steps
+
+
+class PacketSchema:
+    def __init__(self, packet_id: int, *fields: Field) -> None:
+        """A compiled packet layout.
+
+        Parameters:
+            packet_id (int): The packet's id.
+            *fields (Field): The packet's field types, in order.
+
+        """
+        self.packet_id = packet_id
+        self.fields = fields
+        self._packet_id = encode_varint(packet_id)
+        self._steps = compile_fields(fields)
+        self._count = sum(count for count, _, _ in self._steps)
+
+    def __repr__(self) -> str:
+        return (
+            f"PacketSchema({self.packet_id:#04x}, {', '.join(map(repr, self.fields))})"
+        )
+
+    def encode_fields(self, *values) -> bytes:
+        """Packs the packet's fields, without its id.
+
+        Parameters:
+            *values: One value per field.
+
+        Returns:
+            bytes: The packed fields.
+
+        """
+        if len(values) != self._count:
+            raise ValueError(f"{self!r} takes {self._count} values, got {len(values)}")
+
+        parts = []
+        index = 0
+
+        for count, encode, _ in self._steps:
+            parts.append(encode(*values[index : index + count]))
+            index += count
+
+        return b"".join(parts)
+
+    def encode(self, *values) -> bytes:
+        """Packs the packet's id and fields.
+
+        Parameters:
+            *values: One value per field.
+
+        Returns:
+            bytes: The packed packet, without its length prefix.
+
+        """
+        return self._packet_id + self.encode_fields(*values)
+
+    def decode(self, data: bytes, offset: int = 0) -> tuple:
+        """Unpacks the packet's fields.
+
+        Parameters:
+            data (bytes): The bytes-like packet data after the packet's id.
+            offset (int): Where the first field starts.
+
+        Returns:
+            tuple: One value per field.
+
+        """
+        return self._decode(data, offset)[0]
+
+    def _decode(self, data: bytes, offset: int) -> Tuple[tuple, int]:
+        values = []
+
+        for _, _, decode in self._steps:
+            decoded, offset = decode(data, offset)
+            values.extend(decoded)
+
+        return tuple(values), offset
+
+    def decode_buffer(self, buffer: PacketBuffer) -> tuple:
+        """Unpacks and consumes the packet's fields from a PacketBuffer, e.g.
+        one returned by `Client.get_received_buffer()`.
+
+        Parameters:
+            buffer (PacketBuffer): The packet data after the packet's id.
+
+        Returns:
+            tuple: One value per field.
+
+        """
+        values, offset = self._decode(buffer.data, 0)
+        buffer.read(offset)
+        return values
+
+
+HANDSHAKE = PacketSchema(0x00, VARINT, STRING, UNSIGNED_SHORT, VARINT)
+LOGIN_START = PacketSchema(0x00, STRING)
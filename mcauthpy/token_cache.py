@@ -0,0 +1,142 @@
+from typing import Dict, Iterator, Optional
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenCache:
+    def __init__(self, path: Optional[str] = None, expiry_margin: float = 60) -> None:
+        """Stores the tokens of the Microsoft authentication chain per account,
+        so logging in again only repeats the steps whose tokens have expired.
+
+        Several processes can share the file; every change is merged into
+        what the file holds at that moment, under a lock.
+
+        Parameters:
+            path (Optional[str]): The JSON file the tokens are persisted to. If None, they are only kept in memory.
+            expiry_margin (float): Tokens expiring within this many seconds are treated as expired.
+
+        """
+        self.path = path
+        self.expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, dict] = {}
+
+        self._load()
+
+    @staticmethod
+    def _key(account: str) -> str:
+        return account.strip().lower()
+
+    def get(self, account: str) -> dict:
+        """Returns the cached tokens of an account.
+
+        Parameters:
+            account (str): The Microsoft account's email address.
+
+        Returns:
+            dict: A copy of the cached tokens; empty if there are none.
+
+        """
+        with self._lock:
+            return dict(self._accounts.get(self._key(account), {}))
+
+    def update(self, account: str, **tokens) -> None:
+        """Merges tokens into the cache of an account and persists the cache.
+
+        Parameters:
+            account (str): The Microsoft account's email address.
+            **tokens: The tokens to store, e.g. `mc_token` and `mc_expires_at`.
+
+        """
+        with self._lock, self._file_lock():
+            self._load()
+            self._accounts.setdefault(self._key(account), {}).update(tokens)
+            self._save()
+
+    def remove(self, account: str) -> None:
+        """Forgets every token of an account.
+
+        Parameters:
+            account (str): The Microsoft account's email address.
+
+        """
+        with self._lock, self._file_lock():
+            self._load()
+            self._accounts.pop(self._key(account), None)
+            self._save()
+
+    def is_valid(self, tokens: dict, name: str) -> bool:
+        """Checks whether a cached token exists and has not expired yet.
+
+        Parameters:
+            tokens (dict): The tokens returned by `get()`.
+            name (str): The token's name, e.g. `xsts` for `xsts_token` and `xsts_expires_at`.
+
+        Returns:
+            bool: Whether the token can still be used.
+
+        """
+        if not tokens.get(f"{name}_token"):
+            return False
+
+        return tokens.get(f"{name}_expires_at", 0) - self.expiry_margin > time.time()
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # Held while the file is read, merged and written, so processes
+        # sharing it do not overwrite each other's tokens.
+        if self.path is None:
+            yield
+            return
+
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def _load(self) -> None:
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self._accounts = json.load(f)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+
+        # Written next to the file and swapped in, so readers never see a
+        # partial file.
+        fd, temp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.path),
+            suffix=".tmp",
+            dir=os.path.dirname(os.path.abspath(self.path)),
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._accounts, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -0,0 +1,92 @@
+from typing import List, Optional, Sequence
+
+import os
+import selectors
+import socket
+
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def write_buffers(sock: socket.socket, buffers: Sequence[bytes]) -> List[bytes]:
+    """Writes as much of the buffers to a non-blocking socket as it takes
+    right now, without concatenating them first.
+
+    Parameters:
+        sock (socket.socket): The connected socket.
+        buffers (Sequence[bytes]): The bytes-like objects to write, in order.
+
+    Returns:
+        List[bytes]: What is left to write, in order; empty if everything was written.
+
+    """
+    pending: List[bytes] = [buffer for buffer in buffers if len(buffer)]
+
+    index = 0
+    while index < len(pending):
+        try:
+            if hasattr(sock, "sendmsg"):
+                sent = sock.sendmsg(pending[index : index + IOV_MAX])
+            else:
+                sent = sock.send(pending[index])
+        except BlockingIOError:
+            break
+
+        while sent:
+            size = len(pending[index])
+            if sent >= size:
+                sent -= size
+                index += 1
+            else:
+                pending[index] = memoryview(pending[index])[sent:]
+                sent = 0
+
+    return pending[index:]
+
+
+def wait_writable(sock: socket.socket, timeout: Optional[float] = None) -> None:
+    """Waits until a socket can be written to. Uses `selectors`, which has no
+    limit on the file descriptor's number, unlike `select.select()`.
+
+    Parameters:
+        sock (socket.socket): The socket.
+        timeout (Optional[float]): Seconds to wait at most; forever if None.
+
+    Raises:
+        TimeoutError: If the socket is not writable in time.
+
+    """
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_WRITE)
+        if not selector.select(timeout):
+            raise TimeoutError("Timed out waiting to send")
+
+
+def send_buffers(sock: socket.socket, buffers: Sequence[bytes]) -> int:
+    """Writes buffers to a socket with as few syscalls as possible, without
+    concatenating them first. Short writes are continued where they stopped,
+    and non-blocking sockets are waited on until they are writable.
+
+    Parameters:
+        sock (socket.socket): The connected socket.
+        buffers (Sequence[bytes]): The bytes-like objects to write, in order.
+
+    Returns:
+        int: The amount of bytes written.
+
+    """
+    pending: List[bytes] = [buffer for buffer in buffers if len(buffer)]
+    total = sum(len(buffer) for buffer in pending)
+
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(pending))
+        return total
+
+    while pending:
+        pending = write_buffers(sock, pending)
+        if pending:
+            wait_writable(sock)
+
+    return total
@@ -0,0 +1,187 @@
+"""
+Single-pass VarInt and VarLong codec.
+
+Values below 16384 (two VarInt bytes) are encoded through a precomputed
+table, which covers almost every packet id, length and entity id delta.
+The batch functions encode or decode a whole sequence of VarInts at once,
+e.g. the entity ids of a Destroy Entities packet.
+
+"""
+
+from typing import Iterable, List, Tuple
+
+from mcauthpy.exceptions import TooBigToUnpack
+
+SEGMENT_BITS = 0x7F
+CONTINUE_BIT = 0x80
+
+_TABLE_SIZE = 1 << 14
+
+_VARINT_TABLE = tuple(
+    (
+        bytes((value,))
+        if value < CONTINUE_BIT
+        else bytes((value & SEGMENT_BITS | CONTINUE_BIT, value >> 7))
+    )
+    for value in range(_TABLE_SIZE)
+)
+
+
+def encode_varint(value: int) -> bytes:
+    """Encodes a VarInt. Negatives are encoded as their 32-bit two's complement.
+
+    Parameters:
+        value (int): Data to convert.
+
+    Returns:
+        bytes: Data in Minecraft: Java Edition VarInt format.
+
+    """
+    if 0 <= value < _TABLE_SIZE:
+        return _VARINT_TABLE[value]
+
+    if value < 0:
+        value += 1 << 32
+
+    return _encode(value)
+
+
+def encode_varlong(value: int) -> bytes:
+    """Encodes a VarLong. Negatives are encoded as their 64-bit two's complement.
+
+    Parameters:
+        value (int): Data to convert.
+
+    Returns:
+        bytes: Data in Minecraft: Java Edition VarLong format.
+
+    """
+    if 0 <= value < _TABLE_SIZE:
+        return _VARINT_TABLE[value]
+
+    if value < 0:
+        value += 1 << 64
+
+    return _encode(value)
+
+
+def _encode(value: int) -> bytes:
+    out = bytearray()
+
+    while value & ~SEGMENT_BITS:
+        out.append(value & SEGMENT_BITS | CONTINUE_BIT)
+        value >>= 7
+
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """Decodes a VarInt.
+
+    Parameters:
+        data (bytes): The bytes-like object to decode from.
+        offset (int): Where the VarInt starts.
+
+    Returns:
+        Tuple[int, int]: The decoded VarInt and the offset right after it.
+
+    """
+    current_byte = data[offset]
+    if current_byte < CONTINUE_BIT:
+        return current_byte, offset + 1
+
+    value = current_byte & SEGMENT_BITS
+    position = 7
+
+    while True:
+        offset += 1
+        current_byte = data[offset]
+        value |= (current_byte & SEGMENT_BITS) << position
+
+        if current_byte < CONTINUE_BIT:
+            break
+
+        position += 7
+
+        if position >= 32:
+            raise TooBigToUnpack("VarInt is too big")
+
+    if value & (1 << 31):
+        value -= 1 << 32
+
+    return value, offset + 1
+
+
+def decode_varlong(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """Decodes a VarLong.
+
+    Parameters:
+        data (bytes): The bytes-like object to decode from.
+        offset (int): Where the VarLong starts.
+
+    Returns:
+        Tuple[int, int]: The decoded VarLong and the offset right after it.
+
+    """
+    value = 0
+    position = 0
+
+    while True:
+        current_byte = data[offset]
+        offset += 1
+        value |= (current_byte & SEGMENT_BITS) << position
+
+        if current_byte < CONTINUE_BIT:
+            return value, offset
+
+        position += 7
+
+        if position >= 64:
+            raise TooBigToUnpack("VarLong is too big")
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    """Encodes a sequence of VarInts into one bytes object.
+
+    Parameters:
+        values (Iterable[int]): Data to convert.
+
+    Returns:
+        bytes: The concatenated VarInts.
+
+    """
+    table = _VARINT_TABLE
+    return b"".join(
+        [
+            table[value] if 0 <= value < _TABLE_SIZE else encode_varint(value)
+            for value in values
+        ]
+    )
+
+
+def decode_varints(data: bytes, count: int, offset: int = 0) -> Tuple[List[int], int]:
+    """Decodes `count` consecutive VarInts.
+
+    Parameters:
+        data (bytes): The bytes-like object to decode from.
+        count (int): The amount of VarInts to decode.
+        offset (int): Where the first VarInt starts.
+
+    Returns:
+        Tuple[List[int], int]: The decoded VarInts and the offset right after the last one.
+
+    """
+    values = []
+    append = values.append
+
+    for _ in range(count):
+        current_byte = data[offset]
+        if current_byte < CONTINUE_BIT:
+            append(current_byte)
+            offset += 1
+        else:
+            value, offset = decode_varint(data, offset)
+            append(value)
+
+    return values, offset
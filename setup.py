@@ -7,8 +7,12 @@ setup(
     url="https://github.com/novialriptide/mcauthpy",
     version="1.0.2.dev3",
     install_requires=[
-        "pycryptodome>=3.14.1",
         "cryptography>=36.0.2",
     ],
+    extras_require={
+        "pycryptodome": ["pycryptodome>=3.14.1"],
+        "color": ["colorama>=0.4.4"],
+    },
     packages=["mcauthpy"],
+    package_data={"mcauthpy": ["data/*.json"]},
 )
@@ -0,0 +1,367 @@
+"""
+A local stand-in for the Microsoft, Xbox Live and Minecraft services that
+the authentication chain talks to, and for the session server that a
+client joins through before an encrypted login. It is plugged into
+mcauthpy through `mcauthpy._http.override_base_url()`, see `install()`.
+
+Responses can be delayed per endpoint, and a share of the requests can be
+answered with status 429, to load test logins on one machine. The server
+can also run on its own:
+
+    python -m test.mock_auth --port 8080 --latency 0.02 --throttle 0.05
+
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+from mcauthpy import _http
+
+HOSTS = [
+    "https://login.live.com",
+    "https://user.auth.xboxlive.com",
+    "https://xsts.auth.xboxlive.com",
+    "https://api.minecraftservices.com",
+    "https://sessionserver.mojang.com",
+]
+
+LOGIN_PAGE = """<html><script>
+var ServerData = {{sFTTag:'<input type="hidden" name="PPFT" id="i0327" value="{ppft}"/>',urlPost:'https://login.live.com/ppsecure/post.srf?id=1',}};
+</script></html>"""
+
+
+class MockAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "MockAuthServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data: dict, status: int = 200) -> None:
+        self._send(json.dumps(data).encode(), "application/json", status)
+
+    def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _handle(self) -> None:
+        path = urlsplit(self.path).path
+        self.server.count(path)
+
+        latency = self.server.latencies.get(path, self.server.latency)
+        if latency:
+            time.sleep(latency)
+
+        if self.server.should_throttle():
+            self.server.count(path, self.server.throttled)
+            self._read_body()
+            body = b'{"error":"TOO_MANY_REQUESTS"}'
+            self.send_response(429)
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        handler = getattr(
+            self, "_" + path.strip("/").replace("/", "_").replace(".", "_"), None
+        )
+        if handler is None:
+            self._send_json({"error": "not found"}, 404)
+        else:
+            handler()
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def _oauth20_authorize_srf(self) -> None:
+        self._send(LOGIN_PAGE.format(ppft=uuid.uuid4().hex).encode(), "text/html")
+
+    def _ppsecure_post_srf(self) -> None:
+        form = parse_qs(self._read_body().decode())
+        code = self.server.issue("code", form["login"][0])
+
+        self.send_response(302)
+        self.send_header(
+            "Location", f"{self.server.url}/oauth20_desktop.srf?code={code}"
+        )
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _oauth20_desktop_srf(self) -> None:
+        self._send(b"", "text/html")
+
+    def _oauth20_token_srf(self) -> None:
+        form = parse_qs(self._read_body().decode())
+        if form["grant_type"][0] == "refresh_token":
+            account = self.server.lookup("refresh", form["refresh_token"][0])
+        else:
+            account = self.server.lookup("code", form["code"][0])
+
+        if account is None:
+            self._send_json({"error": "invalid_grant"}, 400)
+            return
+
+        self._send_json(
+            {
+                "token_type": "bearer",
+                "expires_in": 86400,
+                "access_token": self.server.issue("ms", account),
+                "refresh_token": self.server.issue("refresh", account),
+            }
+        )
+
+    def _user_authenticate(self) -> None:
+        body = json.loads(self._read_body())
+        account = self.server.lookup("ms", body["Properties"]["RpsTicket"])
+        self._send_json(
+            {
+                "Token": self.server.issue("xbl", account),
+                "DisplayClaims": {"xui": [{"uhs": str(abs(hash(account)))}]},
+            }
+        )
+
+    def _xsts_authorize(self) -> None:
+        body = json.loads(self._read_body())
+        account = self.server.lookup("xbl", body["Properties"]["UserTokens"][0])
+        not_after = time.strftime(
+            "%Y-%m-%dT%H:%M:%S.0000000Z", time.gmtime(time.time() + 57600)
+        )
+        self._send_json(
+            {
+                "Token": self.server.issue("xsts", account),
+                "NotAfter": not_after,
+                "DisplayClaims": {"xui": [{"uhs": str(abs(hash(account)))}]},
+            }
+        )
+
+    def _authentication_login_with_xbox(self) -> None:
+        body = json.loads(self._read_body())
+        xsts_token = body["identityToken"].split(";", 1)[1]
+        account = self.server.lookup("xsts", xsts_token)
+        self._send_json(
+            {
+                "token_type": "Bearer",
+                "expires_in": 86400,
+                "access_token": self.server.issue("mc", account),
+            }
+        )
+
+    def _minecraft_profile(self) -> None:
+        token = self.headers.get("Authorization", "").split(" ")[-1]
+        account = self.server.lookup("mc", token)
+        if account is None:
+            self._send_json({"error": "UNAUTHORIZED"}, 401)
+            return
+
+        self._send_json(
+            {
+                "id": profile_id(account),
+                "name": username(account),
+                "skins": [],
+                "capes": [],
+            }
+        )
+
+    def _session_minecraft_join(self) -> None:
+        body = json.loads(self._read_body())
+        account = self.server.lookup("mc", body["accessToken"])
+        if account is None or body["selectedProfile"] != profile_id(account):
+            self._send_json(
+                {
+                    "error": "ForbiddenOperationException",
+                    "errorMessage": "Invalid token.",
+                },
+                403,
+            )
+            return
+
+        self.server.join(account, body["serverId"])
+        self._send(b"", "application/json", 204)
+
+    def _session_minecraft_hasJoined(self) -> None:
+        query = parse_qs(urlsplit(self.path).query)
+        account = self.server.joined(query["username"][0], query["serverId"][0])
+        if account is None:
+            self._send(b"", "application/json", 204)
+            return
+
+        self._send_json(
+            {
+                "id": profile_id(account),
+                "name": username(account),
+                "properties": [],
+            }
+        )
+
+
+def profile_id(account: str) -> str:
+    return uuid.uuid5(uuid.NAMESPACE_DNS, account).hex
+
+
+def username(account: str) -> str:
+    return account.split("@")[0][:16]
+
+
+class MockAuthServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0,
+        latencies: Optional[Dict[str, float]] = None,
+        throttle: float = 0,
+        retry_after: Optional[int] = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """A local stand-in for every host of the authentication chain and
+        the session server.
+
+        Parameters:
+            host (str): The address to listen on.
+            port (int): The port to listen on; 0 picks a free one.
+            latency (float): Seconds every response is delayed by.
+            latencies (Optional[Dict[str, float]]): Seconds the responses of a path are delayed by instead, e.g. {"/session/minecraft/join": 0.1}.
+            throttle (float): The share of requests answered with status 429, from 0 to 1.
+            retry_after (Optional[int]): The Retry-After of those responses in seconds; none is sent if None.
+            seed (Optional[int]): Seeds the choice of the throttled requests.
+
+        """
+        super().__init__((host, port), MockAuthHandler)
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.requests: Dict[str, int] = {}
+        self.throttled: Dict[str, int] = {}
+        self._tokens: Dict[str, str] = {}
+        self._joins: Dict[str, Tuple[str, str]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, path: str, counts: Optional[Dict[str, int]] = None) -> None:
+        counts = self.requests if counts is None else counts
+        with self._lock:
+            counts[path] = counts.get(path, 0) + 1
+
+    def should_throttle(self) -> bool:
+        if not self.throttle:
+            return False
+        with self._lock:
+            return self._random.random() < self.throttle
+
+    def join(self, account: str, server_id: str) -> None:
+        with self._lock:
+            self._joins[username(account)] = (account, server_id)
+
+    def joined(self, name: str, server_id: str) -> Optional[str]:
+        """Returns the account that joined the server as `name`, if any."""
+        with self._lock:
+            account, joined_server_id = self._joins.get(name, (None, None))
+        return account if joined_server_id == server_id else None
+
+    def issue(self, kind: str, account: str) -> str:
+        token = f"{kind}.{uuid.uuid4().hex}"
+        with self._lock:
+            self._tokens[token] = account
+        return token
+
+    def lookup(self, kind: str, token: str) -> str:
+        if not token.startswith(kind + "."):
+            return None
+        with self._lock:
+            return self._tokens.get(token)
+
+    def start(self) -> "MockAuthServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def install(self) -> None:
+        """Points every host of the authentication chain at this server."""
+        install(self.url)
+
+    def uninstall(self) -> None:
+        install(None)
+
+
+def install(url: Optional[str]) -> None:
+    """Points every host of the authentication chain and the session server
+    at a mock server, e.g. one started from the command line.
+
+    Parameters:
+        url (Optional[str]): The mock server's URL. If None, the overrides are removed.
+
+    """
+    for host in HOSTS:
+        _http.override_base_url(host, url)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument(
+        "--path-latency",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("PATH", "SECONDS"),
+        help="delay the responses of one path instead",
+    )
+    parser.add_argument("--throttle", type=float, default=0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = MockAuthServer(
+        args.host,
+        args.port,
+        args.latency,
+        {path: float(seconds) for path, seconds in args.path_latency},
+        args.throttle,
+        args.retry_after,
+        args.seed,
+    )
+    print(f"Listening on {server.url}; in the client's process, call")
+    print(f'    test.mock_auth.install("{server.url}")')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+A local stand-in for a Minecraft: Java Edition server. It accepts the login
+of any username, encrypted with a local RSA key like an online mode server
+if asked to, and then streams scripted play packets to every connection,
+as fast as the connection takes them.
+
+With a `session_server`, encrypted logins are only accepted if the player
+joined through it, like vanilla servers check; see `test.mock_auth`.
+
+The tests and the benchmarks share it.
+
+"""
+
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import uuid
+import zlib
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+import mcauthpy
+
+# Entity Head Look, a small and frequent play packet.
+DEFAULT_PACKET = mcauthpy.encode_varint(0x3E) + b"\x00\x00\x00\x01\x40"
+
+# Entity Position
+POSITION_PACKET = mcauthpy.encode_varint(0x29) + b"\x01\x00\x10\x00\x00\xff\xf0\x01"
+
+# Chat Message, a few hundred bytes of JSON text.
+CHAT_PACKET = (
+    mcauthpy.encode_varint(0x0F)
+    + mcauthpy.pack_string(
+        '{"translate":"chat.type.text","with":[{"text":"Novial"},{"text":"'
+        + "the quick brown fox jumps over the lazy dog " * 6
+        + '"}]}'
+    )
+    + b"\x00"
+    + bytes(16)
+)
+
+
+def chunk_packet(size: int = 8192, seed: int = 0) -> bytes:
+    """A stand-in for Chunk Data and Update Light; block states from a small
+    palette compress about as well as real chunks."""
+    generator = random.Random(seed)
+    palette = b"\x00\x00\x00\x00\x01\x02\x07\x09\x0c\x0d"
+    blocks = bytes(generator.choice(palette) for _ in range(size))
+    return mcauthpy.encode_varint(0x22) + b"\x00\x00\x00\x01\x00\x00\x00\x02" + blocks
+
+
+# The packets of a busy play session, repeated: mostly small entity updates,
+# some chat, and a chunk now and then.
+DEFAULT_SCRIPT = [DEFAULT_PACKET] * 12 + [POSITION_PACKET] * 6 + [CHAT_PACKET]
+DEFAULT_SCRIPT += [chunk_packet()]
+
+# How much of the repeated script is sent at once.
+SEND_SIZE = 65536
+
+
+def frame(data: bytes, compression_threshold: int = -1) -> bytes:
+    """Prefixes a packet with its length; with compression enabled, the packet
+    is compressed like a server would if it reaches the threshold."""
+    if compression_threshold >= 0:
+        if len(data) >= compression_threshold:
+            data = mcauthpy.encode_varint(len(data)) + zlib.compress(data)
+        else:
+            data = b"\x00" + data
+    return mcauthpy.encode_varint(len(data)) + data
+
+
+class MockClient(mcauthpy.Client):
+    # Servers without a session server do not check the join.
+    def _join_server(self, server_hash: str) -> None:
+        pass
+
+
+class MockMinecraftServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        packets: int = 10000,
+        packet: bytes = DEFAULT_PACKET,
+        compression_threshold: int = 256,
+        script: Optional[Sequence[bytes]] = None,
+        online_mode: bool = False,
+        session_server: Optional[str] = None,
+        login_plugin: bool = False,
+    ) -> None:
+        """A local stand-in for a server.
+
+        Parameters:
+            host (str): The address to listen on.
+            port (int): The port to listen on; 0 picks a free one.
+            packets (int): The amount of packets sent to every connection after its login.
+            packet (bytes): The packet's id and fields, if no script is given.
+            compression_threshold (int): Sent in Set Compression; -1 disables compression.
+            script (Optional[Sequence[bytes]]): The ids and fields of the packets to send, repeated in order; e.g. `DEFAULT_SCRIPT`.
+            online_mode (bool): Whether logins are encrypted.
+            session_server (Optional[str]): The URL of the session server encrypted logins are checked with; not checked if None.
+            login_plugin (bool): Whether a Login Plugin Request is sent before Login Success; the answers are kept in `plugin_responses`.
+
+        """
+        self.socket = socket.create_server((host, port), backlog=1024)
+        self.packets = packets
+        self.script = list(script) if script is not None else [packet]
+        self.compression_threshold = compression_threshold
+        self.online_mode = online_mode
+        self.session_server = session_server
+        self.login_plugin = login_plugin
+        self.plugin_responses: List[bytes] = []
+        self.connections: List[socket.socket] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        frames = [frame(packet, compression_threshold) for packet in self.script]
+        self._cycle = b"".join(frames)
+        self._frames = frames
+
+        if online_mode:
+            self.private_key = rsa.generate_private_key(65537, 1024)
+            self.public_key = self.private_key.public_key().public_bytes(
+                Encoding.DER, PublicFormat.SubjectPublicKeyInfo
+            )
+
+    @property
+    def address(self):
+        return self.socket.getsockname()
+
+    def start(self) -> "MockMinecraftServer":
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped = True
+        self.socket.close()
+        for connection in self.connections:
+            connection.close()
+
+    def _serve(self) -> None:
+        while not self._stopped:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections.append(connection)
+            threading.Thread(
+                target=self._handle, args=(connection,), daemon=True
+            ).start()
+
+    def _read_frames(
+        self,
+        connection: socket.socket,
+        decoder: mcauthpy.FrameDecoder,
+        frames: List[bytes],
+        count: int,
+        cipher: Optional[mcauthpy.CFB8Cipher] = None,
+    ) -> bool:
+        while len(frames) < count:
+            data = connection.recv(4096)
+            if not data:
+                return False
+            if cipher is not None:
+                data = cipher.decrypt(data)
+            decoder.feed(data)
+            frames.extend(bytes(view) for view in decoder.frames())
+        return True
+
+    def _encrypt(
+        self, connection, decoder, frames
+    ) -> Tuple[Optional[mcauthpy.CFB8Cipher], str]:
+        verify_token = os.urandom(4)
+        connection.sendall(
+            frame(
+                b"\x01"
+                + mcauthpy.pack_string("")
+                + mcauthpy.encode_varint(len(self.public_key))
+                + self.public_key
+                + mcauthpy.encode_varint(len(verify_token))
+                + verify_token
+            )
+        )
+
+        # Encryption Response
+        if not self._read_frames(connection, decoder, frames, 3):
+            return None, ""
+
+        response = frames[2]
+        length, offset = mcauthpy.decode_varint(response, 1)
+        encrypted_secret = response[offset : offset + length]
+        length, offset = mcauthpy.decode_varint(response, offset + length)
+        encrypted_token = response[offset : offset + length]
+
+        if self.private_key.decrypt(encrypted_token, PKCS1v15()) != verify_token:
+            return None, ""
+
+        shared_secret = self.private_key.decrypt(encrypted_secret, PKCS1v15())
+        server_hash = hashlib.sha1(shared_secret + self.public_key)
+        return (
+            mcauthpy.create_cipher(shared_secret),
+            mcauthpy.minecraft_sha1_hash(server_hash),
+        )
+
+    def _has_joined(self, username: str, server_id: str) -> bool:
+        query = urlencode({"username": username, "serverId": server_id})
+        url = f"{self.session_server}/session/minecraft/hasJoined?{query}"
+        while True:
+            try:
+                with urlopen(url, timeout=30) as response:
+                    return response.status == 200
+            except HTTPError as e:
+                # Throttled requests are retried, like a real server would.
+                if e.code != 429:
+                    raise
+
+    def _handle(self, connection: socket.socket) -> None:
+        decoder = mcauthpy.FrameDecoder()
+        frames = []
+
+        try:
+            # Handshake and Login Start
+            if not self._read_frames(connection, decoder, frames, 2):
+                return
+
+            username = mcauthpy.schema.LOGIN_START.decode(frames[1], 1)[0]
+
+            send = connection.sendall
+            cipher = None
+            if self.online_mode:
+                cipher, server_id = self._encrypt(connection, decoder, frames)
+                if cipher is None:
+                    return
+
+                def send(data: bytes) -> None:
+                    connection.sendall(cipher.encrypt(data))
+
+                if self.session_server is not None and not self._has_joined(
+                    username, server_id
+                ):
+                    reason = json.dumps(
+                        {"translate": "multiplayer.disconnect.unverified_username"}
+                    )
+                    send(frame(b"\x00" + mcauthpy.pack_string(reason)))
+                    return
+
+            if self.login_plugin:
+                send(frame(b"\x04\x07" + mcauthpy.pack_string("mc:custom")))
+                if not self._read_frames(
+                    connection, decoder, frames, len(frames) + 1, cipher
+                ):
+                    return
+                self.plugin_responses.append(frames[-1])
+
+            threshold = self.compression_threshold
+            login_success = (
+                mcauthpy.encode_varint(0x02)
+                + uuid.uuid3(uuid.NAMESPACE_OID, username).bytes
+                + mcauthpy.pack_string(username)
+            )
+
+            send(
+                frame(b"\x03" + mcauthpy.encode_varint(threshold))
+                + frame(login_success, threshold)
+            )
+            self._stream(send)
+
+            # Wait for the client to hang up.
+            while connection.recv(4096):
+                pass
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def _stream(self, send) -> None:
+        cycles, remainder = divmod(self.packets, len(self.script))
+        repeat = max(1, SEND_SIZE // len(self._cycle))
+
+        for _ in range(cycles // repeat):
+            send(self._cycle * repeat)
+        if cycles % repeat:
+            send(self._cycle * (cycles % repeat))
+        if remainder:
+            send(b"".join(self._frames[:remainder]))
+
+
+def _serve_in_process(addresses, kwargs: dict) -> None:
+    server = MockMinecraftServer(**kwargs).start()
+    addresses.put(server.address)
+    server._thread.join()
+
+
+def start_process(**kwargs) -> Tuple[multiprocessing.Process, Tuple[str, int]]:
+    """Runs a server in its own process, so it does not compete with the
+    measured client for the GIL. Stop it with `process.terminate()`.
+
+    Parameters:
+        **kwargs: Passed to `MockMinecraftServer`.
+
+    Returns:
+        Tuple[multiprocessing.Process, Tuple[str, int]]: The process, and the server's address.
+
+    """
+    context = multiprocessing.get_context("spawn")
+    addresses = context.Queue()
+    process = context.Process(
+        target=_serve_in_process, args=(addresses, kwargs), daemon=True
+    )
+    process.start()
+    return process, addresses.get(timeout=30)
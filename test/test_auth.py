@@ -0,0 +1,294 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import mcauthpy
+from mcauthpy import _auth, _http
+from .mock_auth import MockAuthServer
+from .mock_server import MockClient, MockMinecraftServer
+
+
+class XboxLiveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = set()
+    throttled = 0
+
+    def do_POST(self):
+        XboxLiveHandler.client_ports.add(self.client_address[1])
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+
+        if XboxLiveHandler.throttled:
+            XboxLiveHandler.throttled -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.loads(body)
+
+        data = json.dumps(
+            {
+                "Token": body["Properties"]["RpsTicket"][::-1],
+                "DisplayClaims": {"xui": [{"uhs": "1234"}]},
+            }
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTPTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), XboxLiveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        _http.configure_session()
+        _http.override_base_url(
+            "https://user.auth.xboxlive.com",
+            f"http://127.0.0.1:{self.server.server_address[1]}",
+        )
+
+    def tearDown(self):
+        _http.clear_base_url_overrides()
+        _http.set_session(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_resolve_url(self):
+        self.assertEqual(
+            _http.resolve_url("https://user.auth.xboxlive.com/user/authenticate"),
+            f"http://127.0.0.1:{self.server.server_address[1]}/user/authenticate",
+        )
+        self.assertEqual(
+            _http.resolve_url("https://user.auth.xboxlive.com.example/"),
+            "https://user.auth.xboxlive.com.example/",
+        )
+
+    def test_keep_alive(self):
+        XboxLiveHandler.client_ports.clear()
+
+        for _ in range(3):
+            self.assertEqual(_auth.get_xboxlive_secret("abc")["Token"], "cba")
+
+        self.assertEqual(len(XboxLiveHandler.client_ports), 1)
+
+    def test_retry_throttled(self):
+        XboxLiveHandler.throttled = 2
+        self.assertEqual(_auth.get_xboxlive_secret("abc")["Token"], "cba")
+        self.assertEqual(XboxLiveHandler.throttled, 0)
+
+    def test_rate_limit(self):
+        bucket = _http.TokenBucket(100, 2)
+        start = time.monotonic()
+        waited = [bucket.acquire() for _ in range(4)]
+
+        self.assertEqual(waited[:2], [0, 0])
+        self.assertGreater(waited[3], 0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+
+class TokenCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tokens.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persist(self):
+        cache = mcauthpy.TokenCache(self.path)
+        cache.update(
+            "Novial@Example.com", mc_token="abc", mc_expires_at=time.time() + 3600
+        )
+
+        cache = mcauthpy.TokenCache(self.path)
+        tokens = cache.get("novial@example.com")
+        self.assertEqual(tokens["mc_token"], "abc")
+        self.assertTrue(cache.is_valid(tokens, "mc"))
+        self.assertFalse(cache.is_valid(tokens, "xsts"))
+
+        cache.update("novial@example.com", mc_expires_at=time.time() + 30)
+        self.assertFalse(cache.is_valid(cache.get("novial@example.com"), "mc"))
+
+    def test_shared_file(self):
+        first = mcauthpy.TokenCache(self.path)
+        second = mcauthpy.TokenCache(self.path)
+
+        first.update("a@example.com", refresh_token="a")
+        second.update("b@example.com", refresh_token="b")
+        first.update("a@example.com", mc_token="abc")
+
+        # Neither overwrote the other's tokens.
+        cache = mcauthpy.TokenCache(self.path)
+        self.assertEqual(
+            cache.get("a@example.com"), {"refresh_token": "a", "mc_token": "abc"}
+        )
+        self.assertEqual(cache.get("b@example.com"), {"refresh_token": "b"})
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)), ["tokens.json", "tokens.json.lock"]
+        )
+
+    def test_cached_login(self):
+        cache = mcauthpy.TokenCache()
+        cache.update(
+            "novial@example.com",
+            mc_token="abc",
+            mc_expires_at=time.time() + 3600,
+            profile={"id": "1234", "name": "Novial"},
+        )
+
+        with mock.patch.object(_auth, "get_microsoft_secret") as get_microsoft_secret:
+            client = mcauthpy.Client.login_from_microsoft(
+                "novial@example.com", "password", cache
+            )
+
+        get_microsoft_secret.assert_not_called()
+        self.assertEqual(client.username, "Novial")
+        self.assertEqual(client._mctoken, "abc")
+
+    def test_refresh_login(self):
+        cache = mcauthpy.TokenCache()
+        cache.update("novial@example.com", refresh_token="refresh")
+
+        with mock.patch.multiple(
+            _auth,
+            get_microsoft_secret=mock.DEFAULT,
+            refresh_microsoft_secret=mock.Mock(
+                return_value={"access_token": "ms", "refresh_token": "refresh2"}
+            ),
+            _get_xsts=mock.Mock(
+                return_value=(
+                    "uhs",
+                    {"Token": "xsts", "NotAfter": "2099-01-01T00:00:00.1234567Z"},
+                )
+            ),
+            get_minecraft=mock.Mock(
+                return_value={"access_token": "mc", "expires_in": 86400}
+            ),
+            get_mc_profile=mock.Mock(return_value={"id": "1234", "name": "Novial"}),
+        ) as mocks:
+            token, profile = _auth.get_cached_mc_login(
+                "novial@example.com", "password", cache
+            )
+
+        mocks["get_microsoft_secret"].assert_not_called()
+        self.assertEqual(token, "mc")
+        self.assertEqual(profile["name"], "Novial")
+
+        tokens = cache.get("novial@example.com")
+        self.assertEqual(tokens["refresh_token"], "refresh2")
+        self.assertTrue(cache.is_valid(tokens, "xsts"))
+
+
+class BulkLoginTest(unittest.TestCase):
+    def setUp(self):
+        self.server = MockAuthServer().start()
+        self.server.install()
+
+    def tearDown(self):
+        self.server.uninstall()
+        self.server.stop()
+
+    def test_login_many(self):
+        credentials = [(f"bot{i}@example.com", "password") for i in range(6)]
+        token_cache = mcauthpy.TokenCache()
+
+        clients = dict(
+            mcauthpy.login_many(credentials, max_workers=3, token_cache=token_cache)
+        )
+        self.assertEqual(
+            sorted(client.username for client in clients.values()),
+            [f"bot{i}" for i in range(6)],
+        )
+        self.assertEqual(self.server.requests["/oauth20_authorize.srf"], 6)
+
+        dict(mcauthpy.login_many(credentials, token_cache=token_cache))
+        self.assertEqual(self.server.requests["/minecraft/profile"], 6)
+
+    def test_scoped_rate_limits(self):
+        _http.set_rate_limit("https://login.live.com", 5)
+        self.addCleanup(_http.clear_rate_limits)
+
+        rates = []
+        acquire = _http.TokenBucket.acquire
+
+        def record(bucket):
+            rates.append(bucket.rate)
+            return acquire(bucket)
+
+        rate_limits = {
+            "https://login.live.com": (1000, 10),
+            "https://api.minecraftservices.com": (2000, 10),
+        }
+        with mock.patch.object(_http.TokenBucket, "acquire", record):
+            clients = mcauthpy.login_many(
+                [("bot@example.com", "password")], 1, None, rate_limits
+            )
+            self.assertEqual(next(clients)[1].username, "bot")
+            # Nothing leaks into the caller's context.
+            self.assertEqual(_http._context_rate_limits.get(), {})
+            clients.close()
+
+            scoped = list(rates)
+            dict(mcauthpy.login_many([("bot2@example.com", "password")]))
+
+        self.assertEqual(sorted(set(scoped)), [1000, 2000])
+        self.assertEqual(set(rates[len(scoped) :]), {5})
+        self.assertEqual(list(_http._rate_limits), ["https://login.live.com"])
+
+
+class SessionJoinTest(unittest.TestCase):
+    def setUp(self):
+        self.server = MockAuthServer(throttle=0.3, seed=1).start()
+        self.server.install()
+
+    def tearDown(self):
+        self.server.uninstall()
+        self.server.stop()
+
+    def test_encrypted_login(self):
+        minecraft_server = MockMinecraftServer(
+            packets=0, online_mode=True, session_server=self.server.url
+        ).start()
+
+        try:
+            client = mcauthpy.Client.login_from_microsoft("bot@example.com", "password")
+            client.connect(*minecraft_server.address)
+            client.login()
+            self.assertTrue(client.login_success.data.endswith(b"\x03bot"))
+            client.socket.close()
+
+            # Logs in without joining through the session server.
+            impostor = MockClient.from_token("token", {"id": "1234", "name": "bot"})
+            impostor.connect(*minecraft_server.address)
+            with self.assertRaisesRegex(ConnectionError, "unverified_username"):
+                impostor.login()
+            impostor.socket.close()
+        finally:
+            minecraft_server.stop()
+
+        # The server asks about both, but only the client joined.
+        served = {
+            path: count - self.server.throttled.get(path, 0)
+            for path, count in self.server.requests.items()
+        }
+        self.assertEqual(served["/session/minecraft/join"], 1)
+        self.assertEqual(served["/session/minecraft/hasJoined"], 2)
+        self.assertGreater(sum(self.server.throttled.values()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
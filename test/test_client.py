@@ -1,6 +1,18 @@
 import unittest
 import mcauthpy
 import hashlib
+import socket
+import asyncio
+import threading
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+
+from . import mock_server
+from .mock_server import MockClient, MockMinecraftServer
 
 
 class DataTypesTest(unittest.TestCase):
@@ -33,6 +45,34 @@ class DataTypesTest(unittest.TestCase):
         # self.assertEqual(mcauthpy.pack_varlong(-2147483648), b"\x80\x80\x80\x80\xf8\xff\xff\xff\x01")
         # self.assertEqual(mcauthpy.pack_varlong(-9223372036854775808), b"\x80\x80\x80\x80\x80\x80\x80\x80\x80\x01")
 
+    def test_varint_codec(self):
+        for value in (0, 1, 127, 128, 16383, 16384, 25565, 2147483647, -1, -2147483648):
+            encoded = mcauthpy.encode_varint(value)
+            self.assertEqual(encoded, mcauthpy.pack_varint(value))
+            self.assertEqual(
+                mcauthpy.decode_varint(b"\x00" + encoded, 1), (value, len(encoded) + 1)
+            )
+
+        self.assertEqual(mcauthpy.encode_varlong(-1), b"\xff" * 9 + b"\x01")
+        self.assertEqual(
+            mcauthpy.decode_varlong(b"\xff\xff\xff\xff\xff\xff\xff\xff\x7f"),
+            (9223372036854775807, 9),
+        )
+        self.assertRaises(
+            mcauthpy.TooBigToUnpack, mcauthpy.decode_varint, b"\xff\xff\xff\xff\xff\x01"
+        )
+
+    def test_varint_batch(self):
+        values = [0, 300, 5, 2097151, -1]
+        encoded = mcauthpy.encode_varints(values)
+
+        self.assertEqual(
+            encoded, b"".join(mcauthpy.pack_varint(value) for value in values)
+        )
+        self.assertEqual(
+            mcauthpy.decode_varints(encoded + b"\x01", 5), (values, len(encoded))
+        )
+
     def test_sha1(self):
         self.assertEqual(
             mcauthpy.minecraft_sha1_hash(hashlib.sha1(b"Notch")),
@@ -48,5 +88,654 @@ class DataTypesTest(unittest.TestCase):
         )
 
 
+class ClientTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mcauthpy.Client.login_from_username("Novial")
+        self.client.socket, self.server = socket.socketpair()
+        self.executor = ThreadPoolExecutor(2)
+
+    def tearDown(self):
+        self.client.socket.close()
+        self.server.close()
+        self.executor.shutdown()
+
+    def test_read_packets(self):
+        self.server.sendall(b"\x02\x21\x05\x01\x22\x03\x0f\x01")
+
+        packets = self.client.read_packets()
+        self.assertEqual([packet_id for packet_id, _ in packets], [0x21, 0x22])
+        self.assertEqual(packets[0][1].data, b"\x05")
+
+        self.server.sendall(b"\x02")
+        self.assertEqual(self.client.get_received_buffer()[0], 0x0F)
+
+    def test_read_packets_max_n(self):
+        self.server.sendall(b"\x01\x01\x01\x02\x01\x03")
+
+        self.assertEqual(len(self.client.read_packets(2)), 2)
+        self.assertEqual(self.client.read_packets(2)[0][0], 0x03)
+
+    def test_send_packet(self):
+        self.client.compression_threshold = 4
+        self.assertEqual(self.client.send_packet(0x21, b"\x01"), b"\x03\x00\x21\x01")
+        size = self.client.write_packet(0x22, b"\x00" * 64)
+
+        received = self.server.recv(1024)
+        self.assertEqual(len(received), 4 + size)
+        self.assertEqual(received[:4], b"\x03\x00\x21\x01")
+        self.assertEqual(received[4:6], bytes([size - 1, 65]))
+        self.assertEqual(zlib.decompress(received[6:]), b"\x22" + b"\x00" * 64)
+
+    def test_read_compressed_packets(self):
+        self.client.compression_threshold = 4
+        self.client.compression = mcauthpy.CompressionPolicy(
+            level=1, offload_threshold=16, executor=self.executor
+        )
+        big = zlib.compress(b"\x22" + b"\x07" * 256)
+        small = zlib.compress(b"\x21\x01\x02\x03")
+        for body in [b"\x81\x02" + big, b"\x04" + small, b"\x00\x0f\x01"]:
+            self.server.sendall(bytes([len(body)]) + body)
+
+        packets = self.client.read_packets()
+        self.assertEqual([packet_id for packet_id, _ in packets], [0x22, 0x21, 0x0F])
+        self.assertEqual(packets[0][1].data, b"\x07" * 256)
+        self.assertEqual(packets[1][1].data, b"\x01\x02\x03")
+
+    def test_adaptive_read_size(self):
+        receiver = mcauthpy.ReceiveEngine(4096, min_size=1024, shrink_after=2)
+        self.client.receiver = receiver
+
+        body = b"\x21" + bytes(200000)
+        # Sent while the client reads; it is more than a socket buffer holds
+        # on some platforms.
+        data = mcauthpy.encode_varint(len(body)) + body + b"\x01\x22"
+        thread = threading.Thread(target=self.server.sendall, args=(data,))
+        thread.start()
+
+        self.assertEqual(self.client.get_received_buffer()[1].data, body[1:])
+        self.assertGreaterEqual(receiver.size, len(body))
+        self.assertLess(receiver.reads, 8)
+
+        grown = receiver.size
+        self.assertEqual(self.client.get_received_buffer()[0], 0x22)
+        for _ in range(2):
+            receiver.record(10)
+        self.assertLess(receiver.size, grown)
+        thread.join()
+
+    def test_read_encrypted_packets(self):
+        key = bytes(range(16))
+        self.client._enable_encryption(key)
+        encryptor = mcauthpy.create_cipher(key)
+
+        self.server.sendall(encryptor.encrypt(b"\x02\x21\x05\x01\x22"))
+        packets = self.client.read_packets()
+        self.assertEqual([packet_id for packet_id, _ in packets], [0x21, 0x22])
+        self.assertEqual(packets[0][1].data, b"\x05")
+
+    def test_subscribe(self):
+        self.client.mode = mcauthpy.PLAY_MODE
+        self.client.compression_threshold = 4
+        self.client.subscribe(0x22, 0x0F)
+
+        chunk = zlib.compress(b"\x22" + b"\x07" * 256)
+        ignored = zlib.compress(b"\x21" + b"\x01" * 256)
+        for body in [b"\x81\x02" + ignored, b"\x81\x02" + chunk, b"\x00\x0f\x01"]:
+            self.server.sendall(mcauthpy.encode_varint(len(body)) + body)
+
+        packets = self.client.read_packets()
+        self.assertEqual([packet_id for packet_id, _ in packets], [0x22, 0x0F])
+        self.assertEqual(self.client.decoder.skipped, 1)
+        self.assertFalse(packets[0][1].loaded)
+        self.assertEqual(packets[0][1].unpack_byte_array(2), b"\x07\x07")
+        self.assertTrue(packets[0][1].loaded)
+        self.assertEqual(len(packets[0][1]), 254)
+
+        self.client.unsubscribe()
+        self.server.sendall(b"\x03\x00\x21\x01")
+        self.assertEqual(self.client.get_received_buffer()[0], 0x21)
+
+    def login(self, *packets: bytes) -> dict:
+        self.client.server_ip, self.client.server_port = "localhost", 25565
+        self.client.protocol_version = 758
+        self.server.sendall(b"".join(packets))
+        return self.client.login()
+
+    def test_handshake_bytes(self):
+        self.client.server_ip, self.client.server_port = "localhost", 25565
+        self.client.protocol_version = 758
+        self.client._login()
+
+        # The port is big-endian, as the protocol specifies; it used to be
+        # packed in native order, b"\xdd\x63" on little-endian machines.
+        self.assertEqual(
+            self.server.recv(1024),
+            b"\x10\x00\xf6\x05\x09localhost\x63\xdd\x02" + b"\x08\x00\x06Novial",
+        )
+
+    def test_login_order(self):
+        # Login Plugin Request, Set Compression, Login Success, Keep Alive
+        timings = self.login(
+            b"\x0d\x04\x07\x09mc:custom\x01",
+            b"\x03\x03\x80\x02",
+            b"\x06\x00\x02Novi",
+            b"\x03\x00\x21\x07",
+        )
+
+        self.assertEqual(self.client.compression_threshold, 256)
+        self.assertEqual(self.client.mode, mcauthpy.PLAY_MODE)
+        self.assertEqual(self.client.login_success.data, b"Novi")
+        # Login Success is consumed, so the next packet is a play packet.
+        self.assertEqual(self.client.get_received_buffer()[0], 0x21)
+        self.assertTrue(self.server.recv(1024).endswith(b"\x03\x02\x07\x00"))
+        self.assertGreaterEqual(timings["total"], timings["handshake"])
+
+    def test_login_without_compression(self):
+        self.login(b"\x05\x02Novi")
+        self.assertEqual(self.client.compression_threshold, -1)
+        self.assertEqual(self.client.login_success.data, b"Novi")
+
+    def test_login_disconnect(self):
+        with self.assertRaisesRegex(ConnectionError, "banned"):
+            self.login(b'\x0a\x00\x08"banned"')
+
+    def encryption_request(self):
+        keys = MockMinecraftServer(online_mode=True)
+        keys.stop()
+        request = mock_server.frame(
+            b"\x01"
+            + mcauthpy.pack_string("")
+            + mcauthpy.encode_varint(len(keys.public_key))
+            + keys.public_key
+            + b"\x04abcd"
+        )
+
+        client = MockClient.from_token("token", {"id": "1234", "name": "Novial"})
+        client.socket = self.client.socket
+        client.login_timings = {}
+        return keys, request, client
+
+    def test_client_auth_bytes(self):
+        keys, request, client = self.encryption_request()
+        threads = []
+        client._join_server = lambda server_hash: threads.append(
+            threading.current_thread()
+        )
+
+        # The whole packet as received is still accepted.
+        client.client_auth(request)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+        response = self.server.recv(1024)
+        length, offset = mcauthpy.decode_varint(response, 3)
+        length, offset = mcauthpy.decode_varint(response, offset + length)
+        encrypted_token = response[offset : offset + length]
+        self.assertEqual(keys.private_key.decrypt(encrypted_token, PKCS1v15()), b"abcd")
+        self.assertIsNotNone(client.cipher)
+
+    def test_client_auth_join_error(self):
+        keys, request, client = self.encryption_request()
+
+        def refuse(server_hash):
+            raise ConnectionError("Refused")
+
+        client._join_server = refuse
+        self.assertRaisesRegex(ConnectionError, "Refused", client.client_auth, request)
+        self.assertIsNone(client.cipher)
+
+    def test_encrypted_login_plugin(self):
+        server = MockMinecraftServer(packets=0, online_mode=True, login_plugin=True)
+        server.start()
+        client = MockClient.from_token("token", {"id": "1234", "name": "Novial"})
+
+        try:
+            client.connect(*server.address)
+            client.login()
+        finally:
+            client.socket.close()
+            server.stop()
+
+        # The answer is sent encrypted, like every packet after the request.
+        self.assertEqual(server.plugin_responses, [b"\x02\x07\x00"])
+
+    def test_encrypted_login(self):
+        server = MockMinecraftServer(
+            packets=41,
+            compression_threshold=64,
+            script=mock_server.DEFAULT_SCRIPT,
+            online_mode=True,
+        ).start()
+        client = MockClient.from_token("token", {"id": "1234", "name": "Novial"})
+
+        try:
+            client.connect(*server.address)
+            client.login()
+
+            packets = [client.get_received_buffer() for _ in range(41)]
+        finally:
+            client.socket.close()
+            server.stop()
+
+        self.assertIsNotNone(client.cipher)
+        self.assertEqual(client.compression_threshold, 64)
+        self.assertEqual(
+            set(client.login_timings),
+            {"handshake", "wait", "encryption", "join", "total"},
+        )
+        self.assertTrue(client.login_success.data.endswith(b"\x06Novial"))
+        self.assertEqual(
+            [packet_id for packet_id, _ in packets[18:21]], [0x0F, 0x22, 0x3E]
+        )
+        self.assertEqual(len(packets[19][1]), len(mock_server.chunk_packet()) - 1)
+
+    def test_keep_alive(self):
+        self.client.mode = mcauthpy.PLAY_MODE
+        self.client.start_keep_alive()
+
+        keep_alive_id = int(time.time() * 1000).to_bytes(8, "big")
+        self.server.sendall(b"\x09\x21" + keep_alive_id + b"\x02\x22\x01")
+        self.assertEqual(self.client.get_received_buffer()[0], 0x22)
+        self.assertEqual(self.server.recv(1024), b"\x09\x0f" + keep_alive_id)
+
+        self.server.sendall(b"\x01\x23")
+        time.sleep(0.05)
+        self.assertEqual([id for id, _ in self.client.stop_keep_alive()], [0x23])
+
+        stats = self.client.keep_alive_stats.as_dict()
+        self.assertEqual(stats["response"]["count"], 1)
+        self.assertLess(abs(stats["delay"]["last"]), 1000)
+
+        self.server.close()
+        self.assertRaises(ConnectionError, self.client.get_received_buffer)
+
+    def test_keep_alive_error(self):
+        self.client.mode = mcauthpy.PLAY_MODE
+        self.client.start_keep_alive()
+        self.server.close()
+
+        self.assertRaises(ConnectionError, self.client.get_received_buffer)
+        self.assertRaises(ConnectionError, self.client.get_received_buffer)
+        self.assertRaises(ConnectionError, self.client.read_packets)
+        self.assertEqual(self.client.stop_keep_alive(), [])
+
+    def test_stop_keep_alive_mid_frame(self):
+        self.client.start_keep_alive()
+        # The rest of the frame never arrives.
+        self.server.sendall(b"\x09\x21")
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        self.assertEqual(self.client.stop_keep_alive(), [])
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.client.decoder.pending_length, 9)
+
+    def test_decompression_size(self):
+        policy = mcauthpy.CompressionPolicy(max_data_length=1024)
+        data = zlib.compress(b"\x00" * 512)
+
+        self.assertEqual(policy.decompress(data, 512), b"\x00" * 512)
+        self.assertRaises(mcauthpy.DecompressionError, policy.decompress, data, 511)
+        self.assertRaises(mcauthpy.DecompressionError, policy.decompress, data, 513)
+        self.assertRaises(mcauthpy.DecompressionError, policy.decompress, data, 2048)
+        self.assertRaises(mcauthpy.DecompressionError, policy.decompress, b"\x00", 1)
+
+    def test_batch(self):
+        self.server.setblocking(False)
+
+        with self.client.batch():
+            self.client.send_packet(0x21, b"\x01")
+            with self.client.batch():
+                self.client.send_packet(0x22)
+            self.assertRaises(BlockingIOError, self.server.recv, 1024)
+
+        self.assertEqual(self.server.recv(1024), b"\x02\x21\x01\x01\x22")
+
+    def test_send_buffers(self):
+        buffers = [bytes([i % 256]) * 70000 for i in range(40)] + [b"", b"end"]
+        received = bytearray()
+
+        def receive():
+            while len(received) < 40 * 70000 + 3:
+                received.extend(self.server.recv(65536))
+
+        thread = threading.Thread(target=receive)
+        thread.start()
+        self.client.socket.setblocking(False)
+        sent = mcauthpy.send_buffers(self.client.socket, buffers)
+        thread.join()
+
+        self.assertEqual(sent, len(received))
+        self.assertEqual(bytes(received), b"".join(buffers))
+
+
+class MetricsTest(unittest.TestCase):
+    def test_client(self):
+        client = mcauthpy.Client.login_from_username("Novial")
+        client.socket, server = socket.socketpair()
+        client.compression_threshold = 4
+        client.metrics = mcauthpy.Metrics()
+
+        try:
+            body = b"\x81\x02" + zlib.compress(b"\x22" + b"\x07" * 256)
+            server.sendall(
+                mcauthpy.encode_varint(len(body)) + body + b"\x03\x00\x21\x01"
+            )
+            self.assertEqual(len(client.read_packets()), 2)
+            client.send_packet(0x0F, b"\x01")
+        finally:
+            client.socket.close()
+            server.close()
+
+        metrics = client.metrics.as_dict()
+        self.assertEqual(
+            metrics["counters"]["packets_received"], {"0x21": 1, "0x22": 1}
+        )
+        self.assertEqual(metrics["counters"]["bytes_sent"], {"0x0F": 4})
+        self.assertEqual(metrics["stages"]["decompress"]["count"], 1)
+        self.assertEqual(metrics["stages"]["unpack"]["0x22"]["count"], 1)
+        self.assertEqual(metrics["stages"]["send"]["0x0F"]["count"], 1)
+
+    def test_threads(self):
+        metrics = mcauthpy.Metrics()
+
+        def record():
+            for _ in range(20000):
+                metrics.count("packets_received", 1, 0x21)
+                metrics.observe("unpack", 0.0001, 0x21)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            metrics.as_dict()
+            metrics.to_prometheus()
+        for thread in threads:
+            thread.join()
+
+        counters = metrics.as_dict()["counters"]
+        self.assertEqual(counters["packets_received"]["0x21"], 80000)
+        self.assertEqual(metrics.as_dict()["stages"]["unpack"]["0x21"]["count"], 80000)
+
+    def test_prometheus(self):
+        metrics = mcauthpy.Metrics(buckets=(0.001, 0.01))
+        metrics.count("packets_received", 2, 0x21)
+        metrics.observe("http", 0.005, "api.minecraftservices.com/minecraft/profile")
+        metrics.observe("decrypt", 0.0005)
+
+        other = mcauthpy.Metrics(buckets=(0.001, 0.01))
+        other.count("packets_received", 1, 0x21)
+        metrics.merge(other)
+
+        self.assertEqual(
+            metrics.to_prometheus(labels={"bot": "Novial"}).splitlines(),
+            [
+                "# TYPE mcauthpy_packets_received_total counter",
+                'mcauthpy_packets_received_total{bot="Novial",packet_id="0x21"} 3',
+                "# TYPE mcauthpy_stage_seconds histogram",
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="decrypt",le="0.001"} 1',
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="decrypt",le="0.01"} 1',
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="decrypt",le="+Inf"} 1',
+                'mcauthpy_stage_seconds_sum{bot="Novial",stage="decrypt"} 0.0005',
+                'mcauthpy_stage_seconds_count{bot="Novial",stage="decrypt"} 1',
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="http",endpoint="api.minecraftservices.com/minecraft/profile",le="0.001"} 0',
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="http",endpoint="api.minecraftservices.com/minecraft/profile",le="0.01"} 1',
+                'mcauthpy_stage_seconds_bucket{bot="Novial",stage="http",endpoint="api.minecraftservices.com/minecraft/profile",le="+Inf"} 1',
+                'mcauthpy_stage_seconds_sum{bot="Novial",stage="http",endpoint="api.minecraftservices.com/minecraft/profile"} 0.005',
+                'mcauthpy_stage_seconds_count{bot="Novial",stage="http",endpoint="api.minecraftservices.com/minecraft/profile"} 1',
+            ],
+        )
+
+
+class DispatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mcauthpy.Client.login_from_username("Novial")
+        self.client.socket, self.server = socket.socketpair()
+        self.dispatcher = mcauthpy.Dispatcher()
+
+    def tearDown(self):
+        self.client.socket.close()
+        self.server.close()
+
+    def test_protocol_handlers(self):
+        self.server.sendall(b"\x02\x03\x40\x03\x00\x02\x00")
+        self.assertEqual(self.dispatcher.process(self.client), 1)
+        self.assertEqual(self.client.compression_threshold, 64)
+        self.dispatcher.process(self.client)
+        self.assertEqual(self.client.mode, mcauthpy.PLAY_MODE)
+
+        self.server.sendall(b"\x0a\x00\x21" + bytes(range(8)))
+        self.dispatcher.process(self.client)
+        self.assertEqual(self.server.recv(1024), b"\x0a\x00\x0f" + bytes(range(8)))
+
+    def test_handlers(self):
+        received = []
+        self.dispatcher.unhandled = lambda client, packet_id, buffer: received.append(
+            packet_id
+        )
+
+        @self.dispatcher.on(0x90)
+        def on_packet(client, buffer):
+            received.append(buffer.data)
+
+        self.client.mode = mcauthpy.PLAY_MODE
+        self.server.sendall(b"\x03\x90\x01\x01\x01\x22")
+        self.dispatcher.process(self.client)
+        self.assertEqual(received, [b"\x01", 0x22])
+        self.assertEqual(self.dispatcher.packet_ids(), [0x21, 0x90])
+
+        self.dispatcher.unregister(0x90, on_packet)
+        self.assertEqual(self.dispatcher.packet_ids(), [0x21])
+        self.dispatcher.unregister(0x400, on_packet)
+
+    def test_packet_names(self):
+        dispatcher = mcauthpy.Dispatcher(protocol_handlers=False)
+        handler = dispatcher.on("chunk_data_and_update_light")(
+            lambda client, buffer: None
+        )
+        dispatcher.register("disconnect", handler, mcauthpy.LOGIN_MODE)
+
+        self.assertEqual(dispatcher.packet_ids(), [0x22])
+        self.assertEqual(dispatcher.packet_ids(mcauthpy.LOGIN_MODE), [0x00])
+        self.assertRaises(KeyError, dispatcher.register, "chunk", handler)
+
+        dispatcher.unregister("chunk_data_and_update_light", handler)
+        self.assertEqual(dispatcher.packet_ids(), [])
+
+
+class ClientPoolTest(unittest.TestCase):
+    def test_poll(self):
+        received = []
+        disconnected = []
+        dispatcher = mcauthpy.Dispatcher()
+        dispatcher.unhandled = lambda client, packet_id, buffer: received.append(
+            (client.username, packet_id)
+        )
+        pool = mcauthpy.ClientPool(dispatcher, lambda *args: disconnected.append(args))
+
+        servers = []
+        for username in ["Novial", "Ellen"]:
+            client = mcauthpy.Client.login_from_username(username)
+            client.mode = mcauthpy.PLAY_MODE
+            client.socket, server = socket.socketpair()
+            servers.append(server)
+            pool.add(client)
+
+        servers[0].sendall(b"\x01\x22")
+        servers[1].sendall(b"\x01\x23")
+        while len(received) < 2:
+            pool.poll(1)
+        self.assertEqual(sorted(received), [("Ellen", 0x23), ("Novial", 0x22)])
+
+        servers[0].sendall(b"\x09\x21" + bytes(8))
+        pool.poll(1)
+        self.assertEqual(servers[0].recv(1024), b"\x09\x0f" + bytes(8))
+
+        servers[1].close()
+        pool.poll(1)
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(disconnected[0][0].username, "Ellen")
+
+        pool.close()
+        servers[0].close()
+
+    def test_errors(self):
+        disconnected = []
+        dispatcher = mcauthpy.Dispatcher()
+        handled = []
+
+        @dispatcher.on(0x22)
+        def on_packet(client, buffer):
+            handled.append(client.username)
+            raise ValueError("handler bug")
+
+        pool = mcauthpy.ClientPool(dispatcher, lambda *args: disconnected.append(args))
+        servers = []
+        for username in ["Novial", "Ellen"]:
+            client = mcauthpy.Client.login_from_username(username)
+            client.mode = mcauthpy.PLAY_MODE
+            client.compression_threshold = 0
+            client.socket, server = socket.socketpair()
+            servers.append(server)
+            pool.add(client)
+
+        # A compressed packet that does not inflate, and two handler errors.
+        servers[0].sendall(b"\x04\x05\x00\x01\x02")
+        servers[1].sendall(b"\x02\x00\x22\x02\x00\x22")
+        with self.assertLogs("mcauthpy", "ERROR"):
+            while len(handled) < 2 or not disconnected:
+                pool.poll(1)
+
+        self.assertEqual(handled, ["Ellen", "Ellen"])
+        self.assertEqual(len(pool), 1)
+        self.assertIsInstance(disconnected[0][1], mcauthpy.DecompressionError)
+
+        pool.close()
+        for server in servers:
+            server.close()
+
+    def test_slow_connection(self):
+        pool = mcauthpy.ClientPool()
+        client = mcauthpy.Client.login_from_username("Novial")
+        client.socket, server = socket.socketpair()
+        pool.add(client)
+
+        # More than the socket takes at once; the rest waits for the pool.
+        data = bytes(range(256)) * 16384
+        client.write_packet(0x22, data)
+        client.write_packet(0x23)
+        self.assertTrue(client._unsent)
+
+        received = bytearray()
+        while len(received) < len(data) + 7:
+            pool.poll(0.1)
+            received.extend(server.recv(1 << 20))
+
+        self.assertEqual(bytes(received[5:-2]), data)
+        self.assertEqual(bytes(received[-2:]), b"\x01\x23")
+        self.assertFalse(client._unsent)
+
+        pool.close()
+        server.close()
+
+
+class FleetTest(unittest.TestCase):
+    def test_run_fleet(self):
+        server = MockMinecraftServer(packets=500).start()
+        usernames = [f"bot{i}" for i in range(5)]
+
+        try:
+            shards = mcauthpy.run_fleet(
+                usernames, *server.address, shards=2, duration=0.5
+            )
+        finally:
+            server.stop()
+
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(sum(shard["connected"] for shard in shards), 5)
+        self.assertEqual(
+            sum(shard["connect_packets"] + shard["packets"] for shard in shards),
+            5 * 500,
+        )
+        self.assertNotEqual(shards[0]["pid"], shards[1]["pid"])
+        self.assertEqual(shards.authentication_failed, {})
+
+    def test_from_token(self):
+        client = mcauthpy.Client.from_token("token", {"id": "1234", "name": "Novial"})
+        self.assertEqual(client.username, "Novial")
+        self.assertTrue(client.server_online_mode)
+
+
+class CipherTest(unittest.TestCase):
+    def test_backends(self):
+        key = bytes(range(16))
+        data = bytes(range(256)) * 40
+        self.assertEqual(mcauthpy.available_backends()[0], "cryptography")
+
+        for backend in mcauthpy.available_backends():
+            encryptor = mcauthpy.create_cipher(key, backend)
+            decryptor = mcauthpy.create_cipher(key, backend)
+            out = bytearray(len(data) + decryptor.overhead)
+
+            encrypted = encryptor.encrypt(data[:100]) + encryptor.encrypt(data[100:])
+            self.assertEqual(encrypted, mcauthpy.create_cipher(key).encrypt(data))
+
+            decrypted = bytes(decryptor.decrypt_into(encrypted[:7], out))
+            decrypted += decryptor.decrypt(encrypted[7:])
+            self.assertEqual(decrypted, data)
+
+        self.assertRaises(TypeError, mcauthpy.CFB8Cipher, key)
+
+
+class AsyncClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.received = asyncio.Queue()
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        received = b""
+        while not received.endswith(b"Novial"):
+            received += await reader.read(1024)
+        await self.received.put(received)
+
+        # Set Compression, Login Success and Keep Alive
+        writer.write(b"\x03\x03\x80\x02\x06\x00\x02Novi\x03\x00\x21\x07")
+        await writer.drain()
+        await self.received.put(await reader.read())
+        writer.close()
+
+    async def test_login(self):
+        client = mcauthpy.AsyncClient.login_from_username("Novial")
+        await client.connect("127.0.0.1", self.server.sockets[0].getsockname()[1])
+        await client.login()
+
+        self.assertEqual(client.compression_threshold, 256)
+        self.assertTrue((await self.received.get()).endswith(b"\x00\x06Novial"))
+
+        self.assertEqual(client.login_success.data, b"Novi")
+        packets = await client.read_packets()
+        self.assertEqual([packet_id for packet_id, _ in packets], [0x21])
+        self.assertEqual(packets[0][1].data, b"\x07")
+
+        await client.close()
+
+    async def test_keep_alive(self):
+        client = mcauthpy.AsyncClient.login_from_username("Novial")
+        await client.connect("127.0.0.1", self.server.sockets[0].getsockname()[1])
+        await client.login()
+        await self.received.get()
+
+        client.start_keep_alive()
+        await asyncio.sleep(0.05)
+        self.assertEqual(await client.stop_keep_alive(), [])
+        self.assertEqual(client.keep_alive_stats.response.count, 1)
+
+        await client.close()
+        self.assertEqual(await self.received.get(), b"\x03\x00\x0f\x07")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import mcauthpy
+import json
+import os
+import tempfile
+
+from unittest import mock
+
+VERSIONS = {
+    "1020": {
+        "name": "1.18.2",
+        "protocol_id": 758,
+        "packets": {
+            "c2s": {"login": ["login_start"], "play": {"keep_alive": 0x0F}},
+            "s2c": {"login": {"0x03": "compression_set"}, "play": {"keep_alive": 0x21}},
+        },
+    },
+    "1021": {"name": "22w11a", "protocol_id": 758, "type": "snapshot", "packets": 1},
+    "1030": {"name": "1.18.3", "protocol_id": 759, "packets": 1020},
+    "1040": {"name": "broken", "protocol_id": 760, "packets": 1041},
+    "1041": {"name": "broken", "protocol_id": 761, "packets": 1040},
+}
+
+
+class ProtocolRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "versions.json")
+        with open(self.path, "w") as f:
+            json.dump(VERSIONS, f)
+
+        self.cache_directory = os.path.join(self.directory.name, "cache")
+        patch = mock.patch.object(
+            mcauthpy.database, "user_cache_directory", return_value=self.cache_directory
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_index(self):
+        registry = mcauthpy.ProtocolRegistry(self.path)
+        version = registry[758]
+
+        self.assertEqual(version.name, "1.18.2")
+        self.assertEqual(version.packet_id("keep_alive"), 0x21)
+        self.assertEqual(
+            version.packet_name(0x0F, "play", mcauthpy.SERVERBOUND), "keep_alive"
+        )
+        self.assertEqual(
+            version.packet_id("compression_set", mcauthpy.LOGIN_MODE), 0x03
+        )
+        self.assertEqual(
+            version.packet_name(0x00, mcauthpy.LOGIN_MODE, "c2s"), "login_start"
+        )
+        self.assertIsNone(version.packet_name(0x50))
+
+        self.assertEqual(registry[759].packet_id("keep_alive"), 0x21)
+        self.assertNotIn(760, registry)
+        self.assertIsNone(registry.get(761))
+
+    def test_cache(self):
+        cache_path = mcauthpy.ProtocolRegistry(self.path).cache_path
+        mcauthpy.ProtocolRegistry(self.path).versions
+        self.assertEqual(os.path.dirname(cache_path), self.cache_directory)
+        self.assertTrue(os.path.exists(cache_path))
+        # The mapping's directory is left as it is.
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)), ["cache", "versions.json"]
+        )
+
+        with mock.patch("json.load") as load:
+            registry = mcauthpy.ProtocolRegistry(self.path)
+            self.assertEqual(registry[758].packet_id("keep_alive"), 0x21)
+            load.assert_not_called()
+
+        # A cache that others can write to is not loaded.
+        os.chmod(cache_path, 0o666)
+        with mock.patch("json.load", return_value=VERSIONS) as load:
+            mcauthpy.ProtocolRegistry(self.path).versions
+            load.assert_called_once()
+
+        # A changed mapping invalidates the cache.
+        play = VERSIONS["1020"]["packets"]["s2c"]["play"]
+        with mock.patch.dict(play, keep_alive=0x20):
+            with open(self.path, "w") as f:
+                json.dump(VERSIONS, f, indent=4)
+
+        self.assertEqual(
+            mcauthpy.ProtocolRegistry(self.path)[758].packet_id("keep_alive"), 0x20
+        )
+
+    def test_split(self):
+        with open(self.path, "r") as f:
+            db = json.load(f)
+        os.remove(self.path)
+
+        paths = mcauthpy.split_versions(db, self.directory.name, [758, 760])
+        self.assertEqual(paths, [os.path.join(self.directory.name, "758.json")])
+
+        registry = mcauthpy.ProtocolRegistry(self.path)
+        self.assertEqual(registry[758].packet_id("keep_alive"), 0x21)
+        self.assertNotIn(759, registry)
+        self.assertEqual(list(registry.versions), [758])
+
+    def test_bundled(self):
+        registry = mcauthpy.ProtocolRegistry(mcauthpy.VERSIONS_PATH)
+        version = registry[758]
+
+        self.assertEqual(version.name, "1.18.2")
+        self.assertEqual(version.packet_id("keep_alive"), 0x21)
+        self.assertEqual(
+            version.packet_id("keep_alive", direction=mcauthpy.SERVERBOUND), 0x0F
+        )
+        self.assertEqual(
+            version.packet_id("set_compression", mcauthpy.LOGIN_MODE), 0x03
+        )
+        # Only the version's own file is read.
+        self.assertIsNone(registry._mapping)
+
+
+if __name__ == "__main__":
+    unittest.main()
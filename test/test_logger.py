@@ -0,0 +1,54 @@
+import unittest
+import mcauthpy
+import contextlib
+import io
+import logging
+import time
+
+from unittest import mock
+
+
+class LoggerTest(unittest.TestCase):
+    def tearDown(self):
+        mcauthpy.disable_logging()
+        mcauthpy.log.setLevel(logging.NOTSET)
+
+    def test_formatter(self):
+        formatter = mcauthpy.ColorFormatter(color=False)
+        record = mcauthpy.log.makeRecord(
+            "mcauthpy", logging.WARNING, __file__, 1, "%d packets", (3,), None
+        )
+        record.created = time.mktime((2022, 4, 1, 12, 30, 15, 0, 0, -1))
+
+        self.assertEqual(
+            formatter.format(record), "| WARNING 04-01-2022 12-30-15 | 3 packets"
+        )
+
+    def test_queued(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(mcauthpy.ColorFormatter(color=False))
+        mcauthpy.enable_logging(logging.INFO, handler, queued=True)
+
+        mcauthpy.print_log("connected", mcauthpy.LogInfo)
+        mcauthpy.log.debug("skipped %s", "debug")
+        mcauthpy.disable_logging()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith("| INFO    "))
+        self.assertTrue(lines[0].endswith("| connected"))
+
+    def test_print_log(self):
+        stdout = io.StringIO()
+        # Without any handler, messages are still printed.
+        with mock.patch.object(logging.root, "handlers", []):
+            with contextlib.redirect_stdout(stdout):
+                mcauthpy.print_log("connected", mcauthpy.LogWarning)
+
+        self.assertIn("WARNING", stdout.getvalue())
+        self.assertTrue(stdout.getvalue().endswith(" connected\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 import mcauthpy
+import struct
 import unittest
 import zlib
 
+from mcauthpy import schema
+
 
 class PacketBufferTest(unittest.TestCase):
     def test_unpack_varint(self):
@@ -134,5 +137,120 @@ class PacketBufferTest(unittest.TestCase):
         uuid = pb.unpack_uuid()
 
 
+class CursorPacketBufferTest(unittest.TestCase):
+    def test_unpack_varint(self):
+        pb = mcauthpy.CursorPacketBuffer(b"\xdd\xc7\x01\xff\xff\xff\xff\x0f")
+        self.assertEqual(25565, pb.unpack_varint())
+        self.assertEqual(-1, pb.unpack_varint())
+        self.assertEqual(len(pb), 0)
+
+    def test_read_packet(self):
+        pb = mcauthpy.CursorPacketBuffer(b"")
+        pb.add(mcauthpy.pack_string("Novial"))
+        pb.add(b"\x43\x23\x12")
+        pb.add(mcauthpy.pack_varint(2097151))
+
+        self.assertEqual(pb.unpack_string().decode("utf-8"), "Novial")
+
+        unpacked_array = pb.unpack_byte_array(3)
+        self.assertIsInstance(unpacked_array, memoryview)
+        self.assertEqual(unpacked_array, b"\x43\x23\x12")
+
+        self.assertEqual(pb.unpack_varint(), 2097151)
+        self.assertEqual(pb.data, b"")
+
+    def test_save_revert(self):
+        pb = mcauthpy.CursorPacketBuffer(b"\x80\x01\x7f")
+        pb.save()
+        self.assertEqual(pb.unpack_varint(), 128)
+        pb.add(b"\x01")
+        pb.revert()
+        self.assertEqual(pb.data, b"\x80\x01\x7f")
+
+        pb.save()
+        pb.purge()
+        self.assertEqual(pb.data, b"")
+        pb.revert()
+        self.assertEqual(pb.data, b"\x80\x01\x7f")
+
+    def test_compact(self):
+        pb = mcauthpy.CursorPacketBuffer(b"\x00" * 8, compact_threshold=4)
+        pb.read(3)
+        pb.add(b"\x01")
+        self.assertEqual(len(pb._buffer), 9)
+
+        pb.read(2)
+        pb.add(b"\x01")
+        self.assertEqual(len(pb._buffer), 5)
+
+        view = pb.read_view(2)
+        pb.add(b"\x02")
+        self.assertEqual(view, b"\x00\x00")
+        self.assertEqual(pb.data, b"\x00\x01\x01\x02")
+
+
+class FrameDecoderTest(unittest.TestCase):
+    def test_frames(self):
+        decoder = mcauthpy.FrameDecoder()
+        decoder.feed(b"\x02\x00\x01\x03\x01\x02\x03\x04")
+
+        self.assertEqual(list(decoder.frames()), [b"\x00\x01", b"\x01\x02\x03"])
+        self.assertIsNone(decoder.next_frame())
+
+        decoder.feed(b"\x05\x06\x07\x08")
+        self.assertEqual(decoder.next_frame(), b"\x05\x06\x07\x08")
+
+    def test_split_length(self):
+        body = b"\x2a" * 300
+        data = mcauthpy.pack_varint(len(body)) + body
+
+        decoder = mcauthpy.FrameDecoder()
+        decoder.feed(data[:1])
+        self.assertIsNone(decoder.next_frame())
+        decoder.feed(data[1:100])
+        self.assertIsNone(decoder.next_frame())
+        decoder.feed(data[100:])
+        self.assertEqual(decoder.next_frame(), body)
+        self.assertEqual(len(decoder), 0)
+
+    def test_too_big(self):
+        decoder = mcauthpy.FrameDecoder()
+        decoder.feed(b"\xff\xff\xff\x01")
+        self.assertRaises(mcauthpy.TooBigToUnpack, decoder.next_frame)
+
+
+class PacketSchemaTest(unittest.TestCase):
+    def test_position_and_rotation(self):
+        position = schema.PacketSchema(
+            0x12,
+            schema.DOUBLE,
+            schema.DOUBLE,
+            schema.DOUBLE,
+            schema.FLOAT,
+            schema.FLOAT,
+            schema.BOOLEAN,
+        )
+        self.assertEqual(len(position._steps), 1)
+
+        data = position.encode(1.5, 64.0, -3.25, 90.0, 0.0, True)
+        self.assertEqual(
+            data, b"\x12" + struct.pack(">dddff?", 1.5, 64.0, -3.25, 90.0, 0.0, True)
+        )
+        self.assertEqual(position.decode(data, 1), (1.5, 64.0, -3.25, 90.0, 0.0, True))
+
+    def test_handshake(self):
+        data = schema.HANDSHAKE.encode(758, "localhost", 25565, 2)
+        self.assertEqual(data, b"\x00\xf6\x05\x09localhost\x63\xdd\x02")
+
+        pb = mcauthpy.PacketBuffer(data[1:] + b"\x01")
+        self.assertEqual(
+            schema.HANDSHAKE.decode_buffer(pb), (758, "localhost", 25565, 2)
+        )
+        self.assertEqual(pb.data, b"\x01")
+
+    def test_wrong_value_count(self):
+        self.assertRaises(ValueError, schema.LOGIN_START.encode, "Novial", 1)
+
+
 if __name__ == "__main__":
     unittest.main()